@@ -1,14 +1,14 @@
 import streamlit as st
 from streamlit_cropper import st_cropper
 from PIL import Image
-import cv2
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from flirimageextractor import FlirImageExtractor
-import tempfile
-import os
-import io
+from termografia.decodificador import extrair_termica
+from termografia.processamento import caixa_para_sensor, estatisticas_roi
+from termografia.instrumentacao import etapa
+from termografia.renderizacao import cache_padrao
+from painel_performance import exibir_painel
 
 st.set_page_config(layout="wide", page_title="Debug V4: Validação de Pipeline")
 
@@ -17,8 +17,8 @@ st.markdown("""
 Esta ferramenta disseca o processo de extração de dados para provar a integridade da Versão 4.
 Etapas analisadas:
 1.  **Ingestão:** Leitura dos metadados brutos (Raw Thermal).
-2.  **Sincronização:** Upscaling da matriz térmica (80x60 -> 320x240).
-3.  **Geometria:** Template Matching para localizar o recorte visual na matriz térmica.
+2.  **Sincronização:** Escala entre a imagem exibida e a grade nativa do sensor (ex: 320x240 -> 80x60).
+3.  **Geometria:** Mapeamento analítico das coordenadas do recorte para pixels do sensor.
 4.  **Amostragem:** Extração estatística dos dados físicos e visualização matricial.
 """)
 
@@ -26,12 +26,6 @@ Etapas analisadas:
 arquivo = st.file_uploader("Carregar imagem térmica (JPG)", type=['jpg', 'jpeg'])
 
 if arquivo:
-    # Salvar temp para a biblioteca ler
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp:
-        arquivo.seek(0)
-        tmp.write(arquivo.read())
-        tmp_path = tmp.name
-    
     # Abrir visual
     arquivo.seek(0)
     img_pil = Image.open(arquivo)
@@ -40,8 +34,9 @@ if arquivo:
     
     with col1:
         st.subheader("1. Definição da ROI (Visual)")
-        st.caption("Faça um recorte na planta. O sistema tentará achar esses mesmos pixels na matriz térmica cega.")
-        img_crop = st_cropper(img_pil, realtime_update=True, box_color='#FF0000', aspect_ratio=None, key="crop_debug")
+        st.caption("Faça um recorte na planta. As coordenadas do recorte são levadas para a grade do sensor.")
+        img_crop, caixa = st_cropper(img_pil, realtime_update=True, box_color='#FF0000', aspect_ratio=None,
+                                     return_type='both', key="crop_debug")
         st.image(img_crop, caption="Recorte Visual (RGB)", width=150)
         
         validar = st.button("🔍 Executar validação de pipeline", type="primary")
@@ -50,18 +45,15 @@ if arquivo:
         with st.spinner("Desconstruindo o arquivo..."):
             try:
                 # --- ETAPA 1: EXTRAÇÃO RADIOMÉTRICA (PROVA DE DADOS FÍSICOS) ---
-                flir = FlirImageExtractor(is_debug=False)
-                flir.process_image(tmp_path)
-                raw_thermal = flir.get_thermal_np() # Matriz original (ex: 80x60)
+                with etapa('debug.extracao'):
+                    raw_thermal = extrair_termica(arquivo) # Matriz original (ex: 80x60)
                 
                 # Prova 1: Histograma de Temperaturas (Float) vs Cores (0-255)
-                fig1, (ax1a, ax1b) = plt.subplots(1, 2, figsize=(10, 4))
-                
-                # Plot da Matriz Bruta
-                sns.heatmap(raw_thermal, ax=ax1a, cmap="inferno", cbar=False)
-                ax1a.set_title(f"A. Matriz bruta do sensor\nDimensões: {raw_thermal.shape}", fontsize=10)
-                
-                # Histograma de valores
+                # A. Matriz bruta: mapa de calor do cache de renderização (mesmo do PDF e do Dashboard)
+                mapa_bruto = cache_padrao().obter(raw_thermal, lado_minimo=240)
+
+                # B. Histograma de valores
+                fig1, ax1b = plt.subplots(figsize=(5, 4))
                 vals = raw_thermal.flatten()
                 ax1b.hist(vals, bins=30, color='orange', edgecolor='black')
                 ax1b.set_title(f"B. Histograma radiométrico\nIntervalo: {vals.min():.1f}°C a {vals.max():.1f}°C", fontsize=10)
@@ -70,62 +62,60 @@ if arquivo:
                 st.divider()
                 st.header("Etapa 1: ingestão de dados brutos")
                 st.write("Prova que estamos lendo física (Graus Celsius com casas decimais), não cores (Inteiros 0-255).")
-                st.pyplot(fig1)
+                c1a, c1b = st.columns(2)
+                c1a.image(mapa_bruto, caption=f"A. Matriz bruta do sensor — dimensões: {raw_thermal.shape}",
+                          width='stretch')
+                c1b.pyplot(fig1)
 
-                # --- ETAPA 2: SINCRONIZAÇÃO (PROVA DE UPSCALING) ---
+                # --- ETAPA 2: SINCRONIZAÇÃO (ESCALA VISUAL -> SENSOR) ---
                 img_vis_np = np.array(img_pil)
                 h_vis, w_vis = img_vis_np.shape[:2]
-                
-                # Resize
-                thermal_upscaled = cv2.resize(raw_thermal, (w_vis, h_vis), interpolation=cv2.INTER_CUBIC)
+                h_s, w_s = raw_thermal.shape
                 
                 fig2, (ax2a, ax2b) = plt.subplots(1, 2, figsize=(10, 4))
                 ax2a.imshow(img_vis_np)
                 ax2a.set_title(f"Visual ({w_vis}x{h_vis})", fontsize=10)
                 
-                im_b = ax2b.imshow(thermal_upscaled, cmap='inferno')
-                ax2b.set_title(f"Térmica redimensionada ({w_vis}x{h_vis})\nsincronizada", fontsize=10)
+                # extent: a grade nativa é desenhada sobre o mesmo sistema de coordenadas da imagem exibida
+                im_b = ax2b.imshow(raw_thermal, cmap='inferno', extent=(0, w_vis, h_vis, 0), interpolation='nearest')
+                ax2b.set_title(f"Térmica nativa ({w_s}x{h_s})\nescala {w_vis / w_s:.1f}x por pixel", fontsize=10)
                 
                 st.divider()
                 st.header("Etapa 2: sincronização espacial")
-                st.write(f"Prova da adaptação da resolução nativa ({raw_thermal.shape}) para a resolução visual ({img_vis_np.shape[:2]}).")
+                st.write(f"Cada pixel do sensor ({raw_thermal.shape}) cobre um bloco de {w_vis / w_s:.1f}x{h_vis / h_s:.1f} pixels da imagem exibida ({img_vis_np.shape[:2]}). A matriz não é reamostrada.")
                 st.pyplot(fig2)
 
-                # --- ETAPA 3: TEMPLATE MATCHING (PROVA DE GEOMETRIA) ---
-                # Converter visual para gray
-                full_gray = cv2.cvtColor(img_vis_np, cv2.COLOR_RGB2GRAY)
-                crop_np = np.array(img_crop)
-                crop_gray = cv2.cvtColor(crop_np, cv2.COLOR_RGB2GRAY)
-                
-                # Executar Matching
-                res = cv2.matchTemplate(full_gray, crop_gray, cv2.TM_CCOEFF_NORMED)
-                _, _, _, max_loc = cv2.minMaxLoc(res)
-                x, y = max_loc
-                h_c, w_c = crop_gray.shape[:2]
+                # --- ETAPA 3: MAPEAMENTO DA ROI (PROVA DE GEOMETRIA) ---
+                x, y, w_c, h_c = caixa['left'], caixa['top'], caixa['width'], caixa['height']
+                with etapa('debug.mapeamento_roi'):
+                    caixa_sensor = caixa_para_sensor((x, y, w_c, h_c), (w_vis, h_vis), raw_thermal.shape)
+                x0, y0, x1, y1 = caixa_sensor
                 
-                # Criar visualização do "Alvo"
+                # Criar visualização do "Alvo" na grade do sensor
                 fig3, ax3 = plt.subplots(figsize=(8, 5))
-                ax3.imshow(thermal_upscaled, cmap='gray') # Fundo térmico
-                # Desenhar retângulo onde achou
-                rect = plt.Rectangle((x, y), w_c, h_c, linewidth=3, edgecolor='r', facecolor='none')
+                ax3.imshow(raw_thermal, cmap='gray', interpolation='nearest') # Fundo térmico nativo
+                # Desenhar retângulo mapeado (coordenadas contínuas do sensor)
+                rect = plt.Rectangle((x0 - 0.5, y0 - 0.5), x1 - x0, y1 - y0, linewidth=3, edgecolor='r', facecolor='none')
                 ax3.add_patch(rect)
-                ax3.set_title("C. Localização do recorte na matriz térmica", fontsize=12)
+                ax3.set_title("C. Recorte mapeado na grade do sensor", fontsize=12)
                 
                 st.divider()
                 st.header("Etapa 3: localização da ROI")
-                st.write("O algoritmo varre a imagem para encontrar onde o recorte visual se encaixa na matriz de temperatura.")
+                st.write(f"Recorte ({x}, {y}, {w_c}x{h_c}) na imagem exibida → sensor x: {x0:.2f}–{x1:.2f}, y: {y0:.2f}–{y1:.2f}. Pixels de borda entram ponderados pela área coberta.")
                 st.pyplot(fig3)
 
                 # --- ETAPA 4: AMOSTRAGEM FINAL (COM MATRIZ COLORIDA) ---
-                roi_thermal = thermal_upscaled[y:y+h_c, x:x+w_c]
+                with etapa('debug.estatisticas_roi'):
+                    stats, roi_thermal = estatisticas_roi(raw_thermal, caixa_sensor)
+                h_c, w_c = roi_thermal.shape
                 
                 # Prepara amostra pequena (10x10) para o gráfico ser legível
                 amostra_h = min(10, h_c)
                 amostra_w = min(10, w_c)
                 roi_sample = roi_thermal[:amostra_h, :amostra_w]
                 
-                media = np.mean(roi_thermal)
-                desvio = np.std(roi_thermal)
+                media = stats['Temp_Media']
+                desvio = stats['Desvio']
                 
                 st.divider()
                 st.header("Etapa 4: resultado final e prova visual")
@@ -154,5 +144,5 @@ if arquivo:
 
             except Exception as e:
                 st.error(f"Erro na validação: {e}")
-            finally:
-                if os.path.exists(tmp_path): os.remove(tmp_path)
\ No newline at end of file
+
+exibir_painel()
@@ -1,9 +1,10 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from flirimageextractor import FlirImageExtractor
-import tempfile
-import os
+import io
+from termografia.decodificador import extrair_termica
+from termografia.instrumentacao import etapa
+from painel_performance import exibir_painel
 
 st.set_page_config(page_title="Debug radiométrico", page_icon="🌡️")
 
@@ -16,17 +17,10 @@ e calcula estatísticas exatas baseadas nos sensores (sem estimativa visual).
 uploaded_file = st.file_uploader("Arraste a imagem térmica (JPG)", type=["jpg", "jpeg"])
 
 if uploaded_file is not None:
-    # 1. Salvar arquivo temporário
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp:
-        uploaded_file.seek(0)
-        tmp.write(uploaded_file.read())
-        tmp_path = tmp.name
-
     try:
-        # 2. Extração Radiométrica
-        flir = FlirImageExtractor(is_debug=False)
-        flir.process_image(tmp_path)
-        matriz_termica = flir.get_thermal_np() # Matriz numpy pura (float)
+        # 1. Extração Radiométrica (direto dos bytes do upload)
+        with etapa('debug2.extracao'):
+            matriz_termica = extrair_termica(uploaded_file) # Matriz numpy pura (float)
 
         # ---------------------------------------------------------
         # NOVO: Cálculo e Exibição das Estatísticas
@@ -46,18 +40,20 @@ if uploaded_file is not None:
         col3.metric("Média global", f"{temp_media:.2f} °C")
         
         st.info(f"Dimensões do sensor: {matriz_termica.shape[1]}px (largura) x {matriz_termica.shape[0]}px (altura)")
+
         st.divider()
         # ---------------------------------------------------------
 
-        # 3. Conversão para Tabela (Pandas DataFrame)
+        # 2. Conversão para Tabela (Pandas DataFrame)
         df = pd.DataFrame(matriz_termica)
 
-        # 4. Visualização Rápida (Mapa de Calor)
+        # 3. Visualização Rápida (Mapa de Calor)
         st.subheader("Matriz bruta")
         st.dataframe(df.style.format("{:.2f}").background_gradient(cmap="RdYlBu_r"), height=400)
 
-        # 5. Botão de Download
-        csv = df.to_csv(index=False, sep=';', decimal=',').encode('utf-8-sig')
+        # 4. Botão de Download
+        with etapa('debug2.csv'):
+            csv = df.to_csv(index=False, sep=';', decimal=',').encode('utf-8-sig')
         
         st.download_button(
             label="📥 Baixar planilha completa (.csv)",
@@ -66,10 +62,17 @@ if uploaded_file is not None:
             mime="text/csv"
         )
 
+        # Matriz binária (float32) para análise numérica: bem menor e mais rápida que o CSV
+        buf_npy = io.BytesIO()
+        np.save(buf_npy, matriz_termica)
+        st.download_button(
+            label="📥 Baixar matriz (.npy)",
+            data=buf_npy.getvalue(),
+            file_name=f"dados_termicos_{uploaded_file.name}.npy",
+            mime="application/octet-stream"
+        )
+
     except Exception as e:
         st.error(f"Erro ao processar: {e}")
-    
-    finally:
-        # Limpeza
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
\ No newline at end of file
+
+exibir_painel()
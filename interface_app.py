@@ -0,0 +1,650 @@
+import streamlit as st
+import pandas as pd
+from streamlit_cropper import st_cropper
+import os
+import uuid
+import zipfile
+
+# --- DECODIFICADOR RADIOMÉTRICO (em processo, sem exiftool) ---
+from termografia.decodificador import perfis_carregados
+from termografia.segmentacao import METODOS
+from termografia.cache import CacheTermico
+from termografia.amostra import Amostra
+from termografia.reanalise import Reanalisador, ETAPAS, BLOCO_REANALISE, origem_do_par
+from termografia.tabela import TabelaResultados, COLUNAS_STATS, gravar_csv
+from termografia.series import SeriesTemporais, METRICAS, CHAVES_SERIE
+from termografia.banco import BancoResultados, ColecaoAmostras
+from termografia.ingestao import arquivos_do_zip, arquivos_do_caminho, raiz_servidor, LADO_PREVIA
+from termografia.inspetor import Piramide, figura, janela_da_selecao
+from termografia.pareamento import IndicePares
+from termografia.precarga import PreCarregador, assinatura_upload, ANTECIPAR, ORCAMENTO_PADRAO
+from termografia.renderizacao import cache_padrao
+from termografia.tarefas import FilaTarefas, CONCLUIDA, ERRO, CANCELADA, INTERROMPIDA
+from termografia.instrumentacao import etapa
+from painel_performance import exibir_painel
+
+# Configuração da página
+st.set_page_config(page_title="Análise térmica de plantas", layout="wide", page_icon="🌱")
+
+# --- FUNÇÕES UTILITÁRIAS ---
+
+@st.cache_resource
+def obter_cache():
+    """Cache de decodificação compartilhado entre sessões e reruns."""
+    return CacheTermico()
+
+cache = obter_cache()
+
+@st.cache_resource
+def obter_reanalisador():
+    """Execução incremental das etapas de análise (reaproveita as matrizes do cache de decodificação)."""
+    return Reanalisador(obter_cache())
+
+reanalisador = obter_reanalisador()
+
+@st.cache_resource
+def obter_fila():
+    """Fila de tarefas em segundo plano (relatório, CSV, exportação), compartilhada entre reruns."""
+    return FilaTarefas()
+
+fila = obter_fila()
+
+@st.cache_resource
+def obter_banco():
+    """Banco de resultados persistente (SQLite + arrays), compartilhado entre sessões e usuários."""
+    return BancoResultados()
+
+banco = obter_banco()
+
+@st.cache_resource
+def obter_cache_render():
+    """Mapas de calor já codificados (memória + disco), os mesmos do relatório PDF."""
+    return cache_padrao()
+
+cache_render = obter_cache_render()
+TAMANHO_PAGINA = 200
+
+def abrir_projeto(projeto):
+    """Amostras do projeto como coleção lida sob demanda e tabela colunar montada das colunas do banco."""
+    with etapa('app.abrir_projeto'):
+        st.session_state['dados'] = ColecaoAmostras(banco, projeto)
+        st.session_state['tabela'] = TabelaResultados.de_dataframe(banco.colunas(projeto))
+    st.session_state.pop('piramides', None)
+    registrar_gravacao(projeto)
+
+def registrar_gravacao(projeto):
+    """Guarda a assinatura do projeto depois de gravar, para não reabrir por causa da própria gravação."""
+    st.session_state['projeto'] = projeto
+    st.session_state['assinatura_banco'] = banco.assinatura(projeto)
+
+def obter_series(tabela, valor):
+    """Séries temporais da tabela, reconstruídas só quando ela muda; as métricas ficam em cache nelas."""
+    chave = (id(tabela), tabela.versao, valor)
+    guardadas = st.session_state.get('series')
+    if guardadas is None or guardadas[0] != chave:
+        with etapa('app.montar_series', amostras=len(tabela)):
+            guardadas = (chave, SeriesTemporais(tabela.tabela(), valor))
+        st.session_state['series'] = guardadas
+    return guardadas[1]
+
+def _referencia_cwsi(texto):
+    """Campo de referência do CWSI: vazio -> None, número -> °C, outro texto -> nome da Planta de referência."""
+    texto = texto.strip()
+    if not texto:
+        return None
+    try:
+        return float(texto.replace(',', '.'))
+    except ValueError:
+        return texto
+
+def _ler_arquivo(caminho):
+    with open(caminho, 'rb') as f:
+        return f.read()
+
+MIME = {'.pdf': "application/pdf", '.zip': "application/zip", '.csv': "text/csv"}
+ROTULO_ESTADO = {CONCLUIDA: "pronta", ERRO: "erro", CANCELADA: "cancelada", INTERROMPIDA: "interrompida"}
+
+def painel_tarefas(projeto, sessao):
+    """
+    Lista as tarefas do projeto em segundo plano com progresso e download do resultado;
+    cancelar e remover só aparecem nas tarefas enfileiradas por esta sessão.
+    """
+    tarefas = fila.tarefas(projeto)[:6]
+    if not tarefas:
+        return
+    st.subheader("Tarefas")
+    for t in tarefas:
+        st.caption(t.descricao)
+        if t.ativa:
+            c1, c2 = st.columns([3, 1])
+            c1.progress(t.progresso, text=t.mensagem or "Na fila...")
+            if t.dono == sessao and c2.button("✕", key=f"cancelar_{t.id}", help="Cancelar"):
+                fila.cancelar(t.id, sessao)
+        elif t.estado == CONCLUIDA and t.arquivo and os.path.exists(t.arquivo):
+            c1, c2 = st.columns([3, 1])
+            # Lido só no clique (callable), não a cada atualização do painel
+            c1.download_button(f"Baixar {os.path.basename(t.arquivo)}", lambda c=t.arquivo: _ler_arquivo(c),
+                               os.path.basename(t.arquivo), MIME.get(os.path.splitext(t.arquivo)[1]),
+                               key=f"baixar_{t.id}", on_click='ignore', width='stretch')
+            if t.dono == sessao and c2.button("🗑", key=f"remover_{t.id}", help="Remover"):
+                fila.remover(t.id, sessao)
+                st.rerun(scope='fragment')
+        else:
+            st.caption(f"{ROTULO_ESTADO.get(t.estado, t.estado)}{': ' + t.erro if t.erro else ''}")
+
+def arquivos_campanha(enviados, caminho_servidor):
+    """
+    JPEGs enviados, entradas dos ZIPs enviados e imagens da pasta/ZIP no servidor. As listagens
+    ficam na sessão: o mesmo arquivo continua sendo o mesmo objeto (buffer e hash reaproveitados).
+    """
+    zips = st.session_state.setdefault('zips_enviados', {})
+    ativos = {e.file_id for e in enviados or []}
+    for file_id in set(zips) - ativos:
+        del zips[file_id]
+    arquivos = []
+    for enviado in enviados or []:
+        if not enviado.name.lower().endswith('.zip'):
+            arquivos.append(enviado)
+            continue
+        if enviado.file_id not in zips:
+            try:
+                zips[enviado.file_id] = arquivos_do_zip(enviado)
+            except (ValueError, zipfile.BadZipFile) as e:
+                st.sidebar.error(f"{enviado.name}: {e}")
+                zips[enviado.file_id] = []
+        arquivos.extend(zips[enviado.file_id])
+    if caminho_servidor:
+        try:
+            do_servidor = arquivos_do_caminho(caminho_servidor, raiz_servidor(),
+                                              st.session_state.get('arquivos_servidor'))
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            st.sidebar.error(f"Não foi possível ler '{caminho_servidor}': {e}")
+            do_servidor = []
+        st.session_state['arquivos_servidor'] = {a.file_id: a for a in do_servidor}
+        arquivos.extend(do_servidor)
+    return arquivos
+
+# --- LÓGICA RADIOMÉTRICA ---
+
+def processar_termica_radiometrica(caixa, tamanho_visual, par, parametros, img_visual=None, anterior=None):
+    """
+    Analisa (ou reanalisa, a partir de `anterior`) o recorte do par: decodificação, conversão para °C,
+    alinhamento da caixa com a grade nativa do sensor (80x60 continua 80x60), máscara da planta e
+    estatísticas. Retorna (resultado, etapas refeitas); em caso de erro, mostra a mensagem e retorna (None, None).
+    """
+    try:
+        return reanalisador.analisar(origem_do_par(par, caixa, tamanho_visual), parametros, par['thermal'],
+                                     img_visual, anterior)
+    except Exception as e:
+        st.error(f"Erro na análise do recorte: {e}")
+        return None, None
+
+def processar_rois_radiometricas(caixas, tamanho_visual, par, parametros, img_visual=None):
+    """
+    Várias plantas na mesma imagem: uma conversão para °C para todas as caixas e as estatísticas numa
+    passada só (Reanalisador.analisar_lote). Retorna a lista de resultados; se alguma falhar, mostra o
+    erro e retorna None.
+    """
+    itens = [{'origem': origem_do_par(par, caixa, tamanho_visual), 'arquivo_termica': par['thermal'],
+              'visual': img_visual} for caixa in caixas]
+    resultados = []
+    for k, (resultado, _, erro) in enumerate(reanalisador.analisar_lote(itens, parametros), 1):
+        if erro:
+            st.error(f"Erro na análise do recorte {k}: {erro}")
+            return None
+        resultados.append(resultado)
+    return resultados
+
+def reanalisar_sessao(parametros, pares):
+    """
+    Refaz só as etapas afetadas pela mudança de parâmetros em cada amostra, em blocos (a conversão
+    para °C de um bloco é feita numa pilha só); atualiza a tabela linha a linha.
+    """
+    dados, tabela = st.session_state['dados'], st.session_state['tabela']
+    atualizadas, etapas, falhas = 0, set(), []
+    # Gravações agrupadas em transações de lote no banco
+    with dados.em_lote():
+        for i, amostra, refeitas, erro in reanalisador.reanalisar_amostras(dados, pares, parametros, BLOCO_REANALISE):
+            if erro:
+                falhas.append(f"{amostra.meta['Planta']}: {erro}")
+                continue
+            dados[i] = amostra
+            tabela.atualizar(i, amostra.linha())
+            st.session_state.get('piramides', {}).pop(dados.id(i), None)
+            atualizadas += 1
+            etapas.update(refeitas)
+    registrar_gravacao(dados.projeto)
+    return atualizadas, [e for e in ETAPAS if e in etapas], falhas
+
+# --- INTERFACE ---
+
+if 'idx' not in st.session_state: st.session_state['idx'] = 0
+# Identifica esta sessão como dona das tarefas que ela enfileira
+sessao = st.session_state.setdefault('sessao', uuid.uuid4().hex)
+if 'precarga' not in st.session_state: st.session_state['precarga'] = PreCarregador(cache)
+if 'indice_pares' not in st.session_state: st.session_state['indice_pares'] = IndicePares()
+
+st.title("🌱 Análise térmica de plantas")
+
+with st.sidebar:
+    st.header("Upload")
+    enviados = st.file_uploader("Pares de imagens ou ZIP da campanha", type=['jpg', 'jpeg', 'zip'],
+                                accept_multiple_files=True)
+    # Só com uma raiz configurada, e nunca fora dela: qualquer visitante do app pode digitar o caminho
+    raiz = raiz_servidor()
+    caminho_servidor = st.text_input("Pasta ou ZIP no servidor", placeholder="campanha",
+                                     help=f"Lido direto do disco do servidor, sem upload (para campanhas "
+                                          f"grandes), relativo a {raiz}.").strip() if raiz else ''
+    projeto = st.text_input("Projeto", value="campanha",
+                            help="As amostras ficam gravadas no banco de resultados por projeto; "
+                                 "quem abrir o mesmo projeto vê as mesmas amostras.").strip() or "campanha"
+    st.divider()
+    with st.popover("Reiniciar", help="Apaga do banco as amostras deste projeto."):
+        st.warning(f"Apaga do banco as {banco.contar(projeto)} amostra(s) do projeto '{projeto}' "
+                   "para todos os usuários que o abrirem. Não pode ser desfeito.")
+        apagar = st.button("Apagar projeto", type="primary")
+    if apagar:
+        banco.remover_projeto(projeto)
+        st.session_state['idx'] = 0
+        st.session_state.pop('projeto', None)
+        st.session_state.pop('parametros_analise', None)
+        st.rerun()
+    ponderar_area = st.checkbox("Ponderar pixels de borda pela área", value=True,
+                                help="Pixels do sensor parcialmente dentro do recorte entram na média proporcionalmente à área coberta.")
+    segmentacao = st.selectbox("Segmentação automática", list(METODOS), format_func=METODOS.get,
+                               help="Separa planta e fundo dentro do recorte antes do cálculo. 'Térmica' considera planta a classe mais fria.")
+    # Preenchido depois de abrir o projeto (a emissividade por tratamento lista os tratamentos dele)
+    area_correcao = st.container()
+    with st.expander("Pré-carregamento"):
+        precarga = st.session_state['precarga']
+        precarga.antecipar = st.number_input("Próximos pares a preparar", 0, 20, ANTECIPAR,
+                                             help="Decodificados em segundo plano enquanto o par atual é recortado.")
+        precarga.orcamento = st.number_input("Memória máxima (MB)", 16, 4096, ORCAMENTO_PADRAO // 1024 ** 2) * 1024 ** 2
+    # Preenchido no fim do script, para já listar uma tarefa enfileirada nesta execução
+    area_tarefas = st.container()
+    st.caption(f"Cache de decodificação — {cache.resumo()} · {perfis_carregados()} perfil(is) de câmera")
+
+# Outro projeto, ou alguém (outra sessão, o lote) gravou neste: relê as colunas do banco
+if st.session_state.get('projeto') != projeto:
+    st.session_state['idx'] = 0
+    abrir_projeto(projeto)
+elif st.session_state.get('assinatura_banco') != banco.assinatura(projeto):
+    abrir_projeto(projeto)
+dados = st.session_state['dados']
+# Preenchido no fim do script, depois que as abas carregaram as amostras que usam
+area_amostras = st.sidebar.empty()
+
+with area_correcao.expander("Correção radiométrica"):
+    st.caption("Substitui os valores gravados pela câmera; vazio usa o do arquivo. "
+               "A conversão é refeita sobre as contagens brutas, sem decodificar as imagens de novo.")
+    emissividade = st.number_input("Emissividade", 0.01, 1.0, value=None, step=0.01, placeholder="Do arquivo")
+    tratamentos = st.session_state['tabela'].categorias('Tratamento')
+    emissividade_tratamento = {}
+    if tratamentos:
+        editada = st.data_editor(
+            pd.DataFrame({'Tratamento': tratamentos, 'Emissividade': pd.Series([None] * len(tratamentos), dtype=float)}),
+            column_config={'Emissividade': st.column_config.NumberColumn(
+                min_value=0.01, max_value=1.0, step=0.01, help="Por tratamento; tem prioridade sobre a global.")},
+            disabled=['Tratamento'], hide_index=True, key=f"emissividade_tratamento_{projeto}")
+        emissividade_tratamento = {t: float(e) for t, e in zip(editada['Tratamento'], editada['Emissividade'])
+                                   if pd.notna(e)}
+    ambiente = {
+        'reflected_apparent_temperature': st.number_input("Temperatura refletida (°C)", -100.0, 500.0, value=None,
+                                                          placeholder="Do arquivo"),
+        'atmospheric_temperature': st.number_input("Temperatura do ar (°C)", -100.0, 100.0, value=None,
+                                                   placeholder="Do arquivo"),
+        'relative_humidity': st.number_input("Umidade relativa (%)", 0.0, 100.0, value=None, placeholder="Do arquivo"),
+        'object_distance': st.number_input("Distância (m)", 0.0, 10000.0, value=None, placeholder="Do arquivo"),
+    }
+parametros = {'ponderar_area': ponderar_area, 'segmentacao': segmentacao, 'emissividade': emissividade,
+              'ambiente': {c: v for c, v in ambiente.items() if v is not None} or None,
+              'emissividade_tratamento': emissividade_tratamento or None}
+
+# Uploads, entradas de ZIP e arquivos do servidor; o conteúdo só é lido quando usado
+files = arquivos_campanha(enviados, caminho_servidor)
+# Índice incremental: a cada rerun só os arquivos novos do upload são interpretados
+indice_pares = st.session_state['indice_pares'].sincronizar(files or [])
+pares = indice_pares.pares()
+avisos_pareamento = indice_pares.avisos()
+if avisos_pareamento:
+    with st.sidebar.expander(f"Pareamento: {len(avisos_pareamento)} aviso(s)"):
+        for aviso in avisos_pareamento:
+            st.warning(aviso)
+# Parâmetros mudaram: cada amostra refaz só as etapas afetadas (sem recortar de novo)
+if dados and st.session_state.get('parametros_analise', parametros) != parametros:
+    with st.spinner("Reanalisando amostras..."), etapa('app.reanalise', amostras=len(dados)):
+        n_atualizadas, etapas_refeitas, falhas_reanalise = reanalisar_sessao(parametros, pares)
+    if n_atualizadas:
+        st.toast(f"{n_atualizadas} amostra(s) reanalisada(s) · etapas: {', '.join(etapas_refeitas)}")
+    for falha in falhas_reanalise:
+        st.sidebar.warning(f"Reanálise não aplicada — {falha}")
+st.session_state['parametros_analise'] = parametros
+# Prepara os próximos pares em segundo plano; um novo upload cancela o que estava pendente
+precarga.atualizar(pares, st.session_state['idx'], assinatura_upload(files))
+st.sidebar.caption(f"Pré-carregamento — {precarga.resumo()}")
+tab_edit, tab_dash = st.tabs(["Editor de recorte", "Dashboard"])
+
+# Aba 1: Editor
+with tab_edit:
+    if pares:
+        if st.session_state['idx'] < len(pares):
+            par = pares[st.session_state['idx']]
+            meta = par['meta']
+            st.subheader(f"Processando: {meta['Planta']} - {meta['Tratamento']}")
+            c1, c2 = st.columns(2)
+            
+            with etapa('app.aguardar_precarga'):
+                precarga.aguardar(par['id'])
+            with etapa('app.carregar_imagens'):
+                # A visual só é exibida (e vira miniatura): prévia decodificada já reduzida
+                img_vis_previa = cache.imagem(par['visual'], LADO_PREVIA) if par['visual'] else None
+                img_therm_full = cache.imagem(par['thermal'])
+            
+            with c1:
+                if img_vis_previa: st.image(img_vis_previa, use_column_width=True, caption="Visual")
+            with c2:
+                if segmentacao == 'nenhuma':
+                    st.caption("⚠️ Recorte apenas a área da planta. Todos os pixels do retângulo serão calculados.")
+                else:
+                    st.caption(f"Recorte a região da planta. Dentro do retângulo, só os pixels classificados como planta ({METODOS[segmentacao]}) serão calculados.")
+                caixa = st_cropper(img_therm_full, realtime_update=True, box_color='#FF0000', aspect_ratio=None,
+                                   return_type='box', key=f"c_{par['id']}")
+                caixa_xywh = (caixa['left'], caixa['top'], caixa['width'], caixa['height'])
+
+                # Várias plantas na mesma imagem: cada recorte adicionado vira uma amostra com Planta/Réplica próprias
+                plantas = st.session_state.setdefault(f"plantas_{par['id']}", [])
+                m1, m2 = st.columns(2)
+                planta = m1.text_input("Planta", value=meta['Planta'], key=f"planta_{par['id']}")
+                replica = m2.text_input("Réplica", value=meta.get('Replica', 'N/A'), key=f"replica_{par['id']}")
+                if st.button("Adicionar planta", width='content',
+                             help="Guarda este recorte e permite recortar outra planta da mesma imagem"):
+                    plantas.append({'caixa': caixa_xywh, 'Planta': planta, 'Replica': replica})
+                if plantas:
+                    st.caption(f"{len(plantas)} planta(s) nesta imagem: "
+                               + ", ".join(f"{p['Planta']} ({p['Replica']})" for p in plantas)
+                               + ". Confirmar salva as adicionadas.")
+                    if st.button("Limpar plantas", width='content'):
+                        plantas.clear()
+                        st.rerun()
+
+                if st.button("Confirmar", type="primary", width='content'):
+                    # Sem plantas adicionadas, vale o recorte atual (uma planta por imagem)
+                    plantas = plantas or [{'caixa': caixa_xywh, 'Planta': planta, 'Replica': replica}]
+                    with st.spinner("Extraindo temperaturas reais..."):
+                        # Resolução cheia da visual só se a segmentação usar
+                        visual = (lambda v=par['visual']: cache.imagem(v)) if par['visual'] else None
+                        resultados = processar_rois_radiometricas([p['caixa'] for p in plantas], img_therm_full.size,
+                                                                  par, parametros, visual)
+                    
+                    if resultados:
+                        # Registro compacto: matriz nativa em float32 e miniaturas JPEG, sem objetos PIL;
+                        # origem e impressões das etapas permitem reanalisar sem recortar de novo
+                        with etapa('app.registro_amostra', plantas=len(plantas)):
+                            novas = []
+                            for p, resultado in zip(plantas, resultados):
+                                x, y, w, h = p['caixa']
+                                novas.append(Amostra.criar(
+                                    dict(meta, Planta=p['Planta'], Replica=p['Replica']), resultado['stats'],
+                                    resultado['matriz'], resultado['caixa_sensor'], img_vis_previa,
+                                    img_therm_full.crop((x, y, x + w, y + h)), resultado['mascara'],
+                                    resultado['origem'], resultado['impressoes']))
+                            # Todas as plantas da imagem numa transação só
+                            dados.extend(novas)
+                            for amostra in novas:
+                                st.session_state['tabela'].adicionar(amostra.linha())
+                            registrar_gravacao(projeto)
+                        st.session_state.pop(f"plantas_{par['id']}", None)
+                        medias = ", ".join(f"{r['stats']['Temp_Media']:.1f}°C" for r in resultados)
+                        st.toast(f"Salvo! Média: {medias}")
+                        st.session_state['idx'] += 1
+                        st.rerun()
+        else:
+            st.success("Todas as imagens foram processadas!")
+    else:
+        st.info("Faça o upload das imagens na barra lateral.")
+
+# Aba 2: Dashboard
+with tab_dash:
+    if dados:
+        # Importado só quando há amostras para plotar: a partida a frio não paga o Plotly Express
+        import plotly.express as px
+        # Tabela colunar montada do banco e mantida a cada amostra confirmada; agregados e filtros ficam em cache
+        tabela = st.session_state['tabela']
+        df = tabela.tabela()
+        
+        # --- SEÇÃO 1: INSPECTOR INTERATIVO (NOVIDADE) ---
+        st.markdown("### Inspeção de pixels")
+        st.info("Selecione uma amostra para visualizar o mapa térmico radiométrico completo da área recortada. Passe o mouse sobre os pixels para ver a temperatura exata; em recortes grandes, arraste sobre o mapa para ampliar uma região até a resolução do sensor.")
+        
+        # Lista paginada lida do banco: só os rótulos da página, nenhuma amostra é carregada
+        n_paginas = (len(dados) - 1) // TAMANHO_PAGINA + 1
+        pagina = st.number_input("Página", 1, n_paginas, 1) - 1 if n_paginas > 1 else 0
+        rotulos = {r.id: f"{r.Planta} ({r.Tratamento})" for r in banco.pagina(projeto, pagina, TAMANHO_PAGINA).itertuples()}
+        if st.toggle("Mostrar miniaturas dos mapas térmicos"):
+            # JPEGs do cache de renderização, por ID e versão da amostra: a matriz só é lida do disco na falta
+            with etapa('app.miniaturas_mapas'):
+                versoes = banco.versoes(rotulos)
+                miniaturas = [cache_render.obter(lambda i=i: banco.matriz(i), chave=f"{banco.caminho}:{i}:{versoes[i]}",
+                                                 formato='jpeg', lado_minimo=120) for i in rotulos]
+            st.image(miniaturas, caption=list(rotulos.values()), width=120)
+            st.caption(f"Cache de renderização — {cache_render.resumo()}")
+        id_escolhido = st.selectbox("Escolha a amostra para inspecionar:", list(rotulos), format_func=rotulos.get)
+        
+        idx_escolhido = dados.posicao(id_escolhido) if id_escolhido is not None else None
+        amostra = dados[idx_escolhido] if idx_escolhido is not None else None
+        if idx_escolhido is not None and amostra is None:
+            st.warning("Esta amostra foi apagada do banco por outra sessão; a lista será relida na próxima interação.")
+        if amostra is not None:
+            escolha = rotulos[id_escolhido]
+            # Pirâmide de níveis de detalhe calculada uma vez por amostra
+            piramides = st.session_state.setdefault('piramides', {})
+            if id_escolhido not in piramides:
+                with etapa('app.piramide_inspetor'):
+                    piramides[id_escolhido] = Piramide(amostra.matriz)
+            piramide = piramides[id_escolhido]
+            
+            # Selecionar uma região (arrastando) envia só os blocos dela, no nível mais fino que cabe
+            versao = st.session_state.get(f"insp_v_{id_escolhido}", 0)
+            chave = f"insp_{id_escolhido}_{versao}"
+            evento = st.session_state.get(chave)
+            caixas = evento.selection.get('box', []) if evento else []
+            janela = janela_da_selecao(caixas[-1], piramide.forma) if caixas else None
+            
+            fig_pixel = figura(piramide, janela, titulo=f"Termografia: {escolha}")
+            st.plotly_chart(fig_pixel, width='stretch', on_select='rerun', selection_mode='box', key=chave)
+            if janela and st.button("Ver recorte inteiro"):
+                st.session_state[f"insp_v_{id_escolhido}"] = versao + 1
+                st.rerun()
+
+            # Editar a ROI desta amostra: refaz alinhamento, máscara e estatísticas só dela
+            par_amostra = next((p for p in pares if amostra.origem and p['id'] == amostra.origem['id']), None)
+            with st.expander("Editar recorte desta amostra"):
+                if par_amostra is None:
+                    st.caption("O par desta amostra não está no upload atual.")
+                else:
+                    img_therm = cache.imagem(par_amostra['thermal'])
+                    x, y, w, h = amostra.origem['caixa']
+                    img_crop_ed, caixa_ed = st_cropper(img_therm, realtime_update=True, box_color='#FF0000',
+                                                       default_coords=(int(x), int(x + w), int(y), int(y + h)),
+                                                       return_type='both', key=f"reeditar_{id_escolhido}")
+                    if st.button("Reanalisar com este recorte"):
+                        caixa_xywh = (caixa_ed['left'], caixa_ed['top'], caixa_ed['width'], caixa_ed['height'])
+                        visual = (lambda v=par_amostra['visual']: cache.imagem(v)) if par_amostra['visual'] else None
+                        with etapa('app.reanalise_roi'):
+                            resultado, refeitas = processar_termica_radiometrica(
+                                caixa_xywh, img_therm.size, par_amostra, parametros, visual, anterior=amostra)
+                        if resultado:
+                            dados[idx_escolhido] = amostra.reanalisada(resultado, img_crop_ed)
+                            st.session_state['tabela'].atualizar(idx_escolhido, dados[idx_escolhido].linha())
+                            registrar_gravacao(projeto)
+                            piramides.pop(id_escolhido, None)
+                            st.toast(f"Recorte atualizado · etapas refeitas: {', '.join(refeitas)}")
+                            st.rerun()
+                        elif refeitas is not None:
+                            st.info("Recorte sem alterações.")
+
+        st.divider()
+
+        # --- SEÇÃO 2: GRÁFICOS ESTATÍSTICOS (RESTAURADOS) ---
+        st.subheader("Análise estatística")
+        
+        cf1, cf2 = st.columns(2)
+        sel_trat = cf1.multiselect("Filtrar tratamento", tabela.categorias('Tratamento'), default=tabela.categorias('Tratamento'))
+        sel_per = cf2.multiselect("Filtrar período", tabela.categorias('Periodo'), default=tabela.categorias('Periodo'))
+        
+        with etapa('app.filtros_dashboard'):
+            df_chart = tabela.filtrar(Tratamento=sel_trat, Periodo=sel_per)
+            df_grupos = tabela.agregados(Tratamento=sel_trat, Periodo=sel_per)
+
+        if not df_chart.empty:
+            
+            # Gráfico 1: Barras
+            st.markdown("### Comparação de médias")
+            fig_bar = px.bar(
+                df_grupos, 
+                x="Tratamento", 
+                y="Temp_Media", 
+                color="Periodo", 
+                barmode='group', 
+                text_auto='.1f',
+                color_discrete_sequence=px.colors.qualitative.Pastel # Cor restaurada
+            )
+            fig_bar.update_layout(yaxis_title="Temp média (°C)")
+            st.plotly_chart(fig_bar, width='stretch')
+
+            st.divider()
+            
+            # Gráfico 2 e 3: Heatmap e Boxplot
+            col_heat, col_box = st.columns(2)
+
+            with col_heat:
+                st.markdown("### Mapa de calor (tratamento x período)")
+                try:
+                    heatmap_data = df_grupos.pivot(index='Tratamento', columns='Periodo', values='Temp_Media')
+                    fig_heat = px.imshow(
+                        heatmap_data, 
+                        text_auto='.1f', 
+                        aspect="auto",
+                        color_continuous_scale='RdBu_r', # Escala restaurada
+                        origin='lower'
+                    )
+                    st.plotly_chart(fig_heat, width='stretch')
+                except:
+                    st.warning("Dados insuficientes para gerar o heatmap.")
+
+            with col_box:
+                st.markdown("### Distribuição e outliers")
+                fig_box = px.box(
+                    df_chart, 
+                    x="Tratamento", 
+                    y="Temp_Media", 
+                    color="Periodo", 
+                    points="all",
+                    color_discrete_sequence=px.colors.qualitative.Pastel # Cor restaurada
+                )
+                fig_box.update_layout(yaxis_title="Temp (°C)")
+                st.plotly_chart(fig_box, width='stretch')
+
+        else:
+            st.warning("Sem dados para os filtros selecionados.")
+            
+        st.divider()
+
+        # --- SÉRIES TEMPORAIS (cada planta ao longo das réplicas e períodos) ---
+        st.subheader("Séries temporais")
+        cs1, cs2, cs3 = st.columns(3)
+        metrica = cs1.selectbox("Métrica", list(METRICAS), format_func=METRICAS.get, key="serie_metrica")
+        agrupar = cs2.selectbox("Agrupar por", list(CHAVES_SERIE), index=CHAVES_SERIE.index('Tratamento'),
+                                key="serie_grupo")
+        valor_serie = cs3.selectbox("Estatística da amostra", list(COLUNAS_STATS), key="serie_valor")
+        parametros_serie = {}
+        if metrica == 'cwsi':
+            cr1, cr2 = st.columns(2)
+            ajuda = ("Temperatura em °C ou nome da Planta de uma ROI de referência recortada na mesma imagem. "
+                     "Vazio: a planta mais {} de cada réplica e período.")
+            umida = cr1.text_input("Referência úmida", placeholder="planta mais fria", help=ajuda.format("fria"))
+            seca = cr2.text_input("Referência seca", placeholder="planta mais quente", help=ajuda.format("quente"))
+            parametros_serie = {'umida': _referencia_cwsi(umida), 'seca': _referencia_cwsi(seca)}
+        elif metrica in ('media_movel', 'inclinacao'):
+            cr1, cr2 = st.columns(2)
+            janela_serie = cr1.number_input("Janela (réplicas)", 1, 100, 3)
+            base_serie = cr2.selectbox("Sobre", ['valor', 'delta_dia_noite', 'cwsi'], format_func=METRICAS.get)
+            parametros_serie = {'janela': int(janela_serie), 'base': base_serie}
+
+        series = obter_series(tabela, valor_serie)
+        try:
+            with etapa('app.series_temporais', metrica=metrica):
+                df_serie = series.por_grupo(metrica, agrupar, **parametros_serie)
+        except ValueError as e:
+            st.warning(str(e))
+            df_serie = None
+        if df_serie is not None and not df_serie.empty:
+            fig_serie = px.line(df_serie, x=series.coluna_tempo, y=metrica, color=agrupar,
+                                line_dash=series.coluna_periodo, markers=True, error_y='Desvio_Grupo',
+                                category_orders={series.coluna_tempo: series.tempos},
+                                color_discrete_sequence=px.colors.qualitative.Pastel)
+            fig_serie.update_layout(yaxis_title=METRICAS[metrica], xaxis_title="Réplica")
+            st.plotly_chart(fig_serie, width='stretch')
+        elif df_serie is not None:
+            st.info("Sem observações suficientes para esta métrica.")
+
+        st.divider()
+
+        # --- TABELA DE RESULTADOS (paginada no banco, com os mesmos filtros) ---
+        st.subheader("Tabela de resultados")
+        filtros = {'Tratamento': sel_trat, 'Periodo': sel_per}
+        n_filtradas = banco.contar(projeto, **filtros)
+        n_paginas_tabela = max(1, (n_filtradas - 1) // TAMANHO_PAGINA + 1)
+        pagina_tabela = st.number_input(f"Página ({n_filtradas} amostra(s), {TAMANHO_PAGINA} por página)",
+                                        1, n_paginas_tabela, 1, key="pagina_tabela") - 1
+        st.dataframe(banco.pagina(projeto, pagina_tabela, TAMANHO_PAGINA, **filtros).drop(columns='id'),
+                     width='stretch', hide_index=True)
+
+        st.divider()
+
+        # --- SEÇÃO 3: DOWNLOAD ---
+        st.subheader("Relatório e exportação")
+        cd1, cd2, cd3 = st.columns(3)
+        # Geração em segundo plano (fila de tarefas): o Editor continua livre e o
+        # resultado aparece para download em "Tarefas", na barra lateral
+        # Cópia com os IDs atuais, lida do banco em blocos pela tarefa
+        amostras = dados.instantaneo()
+        n = len(amostras)
+        with cd1:
+            if st.button("Gerar tabela (CSV)", width='stretch'):
+                tabela_csv = df.copy()
+                def gerar_csv(destino, progresso):
+                    with etapa('tarefa.csv', amostras=n):
+                        return gravar_csv(tabela_csv, destino, progresso)
+                fila.submeter('csv', f"Tabela CSV ({n} amostras)", gerar_csv, "dados_radiometricos.csv",
+                              projeto, sessao)
+        with cd2:
+            if st.button("Gerar relatório PDF completo", width='stretch'):
+                # Páginas renderizadas em partes paralelas e gravadas em disco, não em memória
+                def gerar_pdf(destino, progresso):
+                    from termografia.relatorio import gerar_relatorio
+                    with etapa('tarefa.relatorio_pdf', amostras=n):
+                        return gerar_relatorio(amostras, destino, progresso=progresso)
+                fila.submeter('pdf', f"Relatório PDF ({n} amostras)", gerar_pdf, "relatorio_tecnico", projeto, sessao)
+        with cd3:
+            if st.button("Exportar matrizes térmicas", width='stretch',
+                         help="Matrizes nativas, máscaras e metadados de todas as amostras (.npy + índice), para análise externa."):
+                def gerar_exportacao(destino, progresso):
+                    from termografia.exportacao import exportar_zip
+                    with etapa('tarefa.exportacao_matrizes', amostras=n):
+                        return exportar_zip(amostras, destino, progresso)
+                fila.submeter('exportacao', f"Matrizes térmicas ({n} amostras)", gerar_exportacao,
+                              "matrizes_termicas.zip", projeto, sessao)
+    else:
+        st.info("Processe as imagens primeiro na aba 'Editor de recorte'.")
+
+with area_tarefas:
+    # Com tarefas em andamento, só o painel se atualiza sozinho (a cada segundo)
+    st.fragment(painel_tarefas, run_every=1.0 if fila.ha_ativas(projeto) else None)(projeto, sessao)
+
+if dados:
+    n_memoria, ocupacao = dados.memoria()
+    area_amostras.caption(f"Amostras no projeto: {len(dados)} · {n_memoria} em memória, {ocupacao / 1024:.0f} KB"
+                          + (f" ({ocupacao / n_memoria / 1024:.1f} KB por amostra)" if n_memoria else ""))
+
+exibir_painel()
\ No newline at end of file
@@ -0,0 +1,36 @@
+import streamlit as st
+
+from termografia import instrumentacao
+
+# Painel "Performance" da barra lateral, compartilhado pelo app e pelas ferramentas de debug
+
+def _alternar():
+    """A instrumentação é do processo: só muda quando alguém mexe num dos botões."""
+    ligado = st.session_state['perf_ativo']
+    instrumentacao.ativar(ligado, st.session_state['perf_memoria'] and ligado)
+
+def exibir_painel():
+    """Expander na barra lateral com o resumo das etapas medidas e as exportações."""
+    # Os botões mostram o estado atual do processo, que outra sessão pode ter mudado
+    st.session_state['perf_ativo'] = instrumentacao.ativo()
+    st.session_state['perf_memoria'] = instrumentacao.medindo_memoria()
+    with st.sidebar.expander("Performance"):
+        ligado = st.toggle("Instrumentação ativa", key="perf_ativo", on_change=_alternar)
+        st.toggle("Medir memória alocada (mais lento)", key="perf_memoria", on_change=_alternar, disabled=not ligado)
+
+        resumo = instrumentacao.resumo()
+        if not resumo:
+            st.caption("Nenhuma etapa registrada ainda.")
+            return
+        st.dataframe(resumo, hide_index=True, width='stretch')
+        recentes = instrumentacao.registros()[-15:][::-1]
+        st.caption("Últimas etapas: " + " · ".join(f"{r['nome']} {r['duracao_s'] * 1000:.0f} ms" for r in recentes))
+
+        # Exportações montadas só no clique (o buffer pode ter milhares de etapas)
+        c1, c2 = st.columns(2)
+        c1.download_button("JSON", instrumentacao.exportar_json, "etapas.json", "application/json", width='stretch')
+        c2.download_button("Chrome trace", instrumentacao.exportar_chrome_trace, "trace.json", "application/json",
+                           width='stretch', help="Abra em chrome://tracing ou ui.perfetto.dev")
+        if st.button("Limpar registros", width='stretch'):
+            instrumentacao.limpar()
+            st.rerun()
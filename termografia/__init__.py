@@ -0,0 +1 @@
+"""Núcleo de processamento termográfico (sem dependência de interface)."""
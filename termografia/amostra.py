@@ -0,0 +1,100 @@
+"""
+Registro compacto de uma amostra processada, guardado na sessão.
+
+Em vez de imagens PIL em resolução cheia e da matriz ampliada em float64,
+cada amostra guarda a matriz do recorte na grade nativa do sensor (float32,
+sem referência à matriz inteira) e as imagens como miniaturas JPEG em bytes.
+As visualizações em tamanho cheio (mapa de calor do Dashboard, páginas do
+PDF) são refeitas a partir desses dados quando exibidas.
+"""
+import io
+import sys
+from dataclasses import dataclass, replace
+
+import numpy as np
+from PIL import Image
+
+from termografia.renderizacao import codificar_jpeg
+
+LADO_MINIATURA = 640
+
+
+def miniatura_jpeg(img, lado=LADO_MINIATURA):
+    """JPEG em bytes da imagem PIL reduzida para caber em `lado` x `lado`."""
+    img = img.convert('RGB')
+    if max(img.size) > lado:
+        img = img.copy()
+        img.thumbnail((lado, lado))
+    return codificar_jpeg(np.asarray(img))
+
+
+def _abrir_jpeg(dados):
+    return Image.open(io.BytesIO(dados)) if dados else None
+
+
+@dataclass
+class Amostra:
+    __slots__ = ('meta', 'stats', 'matriz', 'caixa_sensor', 'jpeg_visual', 'jpeg_recorte', 'mascara', 'origem',
+                 'impressoes')
+
+    meta: dict
+    stats: dict
+    matriz: np.ndarray        # recorte em °C, float32, resolução nativa do sensor
+    caixa_sensor: tuple       # (x0, y0, x1, y1) na grade do sensor
+    jpeg_visual: bytes        # miniatura da imagem visual do par (b'' se não houver)
+    jpeg_recorte: bytes       # miniatura do recorte da imagem térmica exibida
+    mascara: object           # máscara booleana da planta com a forma de `matriz`, ou None sem segmentação
+    origem: object            # entradas da análise (ID do par, hashes, caixa exibida) para reanálise, ou None
+    impressoes: object        # impressão digital de cada etapa da análise (termografia.reanalise), ou None
+
+    @classmethod
+    def criar(cls, meta, stats, matriz, caixa_sensor, img_visual, img_recorte, mascara=None, origem=None,
+              impressoes=None):
+        """Monta o registro a partir dos resultados do Editor (imagens PIL em resolução cheia)."""
+        return cls(
+            meta=dict(meta),
+            stats=dict(stats),
+            matriz=np.array(matriz, dtype=np.float32, copy=True),
+            caixa_sensor=tuple(float(v) for v in caixa_sensor),
+            jpeg_visual=miniatura_jpeg(img_visual) if img_visual is not None else b'',
+            jpeg_recorte=miniatura_jpeg(img_recorte),
+            mascara=np.array(mascara, dtype=bool, copy=True) if mascara is not None else None,
+            origem=dict(origem) if origem is not None else None,
+            impressoes=dict(impressoes) if impressoes is not None else None,
+        )
+
+    def reanalisada(self, resultado, img_recorte=None):
+        """Nova amostra com o resultado de Reanalisador.analisar (e o novo recorte exibido, se a ROI mudou)."""
+        return replace(
+            self,
+            stats=dict(resultado['stats']),
+            matriz=np.array(resultado['matriz'], dtype=np.float32, copy=True),
+            caixa_sensor=tuple(float(v) for v in resultado['caixa_sensor']),
+            jpeg_recorte=miniatura_jpeg(img_recorte) if img_recorte is not None else self.jpeg_recorte,
+            mascara=np.array(resultado['mascara'], dtype=bool, copy=True) if resultado['mascara'] is not None else None,
+            origem=dict(resultado['origem']),
+            impressoes=dict(resultado['impressoes']),
+        )
+
+    def imagem_visual(self):
+        """Imagem visual (PIL) refeita a partir da miniatura, ou None."""
+        return _abrir_jpeg(self.jpeg_visual)
+
+    def imagem_recorte(self):
+        """Recorte da imagem térmica (PIL) refeito a partir da miniatura."""
+        return _abrir_jpeg(self.jpeg_recorte)
+
+    def linha(self):
+        """Metadados + estatísticas numa linha da tabela do Dashboard."""
+        row = self.meta.copy()
+        row.update(self.stats)
+        return row
+
+    def tamanho_bytes(self):
+        """Memória ocupada pelo registro (arrays, miniaturas e dicionários)."""
+        total = sys.getsizeof(self) + self.matriz.nbytes + len(self.jpeg_visual) + len(self.jpeg_recorte)
+        if self.mascara is not None:
+            total += self.mascara.nbytes
+        for d in (self.meta, self.stats):
+            total += sys.getsizeof(d) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in d.items())
+        return total
@@ -0,0 +1,392 @@
+"""
+Banco de resultados persistente, compartilhado entre sessões e usuários.
+
+Metadados, estatísticas, caixa, origem e impressões das etapas de cada
+amostra ficam numa tabela SQLite (modo WAL: leitores não bloqueiam quem
+grava), com índices por projeto + Planta/Ambiente/Tratamento/Período; as
+miniaturas JPEG numa tabela à parte, lida só quando a amostra é aberta. A
+matriz em °C e a máscara de cada amostra são arquivos .npy ao lado do banco.
+
+As amostras são separadas por projeto (campanha). O app trabalha sobre uma
+ColecaoAmostras, que se comporta como a lista de amostras da sessão mas lê
+do banco sob demanda (com um LRU pequeno) e grava em lote:
+
+    banco = BancoResultados('resultados/resultados.db')
+    dados = ColecaoAmostras(banco, 'campanha_2024')
+    dados.append(amostra)          # grava
+    dados[10]                      # lê só a amostra 10
+    banco.pagina('campanha_2024', 0, 100, Tratamento=['controle'])
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+from termografia.amostra import Amostra
+from termografia.tabela import COLUNAS_META, COLUNAS_STATS
+
+CAMINHO_PADRAO = os.path.join('resultados', 'resultados.db')
+COLUNAS_INDICE = ('Planta', 'Ambiente', 'Tratamento', 'Periodo')
+TAMANHO_LOTE = 256
+LIMITE_AMOSTRAS_MEMORIA = 64
+
+_ESQUEMA = f"""
+CREATE TABLE IF NOT EXISTS amostras (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    projeto TEXT NOT NULL,
+    {', '.join(f'{c} TEXT' for c in COLUNAS_META)},
+    {', '.join(f'{c} REAL' for c in COLUNAS_STATS)},
+    caixa_sensor TEXT, origem TEXT, impressoes TEXT,
+    altura INTEGER, largura INTEGER, segmentada INTEGER,
+    atualizada REAL
+);
+CREATE TABLE IF NOT EXISTS miniaturas (
+    amostra INTEGER PRIMARY KEY REFERENCES amostras(id) ON DELETE CASCADE,
+    visual BLOB, recorte BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_amostras_projeto ON amostras(projeto, id);
+{''.join(f'CREATE INDEX IF NOT EXISTS idx_amostras_{c.lower()} ON amostras(projeto, {c});' for c in COLUNAS_INDICE)}
+"""
+
+_COLUNAS_GRAVADAS = COLUNAS_META + COLUNAS_STATS + ('caixa_sensor', 'origem', 'impressoes', 'altura', 'largura',
+                                                   'segmentada', 'atualizada')
+
+
+def _real(valor):
+    return None if valor is None or np.isnan(valor) else float(valor)
+
+
+def _json(valor):
+    return json.dumps(valor) if valor is not None else None
+
+
+def _onde(projeto, filtros):
+    """Cláusula WHERE e parâmetros para projeto + colunas de metadados em listas de valores."""
+    partes, valores = ['projeto = ?'], [projeto]
+    for coluna, selecao in filtros.items():
+        if coluna not in COLUNAS_META:
+            raise ValueError(f"Filtro por coluna desconhecida: {coluna}")
+        selecao = list(selecao) if isinstance(selecao, (list, tuple, set)) else [selecao]
+        if not selecao:
+            partes.append('0')
+            continue
+        partes.append(f"{coluna} IN ({', '.join('?' * len(selecao))})")
+        valores.extend(str(v) for v in selecao)
+    return ' AND '.join(partes), valores
+
+
+class BancoResultados:
+    """Resultados em SQLite (WAL) + matrizes e máscaras em .npy; uma conexão por thread."""
+
+    def __init__(self, caminho=CAMINHO_PADRAO):
+        self.caminho = caminho
+        self.pasta_arrays = os.path.splitext(caminho)[0] + '_arrays'
+        os.makedirs(self.pasta_arrays, exist_ok=True)
+        self._local = threading.local()
+        con = self._conexao()
+        con.executescript(_ESQUEMA)
+        # Bancos criados antes de alguma coluna de estatística (ex.: os percentis) ganham a coluna vazia
+        existentes = {linha[1] for linha in con.execute('PRAGMA table_info(amostras)')}
+        for c in COLUNAS_STATS:
+            if c not in existentes:
+                try:
+                    con.execute(f'ALTER TABLE amostras ADD COLUMN {c} REAL')
+                except sqlite3.OperationalError:
+                    pass  # outro processo acabou de criá-la
+
+    def _conexao(self):
+        con = getattr(self._local, 'conexao', None)
+        if con is None:
+            con = sqlite3.connect(self.caminho, timeout=30, isolation_level=None)
+            con.execute('PRAGMA journal_mode=WAL')
+            con.execute('PRAGMA synchronous=NORMAL')
+            con.execute('PRAGMA foreign_keys=ON')
+            self._local.conexao = con
+        return con
+
+    @contextmanager
+    def _transacao(self):
+        con = self._conexao()
+        con.execute('BEGIN IMMEDIATE')
+        try:
+            yield con
+        except BaseException:
+            con.execute('ROLLBACK')
+            raise
+        con.execute('COMMIT')
+
+    # --- ARRAYS ---
+
+    def _caminho_array(self, id_amostra, tipo):
+        return os.path.join(self.pasta_arrays, f"{id_amostra // 1000:05d}", f"{id_amostra}_{tipo}.npy")
+
+    def _gravar_arrays(self, id_amostra, amostra):
+        for tipo, array in (('matriz', amostra.matriz), ('mascara', amostra.mascara)):
+            caminho = self._caminho_array(id_amostra, tipo)
+            if array is None:
+                if os.path.exists(caminho):
+                    os.remove(caminho)
+                continue
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            temporario = caminho + '.tmp.npy'
+            np.save(temporario, array)
+            os.replace(temporario, caminho)
+
+    def _ler_array(self, id_amostra, tipo):
+        caminho = self._caminho_array(id_amostra, tipo)
+        return np.load(caminho) if os.path.exists(caminho) else None
+
+    # --- GRAVAÇÃO ---
+
+    @staticmethod
+    def _valores(amostra):
+        meta, stats = amostra.meta, amostra.stats
+        altura, largura = amostra.matriz.shape
+        return ([str(meta.get(c, 'N/A')) for c in COLUNAS_META] + [_real(stats.get(c)) for c in COLUNAS_STATS]
+                + [_json(list(amostra.caixa_sensor)), _json(amostra.origem), _json(amostra.impressoes),
+                   altura, largura, int(amostra.mascara is not None), time.time()])
+
+    def inserir(self, projeto, amostras):
+        """Grava as amostras do projeto numa única transação. Retorna os IDs, na mesma ordem."""
+        ids = []
+        sql = (f"INSERT INTO amostras (projeto, {', '.join(_COLUNAS_GRAVADAS)}) "
+               f"VALUES (?, {', '.join('?' * len(_COLUNAS_GRAVADAS))})")
+        with self._transacao() as con:
+            for amostra in amostras:
+                id_amostra = con.execute(sql, [projeto] + self._valores(amostra)).lastrowid
+                con.execute("INSERT INTO miniaturas (amostra, visual, recorte) VALUES (?, ?, ?)",
+                            (id_amostra, amostra.jpeg_visual, amostra.jpeg_recorte))
+                # Arrays antes do COMMIT: quem lê a linha já encontra os arquivos
+                self._gravar_arrays(id_amostra, amostra)
+                ids.append(id_amostra)
+        return ids
+
+    def atualizar(self, itens):
+        """
+        Regrava amostras já existentes: itens (id, amostra), numa única transação.
+        IDs que não existem mais (projeto apagado por outra sessão) são ignorados.
+        """
+        sql = f"UPDATE amostras SET {', '.join(f'{c} = ?' for c in _COLUNAS_GRAVADAS)} WHERE id = ?"
+        with self._transacao() as con:
+            for id_amostra, amostra in itens:
+                if not con.execute(sql, self._valores(amostra) + [id_amostra]).rowcount:
+                    continue
+                con.execute("UPDATE miniaturas SET visual = ?, recorte = ? WHERE amostra = ?",
+                            (amostra.jpeg_visual, amostra.jpeg_recorte, id_amostra))
+                self._gravar_arrays(id_amostra, amostra)
+
+    def remover_projeto(self, projeto):
+        """Apaga todas as amostras do projeto (linhas, miniaturas e arrays)."""
+        ids = self.ids(projeto)
+        with self._transacao() as con:
+            con.execute("DELETE FROM amostras WHERE projeto = ?", (projeto,))
+        for id_amostra in ids:
+            for tipo in ('matriz', 'mascara'):
+                caminho = self._caminho_array(id_amostra, tipo)
+                if os.path.exists(caminho):
+                    os.remove(caminho)
+
+    # --- LEITURA ---
+
+    def projetos(self):
+        return [p for (p,) in self._conexao().execute("SELECT DISTINCT projeto FROM amostras ORDER BY projeto")]
+
+    def ids(self, projeto):
+        return [i for (i,) in self._conexao().execute(
+            "SELECT id FROM amostras WHERE projeto = ? ORDER BY id", (projeto,))]
+
+    def assinatura(self, projeto):
+        """(número de amostras, última alteração): muda quando alguém grava no projeto."""
+        return tuple(self._conexao().execute(
+            "SELECT COUNT(*), MAX(atualizada) FROM amostras WHERE projeto = ?", (projeto,)).fetchone())
+
+    def carregar(self, ids):
+        """
+        Amostras completas (com miniaturas e arrays) dos IDs, na ordem pedida.
+        IDs que não existem mais (removidos por outra sessão) ficam de fora.
+        """
+        ids = list(ids)
+        encontradas = self.carregar_por_id(ids)
+        return [encontradas[i] for i in ids if i in encontradas]
+
+    def carregar_por_id(self, ids):
+        """Como carregar, mas em {id: amostra}; os IDs removidos não aparecem."""
+        ids = list(ids)
+        if not ids:
+            return {}
+        linhas = {}
+        con = self._conexao()
+        for inicio in range(0, len(ids), 500):
+            bloco = ids[inicio:inicio + 500]
+            cursor = con.execute(
+                f"SELECT a.id, {', '.join('a.' + c for c in COLUNAS_META + COLUNAS_STATS)}, a.caixa_sensor, "
+                f"a.origem, a.impressoes, m.visual, m.recorte FROM amostras a LEFT JOIN miniaturas m "
+                f"ON m.amostra = a.id WHERE a.id IN ({', '.join('?' * len(bloco))})", bloco)
+            for linha in cursor:
+                linhas[linha[0]] = linha
+        amostras = {}
+        n_meta, n_stats = len(COLUNAS_META), len(COLUNAS_STATS)
+        for id_amostra, linha in linhas.items():
+            meta = dict(zip(COLUNAS_META, linha[1:1 + n_meta]))
+            stats = {c: v for c, v in zip(COLUNAS_STATS, linha[1 + n_meta:1 + n_meta + n_stats]) if v is not None}
+            caixa, origem, impressoes, visual, recorte = linha[1 + n_meta + n_stats:]
+            amostras[id_amostra] = Amostra(
+                meta=meta, stats=stats, matriz=self._ler_array(id_amostra, 'matriz'),
+                caixa_sensor=tuple(json.loads(caixa)), jpeg_visual=visual or b'', jpeg_recorte=recorte or b'',
+                mascara=self._ler_array(id_amostra, 'mascara'),
+                origem=json.loads(origem) if origem else None,
+                impressoes=json.loads(impressoes) if impressoes else None)
+        return amostras
+
+    def matriz(self, id_amostra):
+        """Só a matriz térmica (°C) da amostra, sem ler a linha nem as miniaturas."""
+        return self._ler_array(id_amostra, 'matriz')
+
+    def versoes(self, ids):
+        """{id: última alteração} dos IDs: identifica a versão da matriz (ex.: no cache de renderização)."""
+        ids = [int(i) for i in ids]
+        versoes = {}
+        for inicio in range(0, len(ids), 500):
+            bloco = ids[inicio:inicio + 500]
+            versoes.update(self._conexao().execute(
+                f"SELECT id, atualizada FROM amostras WHERE id IN ({', '.join('?' * len(bloco))})", bloco))
+        return versoes
+
+    def colunas(self, projeto):
+        """Metadados e estatísticas de todas as amostras do projeto (sem arrays), em ordem de ID."""
+        import pandas as pd
+        return pd.read_sql_query(
+            f"SELECT id, {', '.join(COLUNAS_META + COLUNAS_STATS)} FROM amostras WHERE projeto = ? ORDER BY id",
+            self._conexao(), params=(projeto,))
+
+    def contar(self, projeto, **filtros):
+        onde, valores = _onde(projeto, filtros)
+        return self._conexao().execute(f"SELECT COUNT(*) FROM amostras WHERE {onde}", valores).fetchone()[0]
+
+    def pagina(self, projeto, pagina, tamanho, **filtros):
+        """Uma página (a partir de 0) das linhas filtradas, em ordem de ID."""
+        import pandas as pd
+        onde, valores = _onde(projeto, filtros)
+        return pd.read_sql_query(
+            f"SELECT id, {', '.join(COLUNAS_META + COLUNAS_STATS)} FROM amostras WHERE {onde} "
+            f"ORDER BY id LIMIT ? OFFSET ?", self._conexao(), params=valores + [int(tamanho), int(pagina) * int(tamanho)])
+
+    def categorias(self, projeto, coluna):
+        if coluna not in COLUNAS_META:
+            raise ValueError(f"Coluna desconhecida: {coluna}")
+        return [v for (v,) in self._conexao().execute(
+            f"SELECT DISTINCT {coluna} FROM amostras WHERE projeto = ? ORDER BY {coluna}", (projeto,))]
+
+
+class ColecaoAmostras:
+    """
+    Lista das amostras de um projeto, lida do banco sob demanda. Suporta len,
+    índice e fatia, iteração (em blocos), append/extend e atribuição por índice.
+    Uma amostra removida do banco depois de a coleção ser aberta (outra
+    sessão apagou o projeto) vale None no índice e na fatia, que mantêm as
+    posições, e é pulada na iteração; `removidas` conta as encontradas.
+    """
+
+    def __init__(self, banco, projeto, ids=None, limite_memoria=LIMITE_AMOSTRAS_MEMORIA):
+        self.banco = banco
+        self.projeto = projeto
+        self._ids = list(ids) if ids is not None else banco.ids(projeto)
+        self._lru = OrderedDict()
+        self._limite = limite_memoria
+        self._pendentes = None
+        self.removidas = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __bool__(self):
+        return bool(self._ids)
+
+    def _guardar(self, id_amostra, amostra):
+        self._lru[id_amostra] = amostra
+        self._lru.move_to_end(id_amostra)
+        while len(self._lru) > self._limite:
+            self._lru.popitem(last=False)
+
+    def _obter(self, ids):
+        pendentes = self._pendentes or {}
+        encontradas = {i: pendentes.get(i) or self._lru[i] for i in ids if i in pendentes or i in self._lru}
+        faltando = [i for i in ids if i not in encontradas]
+        carregadas = self.banco.carregar_por_id(faltando)
+        self.removidas += len(faltando) - len(carregadas)
+        encontradas.update(carregadas)
+        for i in ids:
+            if i in encontradas:
+                self._guardar(i, encontradas[i])
+        return [encontradas.get(i) for i in ids]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self._obter(self._ids[i])
+        return self._obter([self._ids[i]])[0]
+
+    def __iter__(self):
+        pendentes = self._pendentes or {}
+        for inicio in range(0, len(self._ids), TAMANHO_LOTE):
+            bloco = self._ids[inicio:inicio + TAMANHO_LOTE]
+            faltando = [i for i in bloco if i not in pendentes]
+            carregadas = self.banco.carregar_por_id(faltando)
+            self.removidas += len(faltando) - len(carregadas)
+            for i in bloco:
+                amostra = pendentes.get(i) or carregadas.get(i)
+                if amostra is not None:
+                    yield amostra
+
+    def memoria(self):
+        """(amostras carregadas em memória, bytes ocupados por elas; ver Amostra.tamanho_bytes)."""
+        return len(self._lru), sum(a.tamanho_bytes() for a in self._lru.values())
+
+    def id(self, i):
+        return self._ids[i]
+
+    def posicao(self, id_amostra):
+        return self._ids.index(id_amostra)
+
+    def append(self, amostra):
+        self.extend([amostra])
+
+    def extend(self, amostras):
+        """Grava as amostras numa única transação (as plantas de uma mesma imagem, por exemplo)."""
+        amostras = list(amostras)
+        for id_amostra, amostra in zip(self.banco.inserir(self.projeto, amostras), amostras):
+            self._ids.append(id_amostra)
+            self._guardar(id_amostra, amostra)
+
+    def __setitem__(self, i, amostra):
+        id_amostra = self._ids[i]
+        self._guardar(id_amostra, amostra)
+        if self._pendentes is not None:
+            self._pendentes[id_amostra] = amostra
+            if len(self._pendentes) >= TAMANHO_LOTE:
+                self._descarregar()
+        else:
+            self.banco.atualizar([(id_amostra, amostra)])
+
+    def _descarregar(self):
+        if self._pendentes:
+            self.banco.atualizar(self._pendentes.items())
+            self._pendentes.clear()
+
+    @contextmanager
+    def em_lote(self):
+        """Agrupa as atribuições do bloco em transações de até TAMANHO_LOTE amostras."""
+        self._pendentes = {}
+        try:
+            yield self
+        finally:
+            self._descarregar()
+            self._pendentes = None
+
+    def instantaneo(self):
+        """Cópia com os IDs atuais (para tarefas em segundo plano: não vê amostras novas)."""
+        return ColecaoAmostras(self.banco, self.projeto, self._ids, limite_memoria=0)
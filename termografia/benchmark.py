@@ -0,0 +1,262 @@
+"""
+Benchmark do pipeline de análise sobre o corpus sintético (roda offline).
+
+Mede, para 10, 100 e 1000 amostras (configurável), o tempo de cada etapa:
+pareamento dos arquivos, decodificação radiométrica, mapeamento da ROI +
+estatísticas, segmentação, registro das amostras, mapas de calor, PDF e
+tabela do Dashboard.
+Registra vazão (amostras/s), pico de memória do processo (RSS) e exatidão
+contra o gabarito do gerador. Mede também o tempo de importação dos
+módulos sem interface num interpretador novo (partida de um worker ou da
+CLI). Falha (código de saída 1) se alguma etapa passar do limite de tempo
+por amostra, se a exatidão cair abaixo do limite, se uma importação passar
+do orçamento ou carregar uma dependência pesada que só a interface usa ou,
+com --base, se a vazão cair mais que a tolerância em relação a uma execução
+anterior salva com --saida.
+
+Uso:
+    python -m termografia.benchmark
+    python -m termografia.benchmark -n 10 100 --saida base.json
+    python -m termografia.benchmark --base base.json --tolerancia 0.25
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas  # noqa: F401 (já carregado: a etapa da tabela mede a montagem, não a importação do pandas)
+from PIL import Image
+
+from termografia.amostra import Amostra
+from termografia.decodificador import extrair_termica
+from termografia.processamento import organizar_pares, caixa_para_sensor, janela_sensor, analisar_roi
+from termografia.relatorio import gerar_relatorio
+from termografia.renderizacao import CacheRenderizacao
+from termografia.segmentacao import segmentar
+from termografia.sintetico import RESOLUCOES, gerar_par
+from termografia.tabela import TabelaResultados
+
+TAMANHOS = (10, 100, 1000)
+PARES_DISTINTOS = 24  # o corpus é reaproveitado em ciclo acima disso
+TAMANHO_VISUAL = (640, 480)
+
+# Limites de regressão: milissegundos por amostra (320x240) e exatidão mínima
+LIMITES_MS = {
+    'pares': 1.0, 'decodificacao': 25.0, 'roi': 5.0, 'segmentacao': 20.0,
+    'amostras': 40.0, 'mapas': 10.0, 'pdf': 60.0, 'tabela': 2.0,
+}
+LIMITES_EXATIDAO = {
+    'erro_max_decodificacao': 0.05,  # °C, pixel a pixel
+    'erro_media_roi': 0.01,          # °C, média da ROI
+    'iou_segmentacao': 0.95,
+}
+# Orçamento de importação (ms, processo novo, com a partida do interpretador) dos pontos de entrada sem
+# interface, e dependências que nenhum deles pode carregar ao ser importado
+LIMITES_IMPORTACAO_MS = {
+    'termografia.lote': 500, 'termografia.reanalise': 400, 'termografia.banco': 400,
+    'termografia.relatorio': 400, 'termografia.tarefas': 100,
+}
+PROIBIDOS_IMPORTACAO = ('streamlit', 'pandas', 'plotly', 'matplotlib', 'fpdf')
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def pico_rss_mb():
+    """Pico de memória residente do processo até agora (MB)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _medir(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return time.perf_counter() - inicio, resultado
+
+
+def _caixa_planta(mascara, tamanho_visual):
+    """Caixa (x, y, w, h) em pixels exibidos que envolve a planta, alinhada à grade do sensor."""
+    linhas, colunas = np.nonzero(mascara)
+    altura, largura = mascara.shape
+    sx, sy = tamanho_visual[0] / largura, tamanho_visual[1] / altura
+    x0, x1 = colunas.min(), colunas.max() + 1
+    y0, y1 = linhas.min(), linhas.max() + 1
+    return x0 * sx, y0 * sy, (x1 - x0) * sx, (y1 - y0) * sy
+
+
+def rodar(n, corpus):
+    """Executa todas as etapas para n amostras. Retorna {etapa: medidas} e a exatidão."""
+    amostras_corpus = [corpus[i % len(corpus)] for i in range(n)]
+    etapas, exatidao = {}, {}
+
+    def registrar(etapa, segundos):
+        etapas[etapa] = {'segundos': segundos, 'ms_por_amostra': 1000 * segundos / n,
+                         'amostras_por_s': n / segundos if segundos else float('inf'), 'pico_rss_mb': pico_rss_mb()}
+
+    # 1. Pareamento (só nomes de arquivo)
+    arquivos = []
+    for i, par in enumerate(amostras_corpus):
+        arquivos.append(SimpleNamespace(name=f"c{i:05d}_{par['nome_termica']}"))
+        arquivos.append(SimpleNamespace(name=f"c{i:05d}_{par['nome_visual']}"))
+    segundos, pares = _medir(lambda: organizar_pares(arquivos))
+    assert len(pares) == n
+    registrar('pares', segundos)
+
+    # 2. Decodificação radiométrica
+    segundos, matrizes = _medir(lambda: [extrair_termica(p['termica']) for p in amostras_corpus])
+    registrar('decodificacao', segundos)
+    exatidao['erro_max_decodificacao'] = max(float(np.abs(m - p['campo']).max())
+                                             for m, p in zip(matrizes[:len(corpus)], corpus))
+
+    # 3. Mapeamento da ROI + estatísticas na grade nativa
+    caixas = [caixa_para_sensor(_caixa_planta(p['mascara'], TAMANHO_VISUAL), TAMANHO_VISUAL, m.shape)
+              for m, p in zip(matrizes, amostras_corpus)]
+    segundos, resultados = _medir(lambda: [analisar_roi(m, c) for m, c in zip(matrizes, caixas)])
+    registrar('roi', segundos)
+    erros = []
+    for (stats, _, _), c, p in zip(resultados[:len(corpus)], caixas, corpus):
+        x0, y0, x1, y1 = (int(round(v)) for v in c)
+        erros.append(abs(stats['Temp_Media'] - p['campo'][y0:y1, x0:x1].mean()))
+    exatidao['erro_media_roi'] = float(max(erros))
+
+    # 4. Segmentação térmica (Otsu) dentro da ROI
+    janelas = [janela_sensor(c)[0] for c in caixas]
+    segundos, mascaras = _medir(lambda: [segmentar(m, 'termica', janela=j) for m, j in zip(matrizes, janelas)])
+    registrar('segmentacao', segundos)
+    exatidao['iou_segmentacao'] = float(min((m[j] & p['mascara'][j]).sum() / (m[j] | p['mascara'][j]).sum()
+                                            for m, j, p in zip(mascaras[:len(corpus)], janelas, corpus)))
+
+    # 5. Registro das amostras (miniaturas + matriz compacta)
+    visuais = [Image.open(io.BytesIO(p['visual'])) for p in corpus]
+    exibidas = [Image.open(io.BytesIO(p['termica'])) for p in corpus]
+    segundos, amostras = _medir(lambda: [
+        Amostra.criar(p['meta'], stats, recorte, c, visuais[i % len(corpus)], exibidas[i % len(corpus)])
+        for i, ((stats, recorte, _), c, p) in enumerate(zip(resultados, caixas, amostras_corpus))])
+    registrar('amostras', segundos)
+    etapas['amostras']['kb_por_amostra'] = sum(a.tamanho_bytes() for a in amostras) / n / 1024
+
+    # 6. Mapas de calor (LUT -> PNG) num cache de renderização vazio; chave por amostra, pois o corpus se repete
+    pasta = tempfile.mkdtemp(prefix='benchmark_')
+    try:
+        cache_render = CacheRenderizacao(pasta)
+        segundos, _ = _medir(lambda: [cache_render.obter(a.matriz, chave=i, lado_minimo=200)
+                                      for i, a in enumerate(amostras)])
+        assert cache_render.estatisticas['faltas'] == n
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    registrar('mapas', segundos)
+
+    # 7. Relatório PDF
+    pasta = tempfile.mkdtemp(prefix='benchmark_')
+    try:
+        # Cache de renderização vazio, na pasta temporária: mede a renderização, não os acertos
+        segundos, _ = _medir(lambda: gerar_relatorio(amostras, os.path.join(pasta, 'relatorio'),
+                                                     pasta_render=os.path.join(pasta, 'render')))
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    registrar('pdf', segundos)
+
+    # 8. Tabela do Dashboard: inserções + filtro + agregados
+    def tabela():
+        t = TabelaResultados()
+        for a in amostras:
+            t.adicionar(a.linha())
+        selecao = {'Tratamento': t.categorias('Tratamento'), 'Periodo': t.categorias('Periodo')[:1]}
+        return t.filtrar(**selecao), t.agregados(**selecao)
+    segundos, _ = _medir(tabela)
+    registrar('tabela', segundos)
+    return etapas, exatidao
+
+
+def medir_importacao(modulo, repeticoes=3):
+    """
+    Tempo (ms) de um interpretador novo que só importa `modulo` (o menor de
+    `repeticoes`) e as dependências de PROIBIDOS_IMPORTACAO que ele carregou.
+    """
+    codigo = (f"import sys; import {modulo}; "
+              f"print(' '.join(m for m in {PROIBIDOS_IMPORTACAO!r} if m in sys.modules))")
+    tempos = []
+    for _ in range(repeticoes):
+        segundos, saida = _medir(lambda: subprocess.run([sys.executable, '-c', codigo], cwd=RAIZ, check=True,
+                                                        capture_output=True, text=True).stdout)
+        tempos.append(1000 * segundos)
+    return {'ms': min(tempos), 'carregados': saida.split()}
+
+
+def verificar_importacao(importacao):
+    """Lista de regressões (textos) do tempo de importação e das dependências carregadas."""
+    falhas = []
+    for modulo, medidas in importacao.items():
+        if medidas['ms'] > LIMITES_IMPORTACAO_MS[modulo]:
+            falhas.append(f"importação de {modulo}: {medidas['ms']:.0f} ms > {LIMITES_IMPORTACAO_MS[modulo]} ms")
+        if medidas['carregados']:
+            falhas.append(f"importação de {modulo} carrega {', '.join(medidas['carregados'])}")
+    return falhas
+
+
+def verificar(resultados, base=None, tolerancia=0.25):
+    """Lista de regressões (textos) contra os limites fixos e, se houver, contra a execução base."""
+    falhas = []
+    for n, r in resultados.items():
+        for etapa, medidas in r['etapas'].items():
+            if medidas['ms_por_amostra'] > LIMITES_MS[etapa]:
+                falhas.append(f"n={n} {etapa}: {medidas['ms_por_amostra']:.2f} ms/amostra > {LIMITES_MS[etapa]} ms")
+            anterior = (base or {}).get(str(n), {}).get('etapas', {}).get(etapa)
+            if anterior and medidas['amostras_por_s'] < anterior['amostras_por_s'] * (1 - tolerancia):
+                falhas.append(f"n={n} {etapa}: vazão {medidas['amostras_por_s']:.0f}/s "
+                              f"< {anterior['amostras_por_s']:.0f}/s da base (-{tolerancia:.0%})")
+        for chave, valor in r['exatidao'].items():
+            limite = LIMITES_EXATIDAO[chave]
+            ruim = valor < limite if chave.startswith('iou') else valor > limite
+            if ruim:
+                falhas.append(f"n={n} {chave}: {valor:.4f} (limite {limite})")
+    return falhas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline de análise térmica com dados sintéticos.")
+    parser.add_argument('-n', type=int, nargs='+', default=list(TAMANHOS), help="Números de amostras")
+    parser.add_argument('--resolucao', choices=list(RESOLUCOES), default='320x240', help="Resolução do sensor")
+    parser.add_argument('--saida', help="Grava os resultados em JSON (para usar como --base depois)")
+    parser.add_argument('--base', help="JSON de uma execução anterior para comparar a vazão")
+    parser.add_argument('--tolerancia', type=float, default=0.25, help="Queda de vazão tolerada em relação à base")
+    args = parser.parse_args(argv)
+
+    corpus = [gerar_par(i, RESOLUCOES[args.resolucao], TAMANHO_VISUAL) for i in range(min(max(args.n), PARES_DISTINTOS))]
+    resultados = {}
+    for n in args.n:
+        etapas, exatidao = rodar(n, corpus)
+        resultados[str(n)] = {'resolucao': args.resolucao, 'etapas': etapas, 'exatidao': exatidao}
+        print(f"\n== {n} amostras ({args.resolucao}) ==")
+        print(f"{'etapa':<15}{'total (s)':>11}{'ms/amostra':>12}{'amostras/s':>12}{'pico RSS (MB)':>15}")
+        for etapa, m in etapas.items():
+            print(f"{etapa:<15}{m['segundos']:>11.3f}{m['ms_por_amostra']:>12.2f}{m['amostras_por_s']:>12.0f}"
+                  f"{m['pico_rss_mb']:>15.0f}")
+        print("exatidão: " + ", ".join(f"{k}={v:.4f}" for k, v in exatidao.items()))
+
+    importacao = {modulo: medir_importacao(modulo) for modulo in LIMITES_IMPORTACAO_MS}
+    print("\n== importação (processo novo) ==")
+    print(f"{'módulo':<25}{'ms':>8}{'limite':>8}  carregados")
+    for modulo, m in importacao.items():
+        print(f"{modulo:<25}{m['ms']:>8.0f}{LIMITES_IMPORTACAO_MS[modulo]:>8}  {', '.join(m['carregados']) or '-'}")
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(dict(resultados, importacao=importacao), f, indent=2)
+    base = None
+    if args.base:
+        with open(args.base, encoding='utf-8') as f:
+            base = json.load(f)
+    falhas = verificar(resultados, base, args.tolerancia) + verificar_importacao(importacao)
+    for falha in falhas:
+        print(f"[REGRESSÃO] {falha}", file=sys.stderr)
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
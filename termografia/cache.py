@@ -0,0 +1,226 @@
+"""
+Cache endereçado por conteúdo para matrizes térmicas decodificadas.
+
+A chave é o hash dos bytes do arquivo (o nome não importa), então o mesmo
+JPEG enviado de novo, em outra sessão ou com outro nome, não é decodificado
+outra vez. Duas camadas:
+
+* memória: LRU limitado por bytes;
+* disco: uma pasta por entrada com arrays .npy (lidos com mmap) e um JSON
+  de metadados, com remoção das entradas menos usadas quando o total passa
+  do limite.
+
+As prévias das imagens são guardadas como JPEG, não como pixels. A imagem
+em resolução cheia só fica na memória: o próprio arquivo enviado é a cópia
+em disco dela. O hash de um upload é memorizado pelo `file_id`, porque o
+UploadedFile do Streamlit não aceita o atributo `hash`.
+"""
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+from termografia.decodificador import bytes_do_arquivo, decodificar
+from termografia.instrumentacao import etapa
+from termografia.processamento import carregar_imagem
+from termografia.renderizacao import codificar_jpeg
+
+PASTA_PADRAO = '.cache_termica'
+LIMITE_MEMORIA = 256 * 1024 ** 2
+LIMITE_DISCO = 2 * 1024 ** 3
+QUALIDADE_PREVIA = 90
+LIMITE_HASHES = 100_000
+
+_hashes = OrderedDict()  # file_id -> hash do conteúdo (uploads sem o atributo `hash`)
+_trava_hashes = threading.Lock()
+
+
+def hash_conteudo(arquivo):
+    """
+    Hash do conteúdo do arquivo (blake2b, 128 bits); memorizado em `arquivo.hash`,
+    se o objeto tiver o atributo, ou senão pelo `arquivo.file_id`.
+    """
+    memorizado = getattr(arquivo, 'hash', None)
+    if memorizado:
+        return memorizado
+    file_id = None if hasattr(arquivo, 'hash') else getattr(arquivo, 'file_id', None)
+    if file_id is not None:
+        with _trava_hashes:
+            if file_id in _hashes:
+                _hashes.move_to_end(file_id)
+                return _hashes[file_id]
+    calculado = hashlib.blake2b(bytes_do_arquivo(arquivo), digest_size=16).hexdigest()
+    if hasattr(arquivo, 'hash'):
+        arquivo.hash = calculado
+    elif file_id is not None:
+        with _trava_hashes:
+            _hashes[file_id] = calculado
+            while len(_hashes) > LIMITE_HASHES:
+                _hashes.popitem(last=False)
+    return calculado
+
+
+def _tamanho_pasta(caminho):
+    return sum(e.stat().st_size for e in os.scandir(caminho) if e.is_file())
+
+
+class CacheTermico:
+    """Cache em duas camadas (memória LRU + disco) de arrays por hash do arquivo."""
+
+    def __init__(self, pasta=PASTA_PADRAO, limite_memoria=LIMITE_MEMORIA, limite_disco=LIMITE_DISCO):
+        self.pasta = pasta
+        self.limite_memoria = limite_memoria
+        self.limite_disco = limite_disco
+        self.estatisticas = {'memoria': 0, 'disco': 0, 'faltas': 0}
+        self._memoria = OrderedDict()
+        self._bytes_memoria = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(pasta, exist_ok=True)
+        self._disco = {}
+        for e in os.scandir(pasta):
+            if e.is_dir() and not e.name.startswith('.'):
+                self._disco[e.name] = (_tamanho_pasta(e.path), e.stat().st_mtime)
+        self._bytes_disco = sum(t for t, _ in self._disco.values())
+
+    # --- CAMADA DE MEMÓRIA ---
+
+    def _guardar_memoria(self, chave, arrays, meta):
+        tamanho = sum(a.nbytes for a in arrays.values())
+        if tamanho > self.limite_memoria:
+            return
+        if chave in self._memoria:
+            self._bytes_memoria -= self._memoria.pop(chave)[2]
+        self._memoria[chave] = (arrays, meta, tamanho)
+        self._bytes_memoria += tamanho
+        while self._bytes_memoria > self.limite_memoria:
+            _, (_, _, t) = self._memoria.popitem(last=False)
+            self._bytes_memoria -= t
+
+    # --- CAMADA DE DISCO ---
+
+    def _ler_disco(self, chave):
+        caminho = os.path.join(self.pasta, chave)
+        try:
+            with open(os.path.join(caminho, 'meta.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+            arrays = {nome: np.load(os.path.join(caminho, f"{nome}.npy"), mmap_mode='r') for nome in meta.pop('_arrays')}
+        except (OSError, ValueError, KeyError):
+            return None
+        os.utime(caminho)
+        self._disco[chave] = (self._disco.get(chave, (0, 0))[0], os.path.getmtime(caminho))
+        return arrays, meta
+
+    def _gravar_disco(self, chave, arrays, meta):
+        destino = os.path.join(self.pasta, chave)
+        temporario = os.path.join(self.pasta, f".{chave}.{os.getpid()}.{threading.get_ident()}")
+        os.makedirs(temporario, exist_ok=True)
+        for nome, arr in arrays.items():
+            np.save(os.path.join(temporario, f"{nome}.npy"), arr)
+        with open(os.path.join(temporario, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(dict(meta, _arrays=list(arrays)), f)
+        try:
+            os.rename(temporario, destino)
+        except OSError:  # outra sessão/processo gravou a mesma entrada
+            shutil.rmtree(temporario, ignore_errors=True)
+            return
+        tamanho = _tamanho_pasta(destino)
+        self._disco[chave] = (tamanho, os.path.getmtime(destino))
+        self._bytes_disco += tamanho
+        self._despejar_disco()
+
+    def _despejar_disco(self):
+        """Remove as entradas acessadas há mais tempo até caber no limite."""
+        if self._bytes_disco <= self.limite_disco:
+            return
+        for chave, (tamanho, _) in sorted(self._disco.items(), key=lambda kv: kv[1][1]):
+            shutil.rmtree(os.path.join(self.pasta, chave), ignore_errors=True)
+            del self._disco[chave]
+            self._bytes_disco -= tamanho
+            if self._bytes_disco <= self.limite_disco:
+                break
+
+    # --- API ---
+
+    def _consultar(self, chave, medida):
+        """(arrays, meta) da memória ou do disco, ou None."""
+        with self._lock:
+            if chave in self._memoria:
+                self._memoria.move_to_end(chave)
+                self.estatisticas['memoria'] += 1
+                medida.atributos['origem'] = 'memoria'
+                arrays, meta, _ = self._memoria[chave]
+                return arrays, meta
+            encontrado = self._ler_disco(chave) if chave in self._disco else None
+            if encontrado:
+                self.estatisticas['disco'] += 1
+                medida.atributos['origem'] = 'disco'
+                self._guardar_memoria(chave, *encontrado)
+            return encontrado
+
+    def obter(self, arquivo, tipo, calcular, em_disco=True):
+        """
+        Retorna (arrays, meta) para o arquivo. `calcular(arquivo)` só é chamado
+        em caso de falta e deve devolver um dicionário de arrays e um de metadados.
+        Com `em_disco` falso, a entrada fica só na memória.
+        """
+        with etapa(f'cache.{tipo}') as medida:
+            chave = f"{tipo}-{hash_conteudo(arquivo)}"
+            encontrado = self._consultar(chave, medida)
+            if encontrado:
+                return encontrado
+
+            medida.atributos['origem'] = 'falta'
+            arrays, meta = calcular(arquivo)
+            with self._lock:
+                self.estatisticas['faltas'] += 1
+                self._guardar_memoria(chave, arrays, meta)
+                if em_disco:
+                    self._gravar_disco(chave, arrays, meta)
+            return arrays, meta
+
+    def termica(self, arquivo):
+        """(matriz bruta, calibração) do arquivo FLIR."""
+        def calcular(a):
+            raw, calib = decodificar(a)
+            return {'raw': raw}, calib
+        arrays, calib = self.obter(arquivo, 'termica', calcular)
+        return arrays['raw'], calib
+
+    def termica_salva(self, hash_arquivo):
+        """(matriz bruta, calibração) pelo hash do arquivo, sem o arquivo; None se não estiver no cache."""
+        with etapa('cache.termica') as medida:
+            encontrado = self._consultar(f"termica-{hash_arquivo}", medida)
+        if not encontrado:
+            return None
+        arrays, calib = encontrado
+        return arrays['raw'], calib
+
+    def imagem(self, arquivo, lado=None):
+        """Imagem com a rotação EXIF já aplicada; com `lado`, a prévia reduzida (ver carregar_imagem)."""
+        if not lado:
+            arrays, _ = self.obter(arquivo, 'imagem', lambda a: ({'imagem': np.asarray(carregar_imagem(a))}, {}),
+                                   em_disco=False)
+            return Image.fromarray(arrays['imagem'])
+
+        def calcular(a):
+            previa = carregar_imagem(a, lado)
+            jpeg = codificar_jpeg(previa if previa.mode in ('RGB', 'L') else previa.convert('RGB'), QUALIDADE_PREVIA)
+            return {'jpeg': np.frombuffer(jpeg, dtype=np.uint8)}, {}
+        arrays, _ = self.obter(arquivo, f'previa{lado}', calcular)
+        previa = Image.open(io.BytesIO(np.asarray(arrays['jpeg']).tobytes()))
+        previa.load()
+        return previa
+
+    def resumo(self):
+        """Texto curto com acertos/faltas e ocupação, para a barra lateral."""
+        e = self.estatisticas
+        return (f"Acertos: {e['memoria'] + e['disco']} (memória {e['memoria']}, disco {e['disco']}) · "
+                f"Faltas: {e['faltas']} · "
+                f"{self._bytes_memoria / 1024 ** 2:.0f} MB em memória, {self._bytes_disco / 1024 ** 2:.0f} MB em disco")
@@ -0,0 +1,393 @@
+"""
+Decodificador radiométrico FLIR em processo.
+
+Lê os segmentos APP1 "FLIR" direto dos bytes do JPEG, monta o bloco FFF,
+extrai a matriz bruta do sensor (RawThermalImage em PNG, TIFF ou 16 bits
+sem compressão) e os parâmetros de calibração (CameraInfo), e converte para
+graus Celsius com as mesmas equações usadas pelo FlirImageExtractor.
+Nenhum arquivo temporário e nenhuma chamada ao exiftool são necessários.
+
+A calibração costuma ser a mesma em toda a campanha (uma câmera, mesmos
+parâmetros de emissividade e ambiente). Cada calibração distinta vira um
+PerfilCamera, guardado num registro do processo (também residente em cada
+worker do lote), com a tabela contagem -> °C das 65536 contagens possíveis:
+a conversão de uma imagem é um único np.take, e o CameraInfo de bytes já
+vistos nem é interpretado de novo.
+
+Emissividade, temperatura refletida, temperatura e umidade do ar e distância
+podem ser corrigidas depois da captura (corrigir_calibracao): a correção é
+só outro perfil, aplicado às mesmas contagens brutas, sem decodificar o
+arquivo de novo. converter_pilha converte uma pilha de quadros, cada um com
+a sua calibração, direto num único array de saída.
+"""
+import io
+import struct
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+# --- CONSTANTES DO FORMATO ---
+
+ZERO_ABSOLUTO = 273.15
+
+REGISTRO_RAW = 0x01
+REGISTRO_CAMERA = 0x20
+
+# Offsets do registro CameraInfo (ver tabela FLIR do ExifTool). Distância e
+# constantes atmosféricas vêm daqui, como no Thermal.parse do FlirImageExtractor
+# (não do SubjectDistance do EXIF nem das constantes fixas do raw2temp antigo)
+CAMPOS_CAMERA = {
+    'emissivity': (0x20, 'f'),
+    'object_distance': (0x24, 'f'),
+    'reflected_apparent_temperature': (0x28, 'f'),
+    'atmospheric_temperature': (0x2c, 'f'),
+    'ir_window_temperature': (0x30, 'f'),
+    'ir_window_transmission': (0x34, 'f'),
+    'relative_humidity': (0x3c, 'f'),
+    'planck_r1': (0x58, 'f'),
+    'planck_b': (0x5c, 'f'),
+    'planck_f': (0x60, 'f'),
+    'ata1': (0x70, 'f'),
+    'ata2': (0x74, 'f'),
+    'atb1': (0x78, 'f'),
+    'atb2': (0x7c, 'f'),
+    'atx': (0x80, 'f'),
+    'planck_o': (0x308, 'i'),
+    'planck_r2': (0x30c, 'f'),
+}
+CAMPOS_TEXTO = {
+    'camera_model': (0xd4, 32),
+    'camera_serial': (0x104, 16),
+}
+
+# Valores padrão do FlirImageExtractor quando o campo não existe
+CALIBRACAO_PADRAO = {
+    'emissivity': 1.0, 'object_distance': 1.0,
+    'atmospheric_temperature': 20.0, 'reflected_apparent_temperature': 20.0,
+    'ir_window_temperature': 20.0, 'ir_window_transmission': 1.0,
+    'relative_humidity': 50.0,
+    'planck_r1': 21106.77, 'planck_b': 1501.0, 'planck_f': 1.0,
+    'planck_o': -7340.0, 'planck_r2': 0.012545258,
+    'ata1': 0.006569, 'ata2': 0.01262, 'atb1': -0.002276, 'atb2': -0.00667, 'atx': 1.9,
+}
+
+# --- LEITURA DO CONTAINER ---
+
+def bytes_do_arquivo(arquivo):
+    """Obtém os bytes do upload sem cópia quando possível (BytesIO/UploadedFile)."""
+    if isinstance(arquivo, (bytes, bytearray, memoryview)):
+        return memoryview(arquivo)
+    if hasattr(arquivo, 'getbuffer'):
+        return arquivo.getbuffer()
+    arquivo.seek(0)
+    return memoryview(arquivo.read())
+
+def ler_fff(dados):
+    """Junta os segmentos APP1 'FLIR' do JPEG e devolve o bloco FFF."""
+    buf = memoryview(dados)
+    if bytes(buf[:2]) != b'\xff\xd8':
+        raise ValueError("Arquivo não é um JPEG.")
+
+    partes = {}
+    total = None
+    pos, n = 2, len(buf)
+    while pos + 4 <= n:
+        if buf[pos] != 0xFF:
+            raise ValueError("Estrutura JPEG corrompida.")
+        marcador = buf[pos + 1]
+        if marcador == 0xFF:
+            pos += 1
+            continue
+        if marcador in (0xD9, 0xDA):  # fim da imagem / início dos dados comprimidos
+            break
+        tamanho = (buf[pos + 2] << 8) | buf[pos + 3]
+        if marcador == 0xE1 and bytes(buf[pos + 4:pos + 9]) == b'FLIR\x00':
+            num, tot = buf[pos + 10], buf[pos + 11]
+            if total is None:
+                total = tot
+            if tot != total or num in partes:
+                raise ValueError("Segmentos FLIR inconsistentes.")
+            partes[num] = buf[pos + 12:pos + 2 + tamanho]
+        pos += 2 + tamanho
+
+    if total is None or len(partes) != total + 1:
+        raise ValueError("Imagem sem dados radiométricos FLIR.")
+    return b''.join(partes[i] for i in range(total + 1))
+
+def ler_registros(fff):
+    """Lê o diretório de registros do bloco FFF: {tipo: (offset, tamanho)}."""
+    if fff[:3] not in (b'FFF', b'AFF'):
+        raise ValueError("Bloco FFF inválido.")
+    ordem = '>'
+    versao = struct.unpack_from('>I', fff, 0x14)[0]
+    if not 100 <= versao < 200:
+        ordem = '<'
+    offset_dir, n_entradas = struct.unpack_from(ordem + 'II', fff, 0x18)
+
+    registros = {}
+    for i in range(n_entradas):
+        tipo, _, _, _, offset, tamanho = struct.unpack_from(ordem + 'HHIIII', fff, offset_dir + 32 * i)
+        if tipo and tipo not in registros:
+            registros[tipo] = (offset, tamanho)
+    return registros
+
+def _ordem_registro(fff, offset):
+    """Cada registro começa com 0x0002 na sua própria ordem de bytes."""
+    return '>' if struct.unpack_from('<H', fff, offset)[0] >= 0x100 else '<'
+
+def _como_exiftool(calib):
+    """Arredonda os parâmetros como o exiftool os imprime (resultado idêntico ao caminho antigo)."""
+    for k in ('reflected_apparent_temperature', 'atmospheric_temperature', 'ir_window_temperature'):
+        calib[k] = round(calib[k] - ZERO_ABSOLUTO, 1)
+    umidade = calib['relative_humidity']
+    calib['relative_humidity'] = round((umidade / 100 if umidade > 2 else umidade) * 100, 1)
+    for k in ('emissivity', 'object_distance', 'ir_window_transmission'):
+        calib[k] = round(calib[k], 2)
+    for k in ('planck_r1', 'planck_b', 'planck_f', 'planck_r2'):
+        calib[k] = float('%.8g' % calib[k])
+    for k in ('ata1', 'ata2', 'atb1', 'atb2', 'atx'):
+        calib[k] = round(calib[k], 6)
+    calib['planck_o'] = float(calib['planck_o'])
+    return calib
+
+def ler_calibracao(fff, registros):
+    """Extrai constantes de Planck, emissividade e condições ambientais do CameraInfo."""
+    if REGISTRO_CAMERA not in registros:
+        return dict(CALIBRACAO_PADRAO, camera_model='', camera_serial='')
+    offset, _ = registros[REGISTRO_CAMERA]
+    ordem = _ordem_registro(fff, offset)
+
+    calib = {k: struct.unpack_from(ordem + fmt, fff, offset + pos)[0] for k, (pos, fmt) in CAMPOS_CAMERA.items()}
+    calib = _como_exiftool(calib)
+    for k, (pos, tam) in CAMPOS_TEXTO.items():
+        calib[k] = fff[offset + pos:offset + pos + tam].split(b'\x00', 1)[0].decode('latin-1').strip()
+    return calib
+
+def ler_raw(fff, registros):
+    """Extrai a matriz bruta do sensor (contagens uint16)."""
+    if REGISTRO_RAW not in registros:
+        raise ValueError("Imagem sem RawThermalImage.")
+    offset, tamanho = registros[REGISTRO_RAW]
+    ordem = _ordem_registro(fff, offset)
+    largura, altura = struct.unpack_from(ordem + 'HH', fff, offset + 2)
+    blob = fff[offset + 32:offset + tamanho]
+
+    if blob[:4] == b'\x89PNG':
+        # A FLIR grava os valores little-endian dentro de um PNG (big-endian)
+        raw = np.asarray(Image.open(io.BytesIO(blob))).astype(np.uint16).byteswap()
+    elif blob[:4] in (b'II*\x00', b'MM\x00*'):
+        raw = np.asarray(Image.open(io.BytesIO(blob))).astype(np.uint16)
+    else:
+        raw = np.frombuffer(blob, dtype=ordem + 'u2', count=largura * altura).astype(np.uint16)
+        raw = raw.reshape(altura, largura)
+
+    if raw.shape != (altura, largura):
+        raise ValueError(f"Dimensões do RawThermalImage inconsistentes: {raw.shape} vs {(altura, largura)}")
+    return raw
+
+# --- CONVERSÃO RADIOMÉTRICA ---
+
+def _termos_radiometricos(calib):
+    """
+    Constantes de Planck e os termos da equação do sinal: raw = ganho⁻¹ · (radiância do objeto + fundo),
+    com emissividade, atmosfera e janela IR (como em raw2temp/Thermimage).
+    """
+    c = dict(CALIBRACAO_PADRAO)
+    c.update({k: v for k, v in calib.items() if k in CALIBRACAO_PADRAO})
+    E, OD, IRT = c['emissivity'], c['object_distance'], c['ir_window_transmission']
+    R1, R2, B, F, O = c['planck_r1'], c['planck_r2'], c['planck_b'], c['planck_f'], c['planck_o']
+    t_atm, t_refl, t_wind = c['atmospheric_temperature'], c['reflected_apparent_temperature'], c['ir_window_temperature']
+
+    # Transmissão atmosférica (depende da umidade e da distância)
+    h2o = (c['relative_humidity'] / 100) * np.exp(
+        1.5587 + 0.06939 * t_atm - 0.00027816 * t_atm ** 2 + 0.00000068455 * t_atm ** 3
+    )
+    raiz_d = np.sqrt(OD / 2)
+    tau = c['atx'] * np.exp(-raiz_d * (c['ata1'] + c['atb1'] * np.sqrt(h2o))) \
+        + (1 - c['atx']) * np.exp(-raiz_d * (c['ata2'] + c['atb2'] * np.sqrt(h2o)))
+
+    def radiancia(t):
+        return R1 / (R2 * (np.exp(B / (t + ZERO_ABSOLUTO)) - F)) - O
+
+    # Componentes refletida, atmosférica e da janela (termos escalares por imagem)
+    raw_atm = radiancia(t_atm)
+    fundo = (
+        (1 - E) / E * radiancia(t_refl)
+        + (1 - tau) / E / tau * raw_atm
+        + (1 - tau) / E / tau / IRT / tau * raw_atm
+        + (1 - IRT) / E / tau / IRT * radiancia(t_wind)
+    )
+    ganho = 1.0 / (E * tau * IRT * tau)
+    return (R1, R2, B, F, O), ganho, fundo
+
+def raw_para_celsius(raw, calib):
+    """
+    Converte contagens brutas em °C (equação de Planck com correção de
+    emissividade, atmosfera e janela IR, como em raw2temp/Thermimage).
+    """
+    (R1, R2, B, F, O), ganho, fundo = _termos_radiometricos(calib)
+    raw_obj = raw * ganho - fundo
+    val_log = R1 / (R2 * (raw_obj + O)) + F
+    if np.any(val_log < 0):
+        raise ValueError("Dados radiométricos corrompidos (valor fora da curva de Planck).")
+    return (B / np.log(val_log) - ZERO_ABSOLUTO).astype(np.float32)
+
+def celsius_para_raw(temperaturas, calib):
+    """Inversa de raw_para_celsius: contagens (float) que o sensor registraria para as temperaturas dadas."""
+    (R1, R2, B, F, O), ganho, fundo = _termos_radiometricos(calib)
+    raw_obj = R1 / (R2 * (np.exp(B / (np.asarray(temperaturas, dtype=np.float64) + ZERO_ABSOLUTO)) - F)) - O
+    return (raw_obj + fundo) / ganho
+
+# --- PERFIS DE CÂMERA ---
+
+LIMITE_PERFIS = 32
+
+# Campos da calibração que podem ser corrigidos depois da captura (folha e
+# condições de campo diferentes das configuradas na câmera), com o intervalo válido
+CAMPOS_CORRECAO = {
+    'emissivity': (0.01, 1.0),
+    'reflected_apparent_temperature': (-100.0, 500.0),
+    'atmospheric_temperature': (-100.0, 100.0),
+    'relative_humidity': (0.0, 100.0),
+    'object_distance': (0.0, 10000.0),
+}
+
+_perfis = OrderedDict()            # calibração (itens ordenados) -> PerfilCamera
+_perfis_por_registro = OrderedDict()  # bytes do CameraInfo -> PerfilCamera
+_trava_perfis = threading.Lock()
+
+class PerfilCamera:
+    """Calibração de uma câmera com a tabela pré-calculada contagem bruta -> °C."""
+
+    __slots__ = ('calib', 'tabela', '_tem_invalidos')
+
+    def __init__(self, calib):
+        self.calib = dict(calib)
+        # Mesmas operações de raw_para_celsius, elemento a elemento: resultado idêntico
+        (R1, R2, B, F, O), ganho, fundo = _termos_radiometricos(self.calib)
+        raw_obj = np.arange(65536, dtype=np.uint16) * ganho - fundo
+        val_log = R1 / (R2 * (raw_obj + O)) + F
+        invalidos = val_log < 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            tabela = (B / np.log(val_log) - ZERO_ABSOLUTO).astype(np.float32)
+        tabela[invalidos] = np.nan
+        self.tabela = tabela
+        self._tem_invalidos = bool(invalidos.any())
+
+    def converter(self, raw):
+        """Contagens brutas -> °C (float32). uint16 usa a tabela; outros tipos, a equação."""
+        if raw.dtype != np.uint16:
+            return raw_para_celsius(raw, self.calib)
+        temperaturas = np.take(self.tabela, raw)
+        if self._tem_invalidos and np.isnan(temperaturas).any():
+            raise ValueError("Dados radiométricos corrompidos (valor fora da curva de Planck).")
+        return temperaturas
+
+def _guardar(registro, chave, perfil):
+    registro[chave] = perfil
+    while len(registro) > LIMITE_PERFIS:
+        registro.popitem(last=False)
+
+def perfil_camera(calib):
+    """PerfilCamera da calibração, criado na primeira vez e reaproveitado depois."""
+    chave = tuple(sorted(calib.items()))
+    with _trava_perfis:
+        perfil = _perfis.get(chave)
+    if perfil is None:
+        perfil = PerfilCamera(calib)
+        with _trava_perfis:
+            _guardar(_perfis, chave, perfil)
+    return perfil
+
+def perfil_do_fff(fff, registros):
+    """PerfilCamera do bloco FFF; o CameraInfo só é interpretado se os bytes forem novos."""
+    if REGISTRO_CAMERA in registros:
+        offset, tamanho = registros[REGISTRO_CAMERA]
+        chave = bytes(fff[offset:offset + tamanho])
+    else:
+        chave = b''
+    with _trava_perfis:
+        perfil = _perfis_por_registro.get(chave)
+    if perfil is None:
+        perfil = perfil_camera(ler_calibracao(fff, registros))
+        with _trava_perfis:
+            _guardar(_perfis_por_registro, chave, perfil)
+    return perfil
+
+def corrigir_calibracao(calib, correcao):
+    """
+    Calibração com emissividade e condições ambientais substituídas pelas de
+    `correcao` (chaves de CAMPOS_CORRECAO; None mantém o valor do arquivo).
+    """
+    corrigida = dict(calib)
+    for campo, valor in (correcao or {}).items():
+        if campo not in CAMPOS_CORRECAO:
+            raise ValueError(f"Parâmetro de correção desconhecido: {campo}")
+        if valor is None:
+            continue
+        valor = float(valor)
+        minimo, maximo = CAMPOS_CORRECAO[campo]
+        if not minimo <= valor <= maximo:
+            raise ValueError(f"{campo} fora do intervalo [{minimo}, {maximo}]: {valor}")
+        corrigida[campo] = valor
+    return corrigida
+
+def converter_pilha(raws, calibs):
+    """
+    Converte uma pilha de matrizes brutas uint16 (N, altura, largura) em °C.
+    `calibs` tem uma calibração por quadro (ou uma só para todos). Cada perfil
+    distinto é resolvido uma vez e os quadros são convertidos direto na pilha
+    de saída, sem temporários.
+    """
+    raws = np.asarray(raws)
+    if isinstance(calibs, dict):
+        calibs = [calibs] * len(raws)
+    if len(calibs) != len(raws):
+        raise ValueError(f"{len(raws)} quadros e {len(calibs)} calibrações.")
+    saida = np.empty(raws.shape, dtype=np.float32)
+    perfis = {}
+    for i, calib in enumerate(calibs):
+        perfil = perfis.get(id(calib))
+        if perfil is None:
+            perfil = perfis[id(calib)] = perfil_camera(calib)
+        if raws.dtype == np.uint16:
+            np.take(perfil.tabela, raws[i], out=saida[i])
+        else:
+            saida[i] = perfil.converter(raws[i])
+    if any(p._tem_invalidos for p in perfis.values()) and np.isnan(saida).any():
+        raise ValueError("Dados radiométricos corrompidos (valor fora da curva de Planck).")
+    return saida
+
+def carregar_perfis(calibracoes):
+    """Pré-calcula os perfis das calibrações dadas (initializer dos workers do lote)."""
+    for calib in calibracoes:
+        perfil_camera(calib)
+
+def perfis_carregados():
+    return len(_perfis)
+
+# --- API ---
+
+def decodificar(arquivo):
+    """Retorna (matriz bruta uint16, dicionário de calibração) a partir do upload ou de bytes."""
+    fff = ler_fff(bytes_do_arquivo(arquivo))
+    registros = ler_registros(fff)
+    return ler_raw(fff, registros), dict(perfil_do_fff(fff, registros).calib)
+
+def calibracao(arquivo):
+    """Só o dicionário de calibração do arquivo, sem decodificar a matriz."""
+    fff = ler_fff(bytes_do_arquivo(arquivo))
+    return dict(perfil_do_fff(fff, ler_registros(fff)).calib)
+
+def extrair_termica(arquivo):
+    """
+    Equivalente em processo de FlirImageExtractor.process_image + get_thermal_np()
+    (Thermal.parse na versão 1.5.11): mesmas entradas, lidas do CameraInfo
+    (inclusive ObjectDistance e ATA/ATB/ATX) na precisão impressa pelo exiftool,
+    e mesma equação.
+    """
+    fff = ler_fff(bytes_do_arquivo(arquivo))
+    registros = ler_registros(fff)
+    return perfil_do_fff(fff, registros).converter(ler_raw(fff, registros))
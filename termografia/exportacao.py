@@ -0,0 +1,154 @@
+"""
+Exportação em massa das matrizes térmicas de uma campanha.
+
+Uma exportação é uma pasta com:
+
+* matrizes.npy: float32 1-D com as matrizes de todas as amostras (°C, grade
+  nativa do sensor) concatenadas, na ordem do índice;
+* mascaras.npy: uint8 1-D paralelo a matrizes.npy (1 = pixel de planta; sem
+  segmentação, todos os pixels do recorte valem 1);
+* indice.parquet (ou indice.csv se não houver pyarrow): uma linha por
+  amostra com metadados, estatísticas, caixa no sensor e a posição
+  (deslocamento, altura, largura) da matriz nos arrays;
+* manifesto.json: versão do formato e nomes dos arquivos.
+
+Como os recortes têm tamanhos diferentes, as matrizes ficam lado a lado num
+array plano em vez de empilhadas. Os .npy são abertos com mmap: selecionar
+amostras por planta ou tratamento lê só o índice e as fatias pedidas.
+
+    exp = CampanhaExportada('campanha/')
+    for linha, matriz in exp.matrizes(Tratamento=['controle']):
+        ...
+"""
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+VERSAO_FORMATO = 1
+ARQUIVO_MATRIZES = 'matrizes.npy'
+ARQUIVO_MASCARAS = 'mascaras.npy'
+ARQUIVO_MANIFESTO = 'manifesto.json'
+
+
+def _parquet_disponivel():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def exportar(amostras, pasta, progresso=None):
+    """
+    Grava as amostras (registros com meta, stats, matriz, mascara e caixa_sensor)
+    na pasta. Retorna o caminho do índice. `progresso(feitas, total)` é chamado
+    a cada amostra gravada, se informado.
+    """
+    import pandas as pd
+    if not hasattr(amostras, '__len__'):
+        # Uma sequência (lista, coleção do banco) é percorrida duas vezes; um iterador, materializado
+        amostras = list(amostras)
+    os.makedirs(pasta, exist_ok=True)
+    linhas, deslocamento = [], 0
+    for i, a in enumerate(amostras):
+        altura, largura = a.matriz.shape
+        linha = {'amostra': i}
+        linha.update(a.meta)
+        linha.update(a.stats)
+        linha.update(dict(zip(('sensor_x0', 'sensor_y0', 'sensor_x1', 'sensor_y1'), a.caixa_sensor)))
+        linha.update({'deslocamento': deslocamento, 'altura': altura, 'largura': largura,
+                      'segmentada': a.mascara is not None})
+        linhas.append(linha)
+        deslocamento += altura * largura
+
+    matrizes = open_memmap(os.path.join(pasta, ARQUIVO_MATRIZES), mode='w+', dtype=np.float32,
+                           shape=(deslocamento,))
+    mascaras = open_memmap(os.path.join(pasta, ARQUIVO_MASCARAS), mode='w+', dtype=np.uint8,
+                           shape=(deslocamento,))
+    for i, (a, linha) in enumerate(zip(amostras, linhas), 1):
+        trecho = slice(linha['deslocamento'], linha['deslocamento'] + a.matriz.size)
+        matrizes[trecho] = a.matriz.ravel()
+        mascaras[trecho] = a.mascara.ravel() if a.mascara is not None else 1
+        if progresso:
+            progresso(i, len(linhas))
+    matrizes.flush()
+    mascaras.flush()
+    del matrizes, mascaras
+
+    indice = pd.DataFrame(linhas)
+    if _parquet_disponivel():
+        arquivo_indice = 'indice.parquet'
+        indice.to_parquet(os.path.join(pasta, arquivo_indice), index=False)
+    else:
+        arquivo_indice = 'indice.csv'
+        indice.to_csv(os.path.join(pasta, arquivo_indice), index=False)
+    with open(os.path.join(pasta, ARQUIVO_MANIFESTO), 'w', encoding='utf-8') as f:
+        json.dump({'versao': VERSAO_FORMATO, 'amostras': len(linhas), 'pixels': deslocamento,
+                   'indice': arquivo_indice, 'matrizes': ARQUIVO_MATRIZES, 'mascaras': ARQUIVO_MASCARAS}, f)
+    return os.path.join(pasta, arquivo_indice)
+
+
+def exportar_zip(amostras, destino, progresso=None):
+    """Exporta para uma pasta temporária e empacota num ZIP sem compressão (extraído, abre com mmap)."""
+    pasta = tempfile.mkdtemp(prefix='exportacao_')
+    try:
+        exportar(amostras, pasta, progresso)
+        with zipfile.ZipFile(destino, 'w', zipfile.ZIP_STORED) as zf:
+            for nome in sorted(os.listdir(pasta)):
+                zf.write(os.path.join(pasta, nome), nome)
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+    return destino
+
+
+class CampanhaExportada:
+    """Leitura de uma exportação com os arrays mapeados em memória (nada é lido até ser fatiado)."""
+
+    def __init__(self, pasta):
+        import pandas as pd
+        with open(os.path.join(pasta, ARQUIVO_MANIFESTO), encoding='utf-8') as f:
+            self.manifesto = json.load(f)
+        if self.manifesto['versao'] > VERSAO_FORMATO:
+            raise ValueError(f"Formato de exportação mais novo que o suportado: {self.manifesto['versao']}")
+        caminho_indice = os.path.join(pasta, self.manifesto['indice'])
+        if caminho_indice.endswith('.parquet'):
+            self.indice = pd.read_parquet(caminho_indice)
+        else:
+            self.indice = pd.read_csv(caminho_indice, dtype={'Planta': str, 'Ambiente': str, 'Tratamento': str,
+                                                             'Periodo': str, 'Replica': str})
+        self._matrizes = np.load(os.path.join(pasta, self.manifesto['matrizes']), mmap_mode='r')
+        self._mascaras = np.load(os.path.join(pasta, self.manifesto['mascaras']), mmap_mode='r')
+
+    def __len__(self):
+        return len(self.indice)
+
+    def _fatia(self, array, i):
+        linha = self.indice.iloc[i]
+        inicio = int(linha['deslocamento'])
+        return array[inicio:inicio + int(linha['altura']) * int(linha['largura'])].reshape(
+            int(linha['altura']), int(linha['largura']))
+
+    def matriz(self, i):
+        """Matriz (°C) da amostra i, como visão somente leitura do arquivo mapeado."""
+        return self._fatia(self._matrizes, i)
+
+    def mascara(self, i):
+        """Máscara booleana da planta da amostra i."""
+        return self._fatia(self._mascaras, i).astype(bool)
+
+    def selecionar(self, **filtros):
+        """Linhas do índice cujas colunas estão nos valores dados: selecionar(Tratamento=['controle'])."""
+        manter = np.ones(len(self.indice), dtype=bool)
+        for coluna, valores in filtros.items():
+            manter &= self.indice[coluna].isin(valores if isinstance(valores, (list, tuple, set)) else [valores])
+        return self.indice[manter]
+
+    def matrizes(self, **filtros):
+        """Gera (linha do índice, matriz) das amostras selecionadas, lendo só essas fatias."""
+        for posicao, linha in self.selecionar(**filtros).iterrows():
+            yield linha, self.matriz(self.indice.index.get_loc(posicao))
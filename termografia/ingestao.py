@@ -0,0 +1,259 @@
+"""
+Ingestão de campanhas inteiras sem cópias por arquivo.
+
+Além dos JPEGs enviados um a um, o app aceita um ZIP (enviado ou no servidor)
+ou o caminho de uma pasta no servidor. O caminho no servidor só é aceito
+dentro da raiz configurada na variável de ambiente TERMOGRAFIA_RAIZ_SERVIDOR
+(sem ela, a leitura do servidor fica desativada). Cada imagem vira um ArquivoCampanha:
+uma referência leve (nome e tamanho, lidos do diretório ou do índice do ZIP)
+cujo conteúdo só é acessado quando usado:
+
+* pasta: o arquivo é mapeado em memória (mmap), e as páginas são as do cache
+  do sistema, não uma cópia do processo;
+* ZIP sem compressão (o comum para JPEG): a entrada é uma fatia (memoryview)
+  do ZIP mapeado ou do upload, também sem cópia;
+* ZIP comprimido: a entrada é descomprimida uma vez, quando usada.
+
+O mesmo buffer serve ao hash, ao decodificador radiométrico (que só copia os
+segmentos FLIR) e à imagem: leitor_buffer dá um cursor próprio sobre ele
+(para threads de pré-carregamento, por exemplo) sem copiar os bytes. Só os
+buffers dos últimos arquivos usados ficam abertos.
+"""
+import io
+import mmap
+import os
+import struct
+import threading
+import zipfile
+import zlib
+from collections import OrderedDict
+from functools import partial
+
+from termografia.decodificador import bytes_do_arquivo
+
+EXTENSOES = ('.jpg', '.jpeg')
+VARIAVEL_RAIZ = 'TERMOGRAFIA_RAIZ_SERVIDOR'
+LIMITE_ABERTOS = 64
+# Lado de referência das prévias (imagem visual no Editor): o JPEG é decodificado
+# já reduzido pelo libjpeg (draft), mas só por 1/2, 1/4 ou 1/8 e só enquanto os
+# dois lados continuam com pelo menos LADO_PREVIA pixels. Não é um limite: uma
+# foto de 4000x3000 vira 2000x1500, e uma com o menor lado abaixo de
+# 2 x LADO_PREVIA é decodificada inteira
+LADO_PREVIA = 1280
+
+_abertos = OrderedDict()  # id(ArquivoCampanha) -> ArquivoCampanha com buffer aberto
+_trava_abertos = threading.Lock()
+
+
+class LeitorBuffer(io.RawIOBase):
+    """Arquivo somente leitura sobre um buffer, com cursor próprio e sem copiar o conteúdo."""
+
+    def __init__(self, buffer, name='', hash=None):
+        super().__init__()
+        self._buffer = memoryview(buffer)
+        self._posicao = 0
+        self.name = name
+        self.hash = hash
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, destino):
+        n = max(0, min(len(destino), len(self._buffer) - self._posicao))
+        destino[:n] = self._buffer[self._posicao:self._posicao + n]
+        self._posicao += n
+        return n
+
+    def seek(self, deslocamento, de_onde=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._posicao, io.SEEK_END: len(self._buffer)}[de_onde]
+        self._posicao = max(0, base + deslocamento)
+        return self._posicao
+
+    def tell(self):
+        return self._posicao
+
+    def getbuffer(self):
+        return self._buffer
+
+
+def leitor_buffer(arquivo):
+    """Cursor independente sobre o conteúdo do arquivo (upload, ArquivoCampanha, bytes), sem cópia."""
+    return LeitorBuffer(bytes_do_arquivo(arquivo), getattr(arquivo, 'name', ''), getattr(arquivo, 'hash', None))
+
+
+class ArquivoCampanha:
+    """
+    Imagem de uma campanha (pasta ou ZIP). Tem `name`, `size` e `file_id`
+    como um upload; o conteúdo (getbuffer, ou seek/read) é aberto sob demanda.
+    """
+
+    def __init__(self, name, size, file_id, abrir):
+        self.name = name
+        self.size = size
+        self.file_id = file_id
+        self.hash = None  # hash do conteúdo, memorizado por cache.hash_conteudo
+        self._abrir = abrir
+        self._buffer = None
+        self._leitor = None
+
+    def __repr__(self):
+        return f"ArquivoCampanha({self.name!r}, {self.size})"
+
+    def getbuffer(self):
+        buffer = self._buffer
+        if buffer is None:
+            buffer = self._buffer = memoryview(self._abrir())
+        with _trava_abertos:
+            _abertos[id(self)] = self
+            _abertos.move_to_end(id(self))
+            while len(_abertos) > LIMITE_ABERTOS:
+                _, antigo = _abertos.popitem(last=False)
+                antigo.liberar()
+        return buffer
+
+    def liberar(self):
+        """Solta o buffer; um mmap ainda referenciado por quem o está lendo é fechado depois, pelo coletor."""
+        self._buffer = None
+        self._leitor = None
+
+    # Interface de arquivo (para PIL e o código que faz seek/read no upload)
+
+    def _cursor(self):
+        if self._leitor is None or self._buffer is None:
+            self._leitor = LeitorBuffer(self.getbuffer(), self.name)
+        return self._leitor
+
+    def seek(self, deslocamento, de_onde=io.SEEK_SET):
+        return self._cursor().seek(deslocamento, de_onde)
+
+    def tell(self):
+        return self._cursor().tell()
+
+    def read(self, n=-1):
+        return self._cursor().read(n)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+
+def _mapear(caminho):
+    with open(caminho, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _eh_imagem(nome):
+    base = os.path.basename(nome)
+    return base.lower().endswith(EXTENSOES) and not base.startswith('.')
+
+
+def arquivos_da_pasta(pasta, conhecidos=None):
+    """
+    Imagens JPEG da pasta (não recursivo), em ordem de nome, sem ler o conteúdo.
+    `conhecidos` ({file_id: ArquivoCampanha} de uma listagem anterior) é
+    reaproveitado para os arquivos que não mudaram (mesmo tamanho e data).
+    """
+    conhecidos = conhecidos or {}
+    arquivos = []
+    for e in sorted(os.scandir(pasta), key=lambda e: e.name):
+        if not (e.is_file() and _eh_imagem(e.name)):
+            continue
+        estado = e.stat()
+        file_id = f"{e.path}:{estado.st_size}:{estado.st_mtime_ns}"
+        arquivos.append(conhecidos.get(file_id) or
+                        ArquivoCampanha(e.name, estado.st_size, file_id, partial(_mapear, e.path)))
+    return arquivos
+
+
+def _inicio_dados(buffer, info):
+    """Posição dos dados da entrada: depois do cabeçalho local (30 bytes + nome + extra)."""
+    assinatura, = struct.unpack_from('<I', buffer, info.header_offset)
+    if assinatura != 0x04034b50:
+        raise zipfile.BadZipFile(f"Cabeçalho local inválido em {info.filename}")
+    n_nome, n_extra = struct.unpack_from('<HH', buffer, info.header_offset + 26)
+    return info.header_offset + 30 + n_nome + n_extra
+
+
+def _fatia(buffer, inicio, tamanho):
+    return buffer[inicio:inicio + tamanho]
+
+
+def _descomprimir(buffer, info):
+    if info.compress_type == zipfile.ZIP_DEFLATED:
+        return zlib.decompress(_fatia(buffer, _inicio_dados(buffer, info), info.compress_size), -zlib.MAX_WBITS)
+    with zipfile.ZipFile(LeitorBuffer(buffer)) as zf:
+        return zf.read(info)
+
+
+def arquivos_do_zip(origem, conhecidos=None):
+    """
+    Imagens JPEG de um ZIP: `origem` é o caminho do arquivo (mapeado em
+    memória) ou um upload. Entradas sem compressão são fatias do ZIP; as
+    comprimidas são descomprimidas quando usadas. O `name` de cada entrada
+    é o caminho dentro do ZIP (o pareamento interpreta só o último
+    componente, e o mesmo nome em duas subpastas é relatado como
+    duplicado). `conhecidos` como em arquivos_da_pasta.
+    """
+    conhecidos = conhecidos or {}
+    if isinstance(origem, (str, os.PathLike)):
+        estado = os.stat(origem)
+        buffer = memoryview(_mapear(origem))
+        identificador = f"{os.fspath(origem)}:{estado.st_size}:{estado.st_mtime_ns}"
+    else:
+        buffer = bytes_do_arquivo(origem)
+        identificador = getattr(origem, 'file_id', None) or getattr(origem, 'name', None) or id(origem)
+    with zipfile.ZipFile(LeitorBuffer(buffer)) as zf:
+        infos = zf.infolist()
+    arquivos = []
+    for info in sorted(infos, key=lambda i: i.filename):
+        if info.is_dir() or not _eh_imagem(info.filename) or info.filename.startswith('__MACOSX/'):
+            continue
+        if info.flag_bits & 0x1:
+            raise ValueError(f"ZIP com senha não é suportado ({info.filename}).")
+        file_id = f"{identificador}:{info.filename}"
+        if file_id in conhecidos:
+            arquivos.append(conhecidos[file_id])
+            continue
+        if info.compress_type == zipfile.ZIP_STORED:
+            abrir = partial(_fatia, buffer, _inicio_dados(buffer, info), info.file_size)
+        else:
+            abrir = partial(_descomprimir, buffer, info)
+        arquivos.append(ArquivoCampanha(info.filename, info.file_size, file_id, abrir))
+    return arquivos
+
+
+def raiz_servidor():
+    """Raiz configurada para a leitura de pastas e ZIPs do servidor (TERMOGRAFIA_RAIZ_SERVIDOR), ou None."""
+    raiz = os.environ.get(VARIAVEL_RAIZ, '').strip()
+    return os.path.realpath(raiz) if raiz else None
+
+
+def resolver_caminho(caminho, raiz):
+    """
+    Caminho real (links simbólicos e '..' resolvidos) de `caminho`, relativo à
+    `raiz` se não for absoluto; ValueError se sair da raiz.
+    """
+    if not raiz:
+        raise ValueError(f"Leitura do servidor desativada (defina {VARIAVEL_RAIZ}).")
+    raiz = os.path.realpath(raiz)
+    real = os.path.realpath(os.path.join(raiz, os.path.expanduser(caminho)))
+    if os.path.commonpath([raiz, real]) != raiz:
+        raise ValueError(f"'{caminho}' está fora da pasta permitida ({raiz}).")
+    return real
+
+
+def arquivos_do_caminho(caminho, raiz, conhecidos=None):
+    """Imagens de uma pasta ou de um ZIP no servidor, dentro de `raiz` (ver resolver_caminho)."""
+    caminho = resolver_caminho(caminho, raiz)
+    if os.path.isdir(caminho):
+        return arquivos_da_pasta(caminho, conhecidos)
+    if zipfile.is_zipfile(caminho):
+        return arquivos_do_zip(caminho, conhecidos)
+    raise ValueError(f"'{caminho}' não é uma pasta nem um arquivo ZIP.")
@@ -0,0 +1,96 @@
+"""
+Inspetor de pixels com níveis de detalhe.
+
+A matriz da amostra é reduzida em blocos 2x2, 4x4, ... (média, mínimo e
+máximo de cada bloco) até caber no limite de valores por vista. A vista
+inteira usa o nível mais grosso que cabe; ao selecionar uma região, só os
+blocos daquela janela são enviados, no nível mais fino que cabe. Na grade
+nativa (bloco 1x1) o hover mostra a temperatura exata de cada pixel do
+sensor. Os arrays vão para o Plotly em float32, que os serializa em binário
+(base64) em vez de listas JSON. O Plotly só é importado ao montar a figura.
+"""
+import numpy as np
+
+LIMITE_PIXELS = 40_000
+
+
+def reduzir(matriz, fator):
+    """(média, mínimo, máximo) de blocos fator x fator; as bordas incompletas usam só os pixels existentes."""
+    if fator == 1:
+        return matriz, matriz, matriz
+    altura, largura = matriz.shape
+    h, w = -(-altura // fator), -(-largura // fator)
+    preenchida = np.full((h * fator, w * fator), np.nan, dtype=np.float32)
+    preenchida[:altura, :largura] = matriz
+    blocos = preenchida.reshape(h, fator, w, fator)
+    with np.errstate(invalid='ignore'):
+        return (np.nanmean(blocos, axis=(1, 3)).astype(np.float32),
+                np.nanmin(blocos, axis=(1, 3)), np.nanmax(blocos, axis=(1, 3)))
+
+
+class Piramide:
+    """Níveis de detalhe de uma matriz térmica, do nativo (fator 1) ao que cabe inteiro no limite."""
+
+    def __init__(self, matriz, limite_pixels=LIMITE_PIXELS):
+        self.matriz = np.asarray(matriz, dtype=np.float32)
+        self.limite_pixels = limite_pixels
+        self.vmin = float(np.nanmin(self.matriz))
+        self.vmax = float(np.nanmax(self.matriz))
+        self.niveis = {1: reduzir(self.matriz, 1)}
+        fator = 1
+        while self.matriz.size / fator ** 2 > limite_pixels:
+            fator *= 2
+            self.niveis[fator] = reduzir(self.matriz, fator)
+
+    @property
+    def forma(self):
+        return self.matriz.shape
+
+    def janela_inteira(self):
+        altura, largura = self.forma
+        return 0, altura, 0, largura
+
+    def vista(self, janela=None):
+        """
+        Blocos da janela (linha0, linha1, coluna0, coluna1, em pixels nativos) no
+        nível mais fino que cabe no limite. Retorna (fator, média, mínimo, máximo,
+        linha inicial, coluna inicial), com o início em pixels nativos.
+        """
+        l0, l1, c0, c1 = janela or self.janela_inteira()
+        for fator in sorted(self.niveis):
+            bl0, bc0 = l0 // fator, c0 // fator
+            bl1, bc1 = -(-l1 // fator), -(-c1 // fator)
+            if (bl1 - bl0) * (bc1 - bc0) <= self.limite_pixels or fator == max(self.niveis):
+                media, minimo, maximo = (n[bl0:bl1, bc0:bc1] for n in self.niveis[fator])
+                return fator, media, minimo, maximo, bl0 * fator, bc0 * fator
+
+
+def janela_da_selecao(caixa, forma):
+    """Converte a caixa selecionada no gráfico ({'x': [..], 'y': [..]}) em janela de pixels nativos."""
+    altura, largura = forma
+    xs, ys = sorted(caixa['x']), sorted(caixa['y'])
+    c0, c1 = int(np.clip(np.floor(xs[0] + 0.5), 0, largura - 1)), int(np.clip(np.ceil(xs[1] + 0.5), 1, largura))
+    l0, l1 = int(np.clip(np.floor(ys[0] + 0.5), 0, altura - 1)), int(np.clip(np.ceil(ys[1] + 0.5), 1, altura))
+    return l0, max(l1, l0 + 1), c0, max(c1, c0 + 1)
+
+
+def figura(piramide, janela=None, titulo=None):
+    """Heatmap Plotly da janela; os eixos ficam sempre em pixels nativos do sensor."""
+    import plotly.graph_objects as go
+    fator, media, minimo, maximo, linha0, coluna0 = piramide.vista(janela)
+    centro = (fator - 1) / 2
+    if fator == 1:
+        heatmap = go.Heatmap(z=media, hovertemplate="x: %{x}, y: %{y}<br>Temp: %{z:.2f} °C<extra></extra>")
+    else:
+        heatmap = go.Heatmap(
+            z=media, customdata=np.stack([minimo, maximo], axis=-1),
+            hovertemplate=(f"Bloco {fator}x{fator} · média: %{{z:.2f}} °C<br>"
+                           "mín: %{customdata[0]:.2f} °C · máx: %{customdata[1]:.2f} °C<extra></extra>"))
+    heatmap.update(x0=coluna0 + centro, dx=fator, y0=linha0 + centro, dy=fator,
+                   colorscale='Inferno', zmin=piramide.vmin, zmax=piramide.vmax,
+                   colorbar=dict(title="Temp (°C)"))
+    fig = go.Figure(heatmap)
+    fig.update_layout(title=titulo, dragmode='select', margin=dict(l=10, r=10, t=40, b=10))
+    fig.update_xaxes(showticklabels=False, title="Eixo X", constrain='domain')
+    fig.update_yaxes(showticklabels=False, title="Eixo Y", autorange='reversed', scaleanchor='x')
+    return fig
@@ -0,0 +1,157 @@
+"""
+Instrumentação leve das etapas do pipeline.
+
+Cada etapa é medida com o gerenciador de contexto `etapa`:
+
+    with etapa('decodificacao', arquivo=nome):
+        ...
+
+São registrados tempo de parede, tempo de CPU da thread e, se a medição de
+memória estiver ligada (tracemalloc, mais lenta), os bytes alocados pela
+etapa. Os registros ficam num buffer circular do processo (as últimas
+CAPACIDADE etapas, de todas as sessões e threads) e podem ser exportados em
+JSON ou no formato Chrome trace (chrome://tracing, Perfetto). Desligada,
+`etapa` só testa uma flag ao entrar e ao sair.
+"""
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+import numpy as np
+
+CAPACIDADE = 5000
+
+_estado = {'ativo': True, 'memoria': False}
+_registros = deque(maxlen=CAPACIDADE)
+_local = threading.local()
+# Referência para converter perf_counter em tempo absoluto (µs desde a época) no trace
+_ORIGEM_PERF = time.perf_counter()
+_ORIGEM_EPOCA = time.time()
+
+
+def ativar(ligado=True, memoria=None):
+    """Liga/desliga a instrumentação. `memoria` liga/desliga a contagem de bytes (tracemalloc)."""
+    _estado['ativo'] = bool(ligado)
+    if memoria is not None:
+        _estado['memoria'] = bool(memoria)
+        if memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not memoria and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def ativo():
+    return _estado['ativo']
+
+
+def medindo_memoria():
+    return _estado['memoria'] and tracemalloc.is_tracing()
+
+
+class etapa:
+    """Gerenciador de contexto que mede uma etapa e a guarda no buffer circular."""
+
+    __slots__ = ('nome', 'atributos', '_inicio', '_cpu', '_memoria', '_profundidade')
+
+    def __init__(self, nome, **atributos):
+        self.nome = nome
+        self.atributos = atributos
+        self._inicio = None
+
+    def __enter__(self):
+        if not _estado['ativo']:
+            return self
+        self._profundidade = getattr(_local, 'profundidade', 0)
+        _local.profundidade = self._profundidade + 1
+        self._memoria = None
+        if medindo_memoria():
+            if self._profundidade == 0:
+                tracemalloc.reset_peak()
+            self._memoria = tracemalloc.get_traced_memory()[0]
+        self._cpu = time.thread_time()
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo_erro, erro, tb):
+        if self._inicio is None:
+            return False
+        duracao = time.perf_counter() - self._inicio
+        cpu = time.thread_time() - self._cpu
+        _local.profundidade = self._profundidade
+        registro = {
+            'nome': self.nome,
+            'inicio': self._inicio - _ORIGEM_PERF,
+            'duracao_s': duracao,
+            'cpu_s': cpu,
+            'bytes_alocados': None,
+            'pico_bytes': None,
+            'profundidade': self._profundidade,
+            'thread': threading.get_ident(),
+            'erro': tipo_erro.__name__ if tipo_erro else None,
+            'atributos': self.atributos,
+        }
+        if self._memoria is not None and tracemalloc.is_tracing():
+            atual, pico = tracemalloc.get_traced_memory()
+            registro['bytes_alocados'] = atual - self._memoria
+            # O pico só é confiável na etapa mais externa (as internas não zeram o pico)
+            if self._profundidade == 0:
+                registro['pico_bytes'] = pico - self._memoria
+        _registros.append(registro)
+        self._inicio = None
+        return False
+
+
+def registros():
+    """Cópia dos registros atuais, do mais antigo para o mais recente."""
+    return list(_registros)
+
+
+def limpar():
+    _registros.clear()
+
+
+def resumo():
+    """Agregado por etapa: chamadas, tempo total, médio e p95 (ms), CPU e bytes alocados médios."""
+    por_nome = {}
+    for r in _registros:
+        por_nome.setdefault(r['nome'], []).append(r)
+    linhas = []
+    for nome, rs in por_nome.items():
+        duracoes = np.array([r['duracao_s'] for r in rs]) * 1000
+        alocados = [r['bytes_alocados'] for r in rs if r['bytes_alocados'] is not None]
+        linhas.append({
+            'Etapa': nome,
+            'Chamadas': len(rs),
+            'Total (ms)': float(duracoes.sum()),
+            'Média (ms)': float(duracoes.mean()),
+            'p95 (ms)': float(np.percentile(duracoes, 95)),
+            'CPU média (ms)': float(np.mean([r['cpu_s'] for r in rs]) * 1000),
+            'Alocado médio (KB)': float(np.mean(alocados)) / 1024 if alocados else None,
+        })
+    return sorted(linhas, key=lambda l: l['Total (ms)'], reverse=True)
+
+
+def exportar_json():
+    """Registros em JSON (texto)."""
+    return json.dumps(registros(), ensure_ascii=False, indent=1, default=str)
+
+
+def exportar_chrome_trace():
+    """Registros no formato Chrome trace (eventos completos 'X', tempos em µs)."""
+    pid = os.getpid()
+    eventos = []
+    for r in registros():
+        args = {k: v for k, v in r['atributos'].items()}
+        args.update({'cpu_ms': r['cpu_s'] * 1000})
+        if r['bytes_alocados'] is not None:
+            args['bytes_alocados'] = r['bytes_alocados']
+        if r['erro']:
+            args['erro'] = r['erro']
+        eventos.append({
+            'name': r['nome'], 'cat': 'termografia', 'ph': 'X', 'pid': pid, 'tid': r['thread'],
+            'ts': (_ORIGEM_EPOCA + r['inicio']) * 1e6, 'dur': r['duracao_s'] * 1e6, 'args': args,
+        })
+    return json.dumps({'traceEvents': eventos, 'displayTimeUnit': 'ms'}, default=str)
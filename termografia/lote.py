@@ -0,0 +1,306 @@
+"""
+Processamento em lote de uma campanha inteira, sem navegador.
+
+Uso:
+    python -m termografia.lote PASTA_IMAGENS ROIS.json -o resultados.csv
+
+O arquivo de ROIs é um JSON que associa o ID do par (nome do arquivo sem o
+sufixo _thermal/_visual e sem extensão, em minúsculas, como em
+organizar_pares) a uma caixa [x, y, largura, altura] em pixels da imagem
+térmica exibida, a mesma referência do recorte manual. A chave opcional
+"padrao" vale para os pares não listados; sem ela, a imagem inteira é usada.
+
+    {"padrao": [40, 30, 240, 180], "p01_27_controle_dia_r1": [10, 5, 100, 120]}
+
+Uma imagem com várias plantas leva uma lista de ROIs, cada uma com uma
+"caixa" ou um "poligono" ([[x, y], ...], na mesma referência) e,
+opcionalmente, os metadados próprios ("Planta", "Replica", ...), que
+substituem os do nome do arquivo. Cada ROI vira uma linha da tabela; a
+imagem é decodificada uma vez e as estatísticas de todas as ROIs saem de
+uma passada só (processamento.analisar_rois). Sem "Planta" nem "Replica",
+as ROIs de uma mesma imagem são numeradas como réplicas (1, 2, ...).
+
+    {"bandeja_01_controle_dia": [
+        {"caixa": [10, 5, 100, 120], "Planta": "p01"},
+        {"poligono": [[130, 10], [230, 20], [200, 140], [120, 120]], "Planta": "p02"}]}
+
+A tabela gerada tem as mesmas colunas da tabela do Dashboard. Com
+--matrizes PASTA, as matrizes nativas dos recortes, as máscaras e os
+metadados também são exportados (ver termografia.exportacao). Com
+--projeto NOME, as amostras são gravadas no banco de resultados e aparecem
+no app ao abrir esse projeto (ver termografia.banco), com a miniatura da
+imagem visual e as impressões digitais das etapas, como as do Editor: a
+reanálise do app refaz só o que mudar (ROIs poligonais não são
+reanalisadas, porque o app recorta caixas). --emissividade,
+--emissividade-tratamento, --temp-refletida, --temp-ar, --umidade e
+--distancia substituem os valores gravados pela câmera (ver
+decodificador.corrigir_calibracao).
+"""
+import argparse
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from termografia.decodificador import extrair_termica, calibracao, carregar_perfis, decodificar, perfil_camera, \
+    corrigir_calibracao
+from termografia.processamento import organizar_pares, tamanho_imagem, analisar_rois, carregar_imagem
+from termografia.amostra import Amostra, miniatura_jpeg, LADO_MINIATURA
+from termografia.banco import BancoResultados, CAMINHO_PADRAO, TAMANHO_LOTE
+from termografia.cache import hash_conteudo
+from termografia.exportacao import exportar
+from termografia.pareamento import IndicePares
+from termografia.reanalise import correcao, impressoes
+from termografia.segmentacao import METODOS
+from termografia.tabela import COLUNAS_META
+
+EXTENSOES = ('.jpg', '.jpeg')
+
+
+class ArquivoLocal:
+    """Referência leve a um arquivo em disco, com o atributo `name` usado por organizar_pares."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.name = os.path.basename(caminho)
+
+
+def listar_arquivos(pasta):
+    """Arquivos JPEG da pasta (não recursivo), em ordem de nome."""
+    nomes = sorted(n for n in os.listdir(pasta) if n.lower().endswith(EXTENSOES))
+    return [ArquivoLocal(os.path.join(pasta, n)) for n in nomes]
+
+
+def _normalizar_caixa(caixa):
+    if isinstance(caixa, dict):
+        return [caixa['left'], caixa['top'], caixa['width'], caixa['height']]
+    return list(caixa)
+
+
+def _normalizar_roi(roi):
+    """Caixa, polígono ou dicionário com 'caixa'/'poligono' e metadados -> dicionário de ROI."""
+    if isinstance(roi, dict) and ('caixa' in roi or 'poligono' in roi):
+        roi = dict(roi)
+        if roi.get('caixa') is not None:
+            roi['caixa'] = _normalizar_caixa(roi['caixa'])
+        return roi
+    return {'caixa': _normalizar_caixa(roi)}
+
+
+def _normalizar_rois(valor):
+    # Lista de 4 números é uma caixa; qualquer outra lista, várias ROIs
+    if isinstance(valor, list) and not all(isinstance(v, (int, float)) for v in valor):
+        return [_normalizar_roi(r) for r in valor]
+    return [_normalizar_roi(valor)]
+
+
+def carregar_rois(caminho):
+    """Lê o arquivo de ROIs: {id do par: lista de ROIs ({'caixa': [x, y, largura, altura]} ou {'poligono': ...})}."""
+    with open(caminho, encoding='utf-8') as f:
+        especificacao = json.load(f)
+    return {k.lower(): _normalizar_rois(v) for k, v in especificacao.items()}
+
+
+def _metas_rois(meta, rois):
+    """Metadados de cada ROI: os do par, substituídos pelos da ROI (réplica numerada se a ROI não tem nenhum)."""
+    metas = []
+    for k, roi in enumerate(rois, 1):
+        proprios = {c: str(roi[c]) for c in COLUNAS_META if c in roi}
+        if len(rois) > 1 and not proprios:
+            proprios = {'Replica': str(k)}
+        metas.append(dict(meta, **proprios))
+    return metas
+
+
+def processar_par(caminho_termica, caixa, ponderar_area=True, segmentacao='nenhuma', caminho_visual=None,
+                  com_matriz=False, correcao=None):
+    """
+    Decodifica, segmenta e calcula as estatísticas da ROI na grade nativa (roda no processo filho).
+    Com `com_matriz`, retorna (stats, recorte, máscara do recorte ou None, caixa no sensor,
+    miniatura JPEG do recorte da imagem térmica exibida, miniatura JPEG da imagem visual ou b'',
+    entradas da análise para a origem da amostra ou None se a ROI é um polígono).
+    `correcao` substitui campos da calibração (ver decodificador.corrigir_calibracao).
+    """
+    rois = [{'caixa': caixa}] if caixa is not None else None
+    resultado, = processar_rois(caminho_termica, rois, ponderar_area, segmentacao, caminho_visual, com_matriz, correcao)
+    return resultado
+
+
+def processar_rois(caminho_termica, rois, ponderar_area=True, segmentacao='nenhuma', caminho_visual=None,
+                   com_matriz=False, correcao=None):
+    """
+    processar_par para várias ROIs da mesma imagem (None: a imagem inteira):
+    uma decodificação e uma passada de estatísticas. Retorna um resultado por ROI.
+    """
+    with open(caminho_termica, 'rb') as f:
+        dados = f.read()
+        tamanho_visual = tamanho_imagem(f)
+    if correcao:
+        raw, calib = decodificar(dados)
+        matriz = perfil_camera(corrigir_calibracao(calib, correcao)).converter(raw)
+    else:
+        matriz = extrair_termica(dados)
+    if rois is None:
+        rois = [{'caixa': (0, 0) + tamanho_visual}]
+    visual = dados_visual = None
+    if caminho_visual and (com_matriz or segmentacao in ('visual', 'ambas')):
+        with open(caminho_visual, 'rb') as f:
+            dados_visual = f.read()
+    if segmentacao in ('visual', 'ambas') and dados_visual:
+        visual = carregar_imagem(io.BytesIO(dados_visual)).convert('RGB')
+    resultados = analisar_rois(matriz, rois, tamanho_visual, ponderar_area, segmentacao, visual)
+    if not com_matriz:
+        return [stats for stats, _, _, _ in resultados]
+    exibida = carregar_imagem(io.BytesIO(dados)).convert('RGB')
+    jpeg_visual = miniatura_jpeg(carregar_imagem(io.BytesIO(dados_visual), lado=LADO_MINIATURA)) if dados_visual else b''
+    # Como reanalise.origem_do_par, sem o ID e o tratamento (completados por processar_lote)
+    entradas = {'hash_termica': hash_conteudo(dados),
+                'hash_visual': hash_conteudo(dados_visual) if dados_visual else None,
+                'tamanho_visual': tuple(tamanho_visual), 'forma_sensor': tuple(matriz.shape)}
+    return [(stats, recorte.copy(), mascara, caixa_sensor, _miniatura_recorte(exibida, caixa_sensor, matriz.shape),
+             jpeg_visual, dict(entradas, caixa=tuple(float(v) for v in roi['caixa'])) if roi.get('caixa') else None)
+            for roi, (stats, recorte, mascara, caixa_sensor) in zip(rois, resultados)]
+
+
+def _miniatura_recorte(exibida, caixa_sensor, forma_sensor):
+    """Miniatura da região da imagem exibida que corresponde à caixa no sensor (como o recorte do Editor)."""
+    altura, largura = forma_sensor
+    sx, sy = exibida.width / largura, exibida.height / altura
+    x0, y0, x1, y1 = caixa_sensor
+    return miniatura_jpeg(exibida.crop((int(x0 * sx), int(y0 * sy), int(round(x1 * sx)), int(round(y1 * sy)))))
+
+
+def _tarefa(args):
+    id_par, caminho, rois, opcoes = args
+    try:
+        return id_par, processar_rois(caminho, rois, **opcoes), None
+    except Exception as e:
+        return id_par, None, str(e)
+
+
+def processar_lote(pasta, rois, workers=None, progresso=None, ponderar_area=True, segmentacao='nenhuma',
+                   pasta_matrizes=None, indice=None, banco=None, projeto=None, correcao_radiometrica=None):
+    """
+    Processa todos os pares da pasta em paralelo.
+
+    Retorna (DataFrame com uma linha por ROI, lista de (id, erro) dos pares que falharam).
+    `progresso(feitos, total)` é chamado a cada par concluído, se informado. Com
+    `pasta_matrizes`, exporta também as matrizes dos recortes para essa pasta.
+    `indice` (IndicePares) evita reindexar a pasta se já foi montado. Com
+    `banco` (BancoResultados), as amostras são gravadas no `projeto`.
+    `rois` é como o lido por carregar_rois (uma caixa solta também vale).
+    `correcao_radiometrica` tem as chaves emissividade, emissividade_tratamento
+    e ambiente de reanalise.PARAMETROS_PADRAO, resolvidas por par pelo tratamento.
+    """
+    import pandas as pd
+    com_matriz = pasta_matrizes is not None or banco is not None
+    parametros = dict(correcao_radiometrica or {}, ponderar_area=ponderar_area, segmentacao=segmentacao)
+    pares = indice.pares() if indice is not None else organizar_pares(listar_arquivos(pasta))
+    rois = {k: _normalizar_rois(v) for k, v in rois.items() if v is not None}
+    padrao = rois.get('padrao')
+    tarefas = []
+    for p in pares:
+        opcoes = {'ponderar_area': ponderar_area, 'segmentacao': segmentacao,
+                  'caminho_visual': p['visual'].caminho if p['visual'] else None,
+                  'com_matriz': com_matriz,
+                  'correcao': correcao(correcao_radiometrica or {}, p['meta']['Tratamento'])}
+        tarefas.append((p['id'], p['thermal'].caminho, rois.get(p['id'], padrao), opcoes))
+    metas = {p['id']: _metas_rois(p['meta'], rois.get(p['id'], padrao) or [{}]) for p in pares}
+    tratamentos = {p['id']: p['meta']['Tratamento'] for p in pares}
+
+    workers = workers or os.cpu_count() or 1
+    linhas, falhas, amostras = [], [], []
+    if tarefas:
+        chunksize = max(1, len(tarefas) // (workers * 4))
+        # A calibração do primeiro par (em geral a da campanha toda) já sobe pronta em cada
+        # worker; outras câmeras entram no registro do worker na primeira imagem
+        try:
+            with open(tarefas[0][1], 'rb') as f:
+                calibracoes = [calibracao(f)]
+        except Exception:
+            calibracoes = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=carregar_perfis,
+                                 initargs=(calibracoes,)) as executor:
+            for i, (id_par, resultado, erro) in enumerate(executor.map(_tarefa, tarefas, chunksize=chunksize), 1):
+                if erro:
+                    falhas.append((id_par, erro))
+                else:
+                    for meta, stats in zip(metas[id_par], resultado):
+                        if com_matriz:
+                            stats, recorte, mascara, caixa_sensor, jpeg_recorte, jpeg_visual, entradas = stats
+                            # O tratamento da origem é o do par, o mesmo usado na correção radiométrica
+                            origem = dict(entradas, id=id_par, tratamento=tratamentos[id_par]) if entradas else None
+                            amostras.append(Amostra(meta=meta, stats=stats, matriz=recorte,
+                                                    caixa_sensor=caixa_sensor, jpeg_visual=jpeg_visual,
+                                                    jpeg_recorte=jpeg_recorte, mascara=mascara, origem=origem,
+                                                    impressoes=impressoes(origem, parametros) if origem else None))
+                        row = meta.copy()
+                        row.update(stats)
+                        linhas.append(row)
+                if progresso:
+                    progresso(i, len(tarefas))
+    if pasta_matrizes is not None:
+        exportar(amostras, pasta_matrizes)
+    if banco is not None:
+        for inicio in range(0, len(amostras), TAMANHO_LOTE):
+            banco.inserir(projeto, amostras[inicio:inicio + TAMANHO_LOTE])
+    return pd.DataFrame(linhas), falhas
+
+
+def _ler_emissividades(texto):
+    """'controle=0.97,estresse=0.95' -> {'controle': 0.97, 'estresse': 0.95}."""
+    try:
+        return {t.strip().lower(): float(e) for t, e in (item.split('=') for item in texto.split(','))}
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Emissividade por tratamento inválida: {texto!r} (use trat=0.97,...)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Análise térmica em lote de uma pasta de pares _thermal/_visual.")
+    parser.add_argument('pasta', help="Pasta com as imagens da campanha")
+    parser.add_argument('rois', help="Arquivo JSON com as ROIs por ID do par")
+    parser.add_argument('-o', '--saida', default='dados_radiometricos.csv', help="CSV de saída")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="Número de processos (padrão: todos os núcleos)")
+    parser.add_argument('--sem-ponderacao', action='store_true',
+                        help="Conta só os pixels do sensor com centro dentro da ROI, sem ponderar as bordas pela área")
+    parser.add_argument('--segmentacao', choices=list(METODOS), default='nenhuma',
+                        help="Segmentação automática planta/fundo dentro da ROI")
+    parser.add_argument('--matrizes', metavar='PASTA', default=None,
+                        help="Exporta também as matrizes nativas dos recortes (mmap .npy + índice) para a pasta")
+    parser.add_argument('--emissividade', type=float, default=None,
+                        help="Emissividade no lugar da gravada pela câmera (ex.: 0.97 para folhas)")
+    parser.add_argument('--emissividade-tratamento', metavar='TRAT=E,...', type=_ler_emissividades, default=None,
+                        help="Emissividade por tratamento, ex.: controle=0.97,estresse=0.95 (prioridade sobre a global)")
+    parser.add_argument('--temp-refletida', type=float, default=None, help="Temperatura refletida aparente (°C)")
+    parser.add_argument('--temp-ar', type=float, default=None, help="Temperatura do ar (°C)")
+    parser.add_argument('--umidade', type=float, default=None, help="Umidade relativa do ar (%%)")
+    parser.add_argument('--distancia', type=float, default=None, help="Distância até as plantas (m)")
+    parser.add_argument('--projeto', default=None,
+                        help="Grava também as amostras neste projeto do banco de resultados (o mesmo do app)")
+    parser.add_argument('--banco', default=CAMINHO_PADRAO, help="Arquivo do banco de resultados")
+    args = parser.parse_args(argv)
+    correcao_radiometrica = {
+        'emissividade': args.emissividade,
+        'emissividade_tratamento': args.emissividade_tratamento,
+        'ambiente': {'reflected_apparent_temperature': args.temp_refletida, 'atmospheric_temperature': args.temp_ar,
+                     'relative_humidity': args.umidade, 'object_distance': args.distancia},
+    }
+
+    indice = IndicePares().adicionar(listar_arquivos(args.pasta))
+    for aviso in indice.avisos():
+        print(f"[AVISO] {aviso}", file=sys.stderr)
+    df, falhas = processar_lote(args.pasta, carregar_rois(args.rois), workers=args.workers,
+                                ponderar_area=not args.sem_ponderacao, segmentacao=args.segmentacao,
+                                pasta_matrizes=args.matrizes, indice=indice,
+                                banco=BancoResultados(args.banco) if args.projeto else None, projeto=args.projeto,
+                                correcao_radiometrica=correcao_radiometrica)
+    df.to_csv(args.saida, index=False)
+    print(f"{len(df)} amostras processadas -> {args.saida}")
+    for id_par, erro in falhas:
+        print(f"[ERRO] {id_par}: {erro}", file=sys.stderr)
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Pareamento das imagens visual + térmica pelo nome do arquivo.
+
+Gramática do nome (sem diferenciar maiúsculas):
+
+    <campo1>_<campo2>_..._<campoN>[_-]<thermal|visual>.<jpg|jpeg>
+
+O tipo precisa ser o último termo antes da extensão; "thermal"/"visual" em
+outra posição não contam. O ID do par é o nome sem o sufixo, em minúsculas.
+Os campos são lidos na ordem configurada (padrão: Planta, Ambiente,
+Tratamento, Período, Réplica); um ID com outro número de campos recebe os
+metadados genéricos e é listado como fora do padrão.
+
+O nome pode trazer a pasta de origem (entradas de ZIP em subpastas, por
+exemplo): só o último componente é interpretado.
+
+O IndicePares é um dicionário por ID montado numa passada e atualizado de
+forma incremental. Cada arquivo é identificado pelo file_id (uploads e
+ArquivoCampanha) ou, sem ele, pelo nome: o mesmo nome em duas subpastas,
+ou um arquivo reenviado, são arquivos diferentes. Arquivos sem par,
+duplicados (dois arquivos para o mesmo ID e tipo) e nomes que não seguem a
+gramática são relatados em vez de descartados em silêncio. Com duplicados,
+vale o menor nome (e, no empate, o menor identificador), e os pares saem
+ordenados por ID: o resultado não depende da ordem do upload.
+"""
+import re
+
+CAMPOS_PADRAO = ('Planta', 'Ambiente', 'Tratamento', 'Periodo', 'Replica')
+TIPOS = ('thermal', 'visual')
+
+_PADRAO_ARQUIVO = re.compile(r'^(?P<id>.+?)[_\-]?(?P<tipo>thermal|visual)\.jpe?g$', re.IGNORECASE)
+
+
+def _chave(arq):
+    # Uploads do Streamlit têm file_id (muda se o arquivo for reenviado); arquivos locais, só o nome
+    return getattr(arq, 'file_id', None) or arq.name
+
+
+def meta_generica(id_par):
+    return {'Planta': id_par, 'Ambiente': 'N/A', 'Tratamento': 'N/A', 'Periodo': 'N/A', 'Replica': '1'}
+
+
+class GramaticaNomes:
+    """Interpreta nomes de arquivo: (id, tipo) pelo sufixo e metadados pelos campos do ID."""
+
+    def __init__(self, campos=CAMPOS_PADRAO, separador='_'):
+        self.campos = tuple(campos)
+        sep = re.escape(separador)
+        self._padrao_id = re.compile(
+            '^' + sep.join(f"(?P<{c}>[^{sep}]+)" for c in self.campos) + '$')
+
+    def interpretar(self, nome):
+        """(id, tipo) do arquivo, ou None se o nome não segue a gramática."""
+        m = _PADRAO_ARQUIVO.match(nome.replace('\\', '/').rsplit('/', 1)[-1].lower())
+        if not m:
+            return None
+        return m.group('id'), m.group('tipo')
+
+    def meta(self, id_par):
+        """Metadados do ID, ou None se o número de campos não confere."""
+        m = self._padrao_id.match(id_par)
+        if not m:
+            return None
+        meta = meta_generica(id_par)
+        meta.update(m.groupdict())
+        return meta
+
+
+class IndicePares:
+    """Índice dos pares por ID, atualizado incrementalmente a cada lote de arquivos."""
+
+    def __init__(self, gramatica=None):
+        self.gramatica = gramatica or GramaticaNomes()
+        self._pares = {}
+        self._arquivos = {}        # chave (file_id ou nome) -> (id, tipo) dos arquivos indexados
+        self.ignorados = set()     # nomes fora da gramática
+        self._chaves_ignoradas = set()
+        self.duplicados = {}       # (id, tipo) -> nomes preteridos
+        self.fora_do_padrao = set()
+        self._lista = None
+
+    def __len__(self):
+        return len(self._pares)
+
+    def adicionar(self, arquivos):
+        """Indexa os arquivos ainda não vistos (objetos com `.name` e, opcionalmente, `.file_id`)."""
+        for arq in arquivos:
+            nome, chave = arq.name, _chave(arq)
+            if chave in self._arquivos or chave in self._chaves_ignoradas:
+                continue
+            interpretado = self.gramatica.interpretar(nome)
+            if interpretado is None:
+                self.ignorados.add(nome)
+                self._chaves_ignoradas.add(chave)
+                continue
+            id_par, tipo = interpretado
+            par = self._pares.get(id_par)
+            if par is None:
+                meta = self.gramatica.meta(id_par)
+                if meta is None:
+                    self.fora_do_padrao.add(id_par)
+                    meta = meta_generica(id_par)
+                par = self._pares[id_par] = {'id': id_par, 'visual': None, 'thermal': None, 'meta': meta}
+            atual = par[tipo]
+            if atual is not None:
+                # Dois arquivos para o mesmo ID e tipo: fica o menor nome (no empate, a menor chave)
+                if (atual.name, _chave(atual)) <= (nome, chave):
+                    preterido = nome
+                else:
+                    preterido, par[tipo] = atual.name, arq
+                self.duplicados.setdefault((id_par, tipo), []).append(preterido)
+            else:
+                par[tipo] = arq
+            self._arquivos[chave] = (id_par, tipo)
+        self._lista = None
+        return self
+
+    def sincronizar(self, arquivos):
+        """Deixa o índice igual à lista atual: só indexa os novos, ou refaz tudo se algum saiu."""
+        arquivos = list(arquivos)
+        if (self._arquivos.keys() | self._chaves_ignoradas) - {_chave(a) for a in arquivos}:
+            # Um duplicado preterido pode passar a valer: reconstrói a partir da lista atual
+            self.__init__(self.gramatica)
+        return self.adicionar(arquivos)
+
+    def pares(self):
+        """Pares com térmica, ordenados por ID (mesmo formato de organizar_pares)."""
+        if self._lista is None:
+            self._lista = [self._pares[i] for i in sorted(self._pares) if self._pares[i]['thermal'] is not None]
+        return self._lista
+
+    def sem_par(self):
+        """IDs com só uma das imagens: {'thermal': [...], 'visual': [...]} pelo tipo presente."""
+        faltando = {'thermal': [], 'visual': []}
+        for id_par in sorted(self._pares):
+            par = self._pares[id_par]
+            if par['thermal'] is None:
+                faltando['visual'].append(id_par)
+            elif par['visual'] is None:
+                faltando['thermal'].append(id_par)
+        return faltando
+
+    def relatorio(self):
+        """Listas de problemas encontrados, para exibir ao operador."""
+        sem_par = self.sem_par()
+        return {
+            'so_termica': sem_par['thermal'],
+            'so_visual': sem_par['visual'],
+            'duplicados': {f"{i}_{t}": nomes for (i, t), nomes in sorted(self.duplicados.items())},
+            'ignorados': sorted(self.ignorados),
+            'fora_do_padrao': sorted(self.fora_do_padrao),
+        }
+
+    def avisos(self, limite=5):
+        """Linhas de texto resumindo o relatório (até `limite` nomes por item)."""
+        def lista(nomes):
+            return ', '.join(nomes[:limite]) + (f" (+{len(nomes) - limite})" if len(nomes) > limite else '')
+        rel = self.relatorio()
+        linhas = []
+        if rel['so_termica']:
+            linhas.append(f"{len(rel['so_termica'])} térmica(s) sem visual: {lista(rel['so_termica'])}")
+        if rel['so_visual']:
+            linhas.append(f"{len(rel['so_visual'])} visual(is) sem térmica, ignorada(s): {lista(rel['so_visual'])}")
+        if rel['duplicados']:
+            preteridos = [n for nomes in rel['duplicados'].values() for n in nomes]
+            linhas.append(f"{len(preteridos)} arquivo(s) duplicado(s) ignorado(s): {lista(preteridos)}")
+        if rel['ignorados']:
+            linhas.append(f"{len(rel['ignorados'])} arquivo(s) fora do padrão _thermal/_visual: {lista(rel['ignorados'])}")
+        if rel['fora_do_padrao']:
+            campos = '_'.join(self.gramatica.campos)
+            linhas.append(f"{len(rel['fora_do_padrao'])} ID(s) sem os campos {campos}: {lista(rel['fora_do_padrao'])}")
+        return linhas
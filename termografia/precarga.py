@@ -0,0 +1,128 @@
+"""
+Pré-carregamento dos próximos pares do Editor em segundo plano.
+
+Enquanto o operador recorta o par atual, threads decodificam as imagens e a
+matriz radiométrica dos próximos pares e as deixam no CacheTermico, de modo
+que o "Confirmar" encontra tudo pronto. O trabalho adiantado é limitado por
+número de pares e por um orçamento de memória; um novo upload (assinatura
+diferente) cancela o que estiver pendente e troca as threads. fechar()
+encerra as threads; se a sessão for descartada sem chamá-lo, elas são
+encerradas quando o PreCarregador for coletado.
+"""
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from termografia.cache import hash_conteudo
+from termografia.ingestao import leitor_buffer, LADO_PREVIA
+
+ANTECIPAR = 3
+ORCAMENTO_PADRAO = 128 * 1024 ** 2
+WORKERS = 2
+
+
+def assinatura_upload(arquivos):
+    """
+    Identifica o conjunto de arquivos enviados pelo file_id de cada um (um arquivo
+    reenviado com o mesmo nome e tamanho é outro upload).
+    """
+    return tuple(a.file_id for a in arquivos or [])
+
+
+class PreCarregador:
+    """Fila de decodificação antecipada dos pares, alimentando o cache compartilhado."""
+
+    def __init__(self, cache, antecipar=ANTECIPAR, orcamento=ORCAMENTO_PADRAO, workers=WORKERS):
+        self.cache = cache
+        self.antecipar = antecipar
+        self.orcamento = orcamento
+        self.workers = workers
+        self._executor = None
+        self._encerrar = None
+        self._lock = threading.Lock()
+        self._geracao = 0
+        self._assinatura = None
+        self._futuros = {}
+        self._estimativa = 0  # bytes do último par preparado, para reservar os que estão em andamento
+
+    def _preparar(self, par, geracao):
+        """Decodifica o par (roda na thread). Retorna os bytes ocupados no cache."""
+        total = 0
+        for tipo in ('thermal', 'visual'):
+            if par[tipo] is None or geracao != self._geracao:
+                continue
+            # Cursor próprio sobre o mesmo buffer (sem cópia): o arquivo é lido (seek/read)
+            # também pela thread principal. O hash fica memorizado no arquivo, se ele aceitar
+            hash_conteudo(par[tipo])
+            leitor = leitor_buffer(par[tipo])
+            if tipo == 'thermal':
+                raw, _ = self.cache.termica(leitor)
+                total += raw.nbytes
+                img = self.cache.imagem(leitor)
+            else:
+                img = self.cache.imagem(leitor, LADO_PREVIA)
+            total += img.width * img.height * len(img.getbands())
+        self._estimativa = total
+        return total
+
+    def cancelar(self):
+        """Descarta o trabalho pendente; tarefas já em execução param no próximo arquivo."""
+        self._geracao += 1
+        for futuro in self._futuros.values():
+            futuro.cancel()
+        self._futuros = {}
+
+    def _abrir_executor(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='precarga')
+        # Sem referência ao PreCarregador: roda quando ele é coletado (sessão descartada)
+        self._encerrar = weakref.finalize(self, self._executor.shutdown, wait=False, cancel_futures=True)
+
+    def _fechar(self):
+        self.cancelar()
+        if self._executor is not None:
+            self._encerrar()
+            self._executor = self._encerrar = None
+
+    def fechar(self):
+        """Cancela o pendente e encerra as threads; as que estão decodificando param no próximo arquivo."""
+        with self._lock:
+            self._fechar()
+
+    def atualizar(self, pares, idx, assinatura):
+        """Agenda os pares idx, idx+1, ... dentro dos limites. Chamado a cada rerun do Editor."""
+        with self._lock:
+            if assinatura != self._assinatura:
+                self._fechar()
+                self._assinatura = assinatura
+            if self._executor is None:
+                self._abrir_executor()
+            proximos = pares[idx:idx + 1 + self.antecipar]
+            ids = {p['id'] for p in proximos}
+            self._futuros = {i: f for i, f in self._futuros.items() if i in ids}
+            for par in proximos:
+                if par['id'] in self._futuros:
+                    continue
+                if self._bytes_reservados() >= self.orcamento:
+                    break
+                self._futuros[par['id']] = self._executor.submit(self._preparar, par, self._geracao)
+
+    def _bytes_prontos(self):
+        return sum(f.result() for f in self._futuros.values()
+                   if f.done() and not f.cancelled() and f.exception() is None)
+
+    def _bytes_reservados(self):
+        pendentes = sum(not f.done() for f in self._futuros.values())
+        return self._bytes_prontos() + pendentes * self._estimativa
+
+    def aguardar(self, id_par, timeout=None):
+        """Espera o pré-carregamento do par, se estiver em andamento (evita decodificar duas vezes)."""
+        futuro = self._futuros.get(id_par)
+        if futuro is not None:
+            wait([futuro], timeout=timeout)
+
+    def resumo(self):
+        """Texto curto com o estado da fila, para a barra lateral."""
+        futuros = list(self._futuros.values())
+        prontos = sum(f.done() for f in futuros)
+        return (f"{prontos} pares prontos, {len(futuros) - prontos} em andamento · "
+                f"{self._bytes_prontos() / 1024 ** 2:.0f} MB de {self.orcamento / 1024 ** 2:.0f} MB")
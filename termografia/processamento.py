@@ -0,0 +1,276 @@
+"""Funções de processamento compartilhadas pelo app, ferramentas de debug e cache."""
+import numpy as np
+from PIL import Image, ExifTags
+
+from termografia.pareamento import IndicePares
+from termografia.segmentacao import segmentar, segmentar_recorte, mascara_visual
+
+ORIENTACAO_EXIF = 0x0112
+PERCENTIS = (10, 50, 90)
+# Pontos de amostragem por lado de pixel para a fração de área coberta por um polígono
+SUBAMOSTRAS_POLIGONO = 4
+
+
+def carregar_imagem(uploaded_file, lado=None):
+    """
+    Carrega a imagem visualmente, respeitando a rotação EXIF. Com `lado`, o JPEG
+    é decodificado já reduzido (draft) pelo maior fator entre 1/2, 1/4 e 1/8 que
+    ainda deixa os dois lados com pelo menos `lado` pixels; sem fator possível,
+    é decodificado inteiro. O resultado não é redimensionado para lado x lado.
+    """
+    uploaded_file.seek(0)
+    try:
+        image = Image.open(uploaded_file)
+        if lado:
+            image.draft('RGB', (lado, lado))
+        for orientation in ExifTags.TAGS.keys():
+            if ExifTags.TAGS[orientation] == 'Orientation': break
+        exif = image._getexif()
+        if exif:
+            exif = dict(exif.items())
+            val = exif.get(orientation)
+            if val == 3: image = image.rotate(180, expand=True)
+            elif val == 6: image = image.rotate(270, expand=True)
+            elif val == 8: image = image.rotate(90, expand=True)
+        return image
+    except:
+        uploaded_file.seek(0)
+        return Image.open(uploaded_file)
+
+def organizar_pares(uploaded_files, gramatica=None):
+    """Agrupa as imagens em pares visual + térmica (ver termografia.pareamento)."""
+    return IndicePares(gramatica).adicionar(uploaded_files).pares()
+
+def tamanho_imagem(arquivo):
+    """(largura, altura) como exibida por carregar_imagem, lendo só o cabeçalho."""
+    arquivo.seek(0)
+    with Image.open(arquivo) as image:
+        largura, altura = image.size
+        try:
+            orientacao = image.getexif().get(ORIENTACAO_EXIF)
+        except Exception:
+            orientacao = None
+    return (altura, largura) if orientacao in (6, 8) else (largura, altura)
+
+def caixa_para_sensor(caixa, tamanho_visual, forma_sensor):
+    """
+    Converte a caixa (x, y, largura, altura) em pixels da imagem exibida para
+    coordenadas contínuas (x0, y0, x1, y1) na grade nativa do sensor.
+    """
+    x, y, w, h = caixa
+    largura_vis, altura_vis = tamanho_visual
+    altura_s, largura_s = forma_sensor[:2]
+    sx, sy = largura_s / largura_vis, altura_s / altura_vis
+    x0, x1 = np.clip([x * sx, (x + w) * sx], 0, largura_s)
+    y0, y1 = np.clip([y * sy, (y + h) * sy], 0, altura_s)
+    return float(x0), float(y0), float(x1), float(y1)
+
+def _cobertura(inicio, fim):
+    """Índices dos pixels tocados pelo intervalo [inicio, fim) e a fração coberta de cada um."""
+    primeiro, ultimo = int(np.floor(inicio)), int(np.ceil(fim))
+    if ultimo <= primeiro:
+        ultimo = primeiro + 1
+    bordas = np.arange(primeiro, ultimo, dtype=np.float64)
+    fracao = np.clip(np.minimum(bordas + 1, fim) - np.maximum(bordas, inicio), 0, 1)
+    return slice(primeiro, ultimo), fracao
+
+def janela_sensor(caixa_sensor, ponderar_area=True):
+    """
+    Janela (fatias de linha e coluna) da grade do sensor coberta pela caixa e
+    o peso de cada pixel. Com ponderar_area, pixels de borda pesam pela fração
+    de área dentro da caixa; sem, contam os pixels cujo centro está na caixa.
+    """
+    x0, y0, x1, y1 = caixa_sensor
+    linhas, wy = _cobertura(y0, y1)
+    colunas, wx = _cobertura(x0, x1)
+    pesos = np.outer(wy, wx)
+    if not ponderar_area:
+        centro_y = np.arange(linhas.start, linhas.stop) + 0.5
+        centro_x = np.arange(colunas.start, colunas.stop) + 0.5
+        dentro = np.outer((centro_y >= y0) & (centro_y < y1), (centro_x >= x0) & (centro_x < x1))
+        # Caixa menor que um pixel: fica o pixel de maior cobertura
+        pesos = dentro.astype(np.float64) if dentro.any() else (pesos == pesos.max()).astype(np.float64)
+    return (linhas, colunas), pesos
+
+def estatisticas_roi(matriz_termica, caixa_sensor, ponderar_area=True, mascara=None):
+    """
+    Estatísticas da caixa direto na grade nativa. Retorna (stats, recorte nativo).
+    Com `mascara` (booleana, forma da matriz), só os pixels marcados contam.
+    """
+    janela, pesos = janela_sensor(caixa_sensor, ponderar_area)
+    recorte = matriz_termica[janela]
+    return estatisticas_recorte(recorte, pesos, mascara[janela] if mascara is not None else None), recorte
+
+def pesos_recorte(recorte, pesos, mascara_recorte=None):
+    """Pesos de janela_sensor combinados com a máscara do recorte (opcional), validando a ROI."""
+    if recorte.shape != pesos.shape or recorte.size == 0:
+        raise ValueError("ROI fora da imagem.")
+    if mascara_recorte is not None:
+        pesos = pesos * mascara_recorte
+        if not pesos.any():
+            raise ValueError("Nenhum pixel de planta na ROI após a segmentação.")
+    return pesos
+
+def estatisticas_recorte(recorte, pesos, mascara_recorte=None):
+    """Estatísticas do recorte já extraído, com os pesos de janela_sensor e a máscara do recorte (opcional)."""
+    return calcular_estatisticas(recorte, pesos_recorte(recorte, pesos, mascara_recorte))
+
+def analisar_roi(matriz_termica, caixa_sensor, ponderar_area=True, segmentacao='nenhuma', visual=None):
+    """Segmentação (opcional) + estatísticas da ROI. Retorna (stats, recorte nativo, máscara ou None)."""
+    janela, _ = janela_sensor(caixa_sensor, ponderar_area)
+    mascara = segmentar(matriz_termica, segmentacao, visual, janela)
+    stats, recorte = estatisticas_roi(matriz_termica, caixa_sensor, ponderar_area, mascara)
+    return stats, recorte, mascara
+
+def estatisticas_rotuladas(valores, rotulos, pesos, n_rotulos):
+    """
+    Estatísticas de vários rótulos (ROIs) numa passada só. `valores`, `rotulos`
+    (0 a n_rotulos - 1) e `pesos` são arrays planos paralelos: um pixel pode
+    aparecer mais de uma vez, com o rótulo e o peso de cada ROI que o cobre.
+    Média e desvio ponderados vêm de np.bincount; mínimo, máximo e percentis
+    (ponderados, pela inversa da distribuição acumulada) de uma única
+    ordenação por (rótulo, valor). Retorna um dicionário por rótulo, ou None
+    para rótulo sem pixel de peso positivo.
+    """
+    pesos = np.asarray(pesos, dtype=np.float64)
+    validos = pesos > 0
+    valores, rotulos, pesos = np.asarray(valores)[validos], np.asarray(rotulos)[validos], pesos[validos]
+    soma_pesos = np.bincount(rotulos, pesos, n_rotulos)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        media = np.bincount(rotulos, pesos * valores, n_rotulos) / soma_pesos
+        variancia = np.bincount(rotulos, pesos * (valores - media[rotulos]) ** 2, n_rotulos) / soma_pesos
+
+    # Ordena pelo valor e depois, estável, pelo rótulo (radix sort em inteiros de 16 bits)
+    ordem = np.argsort(valores)
+    if n_rotulos > 1:
+        tipo = np.uint16 if n_rotulos <= np.iinfo(np.uint16).max else np.int64
+        ordem = ordem[np.argsort(rotulos[ordem].astype(tipo), kind='stable')]
+    valores, pesos = valores[ordem], pesos[ordem]
+    contagem = np.bincount(rotulos, minlength=n_rotulos)
+    fim = np.cumsum(contagem)
+    inicio = fim - contagem
+    acumulado = np.cumsum(pesos)
+    base = np.where(inicio > 0, acumulado[np.maximum(inicio - 1, 0)] if acumulado.size else 0.0, 0.0)
+    percentis = {}
+    for p in PERCENTIS:
+        # Primeiro valor do rótulo cuja soma acumulada de pesos alcança p% do total
+        posicao = np.searchsorted(acumulado, base + soma_pesos * (p / 100), side='left')
+        percentis[p] = np.clip(posicao, inicio, np.maximum(fim - 1, inicio))
+
+    resultado = []
+    for k in range(n_rotulos):
+        if fim[k] == inicio[k]:
+            resultado.append(None)
+            continue
+        stats = {
+            'Temp_Media': float(media[k]),
+            'Temp_Max': float(valores[fim[k] - 1]),
+            'Temp_Min': float(valores[inicio[k]]),
+            'Desvio': float(np.sqrt(variancia[k])),
+        }
+        stats.update({f'Temp_P{p}': float(valores[percentis[p][k]]) for p in PERCENTIS})
+        resultado.append(stats)
+    return resultado
+
+def estatisticas_recortes(recortes, pesos):
+    """estatisticas_rotuladas para vários recortes (um rótulo cada), com os pesos de cada um."""
+    valores = np.concatenate([np.ravel(r) for r in recortes]) if recortes else np.empty(0)
+    rotulos = np.repeat(np.arange(len(recortes)), [np.size(r) for r in recortes])
+    pesos = np.concatenate([np.ravel(p) for p in pesos]) if pesos else np.empty(0)
+    return estatisticas_rotuladas(valores, rotulos, pesos, len(recortes))
+
+def calcular_estatisticas(pixels, pesos=None):
+    """Estatísticas descritivas da região analisada (média, desvio e percentis ponderados se houver pesos)."""
+    pixels = np.asarray(pixels)
+    stats, = estatisticas_recortes([pixels], [np.ones(pixels.shape) if pesos is None else pesos])
+    if stats is None:
+        raise ValueError("Nenhum pixel na ROI.")
+    return stats
+
+# --- VÁRIAS ROIs POR IMAGEM ---
+
+def poligono_para_sensor(pontos, tamanho_visual, forma_sensor):
+    """Vértices [(x, y), ...] em pixels da imagem exibida para coordenadas contínuas na grade do sensor."""
+    largura_vis, altura_vis = tamanho_visual
+    altura_s, largura_s = forma_sensor[:2]
+    pontos = np.asarray(pontos, dtype=np.float64).reshape(-1, 2)
+    if len(pontos) < 3:
+        raise ValueError("Um polígono precisa de pelo menos 3 vértices.")
+    return pontos * (largura_s / largura_vis, altura_s / altura_vis)
+
+def _dentro_poligono(x, y, pontos):
+    """Regra par-ímpar, vetorizada nos pontos (x, y) e iterada nas arestas."""
+    dentro = np.zeros(np.broadcast(x, y).shape, dtype=bool)
+    xa, ya = pontos[:, 0], pontos[:, 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for x1, y1, x2, y2 in zip(xa, ya, np.roll(xa, -1), np.roll(ya, -1)):
+            cruza = (y1 > y) != (y2 > y)
+            dentro ^= cruza & (x < x1 + (y - y1) * (x2 - x1) / (y2 - y1))
+    return dentro
+
+def janela_poligono(poligono_sensor, forma_sensor, ponderar_area=True):
+    """
+    Como janela_sensor, para um polígono na grade do sensor: retorna (caixa_sensor
+    envolvente, janela, pesos). Com ponderar_area, o peso é a fração do pixel
+    dentro do polígono (SUBAMOSTRAS_POLIGONO² pontos por pixel); sem, contam os
+    pixels cujo centro está dentro.
+    """
+    altura_s, largura_s = forma_sensor[:2]
+    x0, y0 = np.clip(poligono_sensor.min(axis=0), 0, (largura_s, altura_s))
+    x1, y1 = np.clip(poligono_sensor.max(axis=0), 0, (largura_s, altura_s))
+    caixa_sensor = float(x0), float(y0), float(x1), float(y1)
+    (linhas, colunas), _ = janela_sensor(caixa_sensor)
+    n = SUBAMOSTRAS_POLIGONO if ponderar_area else 1
+    passo = (np.arange(n) + 0.5) / n
+    y = (np.arange(linhas.start, linhas.stop)[:, None] + passo).ravel()
+    x = (np.arange(colunas.start, colunas.stop)[:, None] + passo).ravel()
+    dentro = _dentro_poligono(x[None, :], y[:, None], poligono_sensor)
+    pesos = dentro.reshape(len(y) // n, n, len(x) // n, n).mean(axis=(1, 3))
+    if not pesos.any():
+        # Polígono menor que um pixel (ou que o espaçamento da amostragem): fica o pixel de maior cobertura da caixa
+        pesos = janela_sensor(caixa_sensor, ponderar_area)[1]
+        pesos = (pesos == pesos.max()).astype(np.float64)
+    return caixa_sensor, (linhas, colunas), pesos
+
+def geometria_roi(roi, tamanho_visual, forma_sensor, ponderar_area=True):
+    """
+    Caixa no sensor, janela e pesos de uma ROI na imagem exibida: um dicionário
+    com 'caixa' (x, y, largura, altura) ou 'poligono' [(x, y), ...].
+    """
+    if roi.get('poligono') is not None:
+        return janela_poligono(poligono_para_sensor(roi['poligono'], tamanho_visual, forma_sensor), forma_sensor,
+                               ponderar_area)
+    caixa_sensor = caixa_para_sensor(roi['caixa'], tamanho_visual, forma_sensor)
+    janela, pesos = janela_sensor(caixa_sensor, ponderar_area)
+    return (caixa_sensor, janela, pesos)
+
+def analisar_rois(matriz_termica, rois, tamanho_visual, ponderar_area=True, segmentacao='nenhuma', visual=None):
+    """
+    Várias ROIs (ver geometria_roi) sobre a mesma matriz, decodificada uma vez:
+    segmentação por ROI (o limiar térmico é o de cada recorte; a máscara visual
+    é calculada uma vez para a imagem) e as estatísticas de todas numa passada
+    rotulada. Retorna, por ROI, (stats, recorte nativo, máscara do recorte ou
+    None, caixa_sensor); a máscara de um polígono marca os pixels dentro dele.
+    """
+    vegetacao = None
+    if segmentacao in ('visual', 'ambas'):
+        if visual is None:
+            raise ValueError("A segmentação visual exige a imagem visual do par.")
+        vegetacao = mascara_visual(np.asarray(visual), matriz_termica.shape)
+    recortes, pesos, saida = [], [], []
+    for k, roi in enumerate(rois, 1):
+        caixa_sensor, janela, pesos_roi = geometria_roi(roi, tamanho_visual, matriz_termica.shape, ponderar_area)
+        recorte = matriz_termica[janela]
+        mascara = segmentar_recorte(recorte, 'termica' if segmentacao in ('termica', 'ambas') else 'nenhuma')
+        if vegetacao is not None:
+            mascara = vegetacao[janela] if mascara is None else mascara & vegetacao[janela]
+        if roi.get('poligono') is not None and recorte.shape == pesos_roi.shape:
+            mascara = (pesos_roi > 0) if mascara is None else mascara & (pesos_roi > 0)
+        try:
+            pesos.append(pesos_recorte(recorte, pesos_roi, mascara))
+        except ValueError as e:
+            raise ValueError(f"ROI {k}: {e}")
+        recortes.append(recorte)
+        saida.append((recorte, mascara, caixa_sensor))
+    stats = estatisticas_recortes(recortes, pesos)
+    return [(s, recorte, mascara, caixa_sensor) for s, (recorte, mascara, caixa_sensor) in zip(stats, saida)]
@@ -0,0 +1,310 @@
+"""
+Análise incremental das amostras: só refaz o que mudou.
+
+A análise de uma amostra é uma cadeia de etapas:
+
+    decodificacao -> celsius -> alinhamento -> mascara -> estatisticas
+
+Cada etapa tem uma impressão digital (hash das suas entradas e da impressão
+da etapa anterior), guardada na própria Amostra junto com o recorte, a
+máscara e as estatísticas. Quando a ROI de uma amostra ou um parâmetro
+global muda, só as etapas cuja impressão mudou são refeitas:
+
+* segmentação: máscara e estatísticas, a partir do recorte já guardado;
+* ROI ou ponderação de bordas: alinhamento em diante;
+* emissividade (global ou por tratamento), temperatura refletida,
+  temperatura e umidade do ar ou distância: conversão para °C em diante,
+  com um novo perfil de câmera sobre as mesmas contagens brutas.
+
+A matriz bruta nunca é decodificada de novo: vem do CacheTermico pelo hash
+do arquivo. As últimas matrizes em °C ficam num LRU pequeno, para editar
+várias vezes a ROI da mesma amostra sem refazer a conversão.
+
+analisar_lote faz o mesmo para uma lista de amostras: as que precisam de
+nova conversão para °C têm as matrizes brutas convertidas juntas, numa pilha
+por resolução do sensor (decodificador.converter_pilha), e as várias ROIs de
+uma mesma imagem usam uma conversão só. As estatísticas do lote inteiro saem
+de uma passada rotulada (processamento.estatisticas_rotuladas);
+reanalisar_amostras aplica analisar_lote em blocos a uma coleção inteira.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from termografia.cache import hash_conteudo
+from termografia.decodificador import perfil_camera, corrigir_calibracao, converter_pilha
+from termografia.instrumentacao import etapa
+from termografia.processamento import caixa_para_sensor, janela_sensor, pesos_recorte, calcular_estatisticas, \
+    estatisticas_recortes
+from termografia.segmentacao import segmentar_recorte
+
+ETAPAS = ('decodificacao', 'celsius', 'alinhamento', 'mascara', 'estatisticas')
+PARAMETROS_PADRAO = {'ponderar_area': True, 'segmentacao': 'nenhuma', 'emissividade': None, 'ambiente': None,
+                     'emissividade_tratamento': None}
+# Condições de campo aceitas em parametros['ambiente'] (None ou ausente: valor gravado pela câmera)
+CAMPOS_AMBIENTE = ('reflected_apparent_temperature', 'atmospheric_temperature', 'relative_humidity',
+                   'object_distance')
+LIMITE_MATRIZES = 8
+BLOCO_REANALISE = 64
+
+
+def _impressao(*partes):
+    return hashlib.blake2b(repr(partes).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def correcao(parametros, tratamento=None):
+    """
+    Campos da calibração a substituir para uma amostra do tratamento: a
+    emissividade do tratamento (ou a global) e as condições de `ambiente`.
+    Só entram os valores informados.
+    """
+    p = dict(PARAMETROS_PADRAO, **parametros)
+    campos = {c: v for c, v in (p['ambiente'] or {}).items() if v is not None}
+    fora = set(campos) - set(CAMPOS_AMBIENTE)
+    if fora:
+        raise ValueError(f"Condição ambiental desconhecida: {sorted(fora)}")
+    emissividade = (p['emissividade_tratamento'] or {}).get(tratamento, p['emissividade'])
+    if emissividade is not None:
+        campos['emissivity'] = float(emissividade)
+    return campos
+
+
+def impressoes(origem, parametros):
+    """
+    Impressão digital de cada etapa para as entradas da amostra e os
+    parâmetros (`origem['tratamento']` escolhe a emissividade por tratamento).
+    """
+    p = dict(PARAMETROS_PADRAO, **parametros)
+    usa_visual = p['segmentacao'] in ('visual', 'ambas')
+    imp = {'decodificacao': _impressao(origem['hash_termica'])}
+    imp['celsius'] = _impressao(imp['decodificacao'], tuple(sorted(correcao(p, origem.get('tratamento')).items())))
+    imp['alinhamento'] = _impressao(imp['celsius'], tuple(origem['caixa']), tuple(origem['tamanho_visual']),
+                                    bool(p['ponderar_area']))
+    imp['mascara'] = _impressao(imp['alinhamento'], p['segmentacao'], origem.get('hash_visual') if usa_visual else None)
+    imp['estatisticas'] = _impressao(imp['mascara'])
+    return imp
+
+
+def origem_do_par(par, caixa, tamanho_visual):
+    """Origem (entradas da análise) do recorte `caixa` de um par de organizar_pares exibido em `tamanho_visual`."""
+    return {
+        'id': par['id'],
+        'hash_termica': hash_conteudo(par['thermal']),
+        'hash_visual': hash_conteudo(par['visual']) if par['visual'] else None,
+        'caixa': tuple(float(v) for v in caixa),
+        'tamanho_visual': tuple(tamanho_visual),
+        'tratamento': par['meta']['Tratamento'],
+    }
+
+
+def etapas_pendentes(antigas, novas):
+    """Etapas a refazer: da primeira cuja impressão mudou até o fim da cadeia."""
+    antigas = antigas or {}
+    for i, nome in enumerate(ETAPAS):
+        if antigas.get(nome) != novas[nome]:
+            return ETAPAS[i:]
+    return ()
+
+
+class Reanalisador:
+    """Executa a cadeia de etapas de uma amostra reaproveitando os resultados ainda válidos."""
+
+    def __init__(self, cache, limite_matrizes=LIMITE_MATRIZES):
+        self.cache = cache
+        self.limite_matrizes = limite_matrizes
+        self._matrizes = OrderedDict()  # impressão da etapa 'celsius' -> matriz inteira em °C
+        self._lock = threading.Lock()
+
+    def _em_memoria(self, impressao):
+        with self._lock:
+            if impressao in self._matrizes:
+                self._matrizes.move_to_end(impressao)
+                return self._matrizes[impressao]
+        return None
+
+    def _guardar(self, impressao, matriz):
+        with self._lock:
+            self._matrizes[impressao] = matriz
+            while len(self._matrizes) > self.limite_matrizes:
+                self._matrizes.popitem(last=False)
+
+    def _bruta(self, origem, arquivo_termica):
+        with etapa('analise.decodificacao'):
+            if arquivo_termica is not None:
+                return self.cache.termica(arquivo_termica)
+            encontrado = self.cache.termica_salva(origem['hash_termica'])
+            if encontrado is None:
+                raise ValueError(f"Imagem térmica de '{origem['id']}' fora do cache e ausente do upload.")
+            return encontrado
+
+    def _celsius(self, origem, impressao, campos, arquivo_termica):
+        matriz = self._em_memoria(impressao)
+        if matriz is not None:
+            return matriz
+        raw, calib = self._bruta(origem, arquivo_termica)
+        with etapa('analise.celsius'):
+            matriz = perfil_camera(corrigir_calibracao(calib, campos)).converter(raw)
+        self._guardar(impressao, matriz)
+        return matriz
+
+    def analisar(self, origem, parametros, arquivo_termica=None, visual=None, anterior=None):
+        """
+        Roda as etapas pendentes da amostra. Retorna (resultado, etapas refeitas).
+
+        `origem`: id, hash_termica, hash_visual, caixa (x, y, largura, altura na
+        imagem exibida) e tamanho_visual. `anterior` é a Amostra já analisada
+        (ou None), cujos resultados valem para as etapas sem mudança. `visual`
+        é a imagem visual do par ou uma função que a carrega, chamada só se a
+        segmentação precisar. O resultado tem matriz (recorte em °C),
+        caixa_sensor, mascara, stats, impressoes e origem (com a forma do sensor);
+        se nada mudou desde `anterior`, retorna (None, ()).
+        """
+        return self._executar(origem, parametros, arquivo_termica, visual, anterior)
+
+    def _executar(self, origem, parametros, arquivo_termica, visual, anterior, matriz=None, adiar_estatisticas=False):
+        """
+        Corpo de analisar(); `matriz` é a matriz em °C já convertida (por analisar_lote), se houver.
+        Com `adiar_estatisticas`, o resultado leva os pesos finais em 'pesos' no lugar de 'stats'.
+        """
+        p = dict(PARAMETROS_PADRAO, **parametros)
+        novas = impressoes(origem, p)
+        pendentes = etapas_pendentes(anterior.impressoes if anterior is not None else None, novas)
+        if anterior is not None and not pendentes:
+            return None, ()
+
+        origem = dict(origem)
+        if anterior is not None and 'alinhamento' not in pendentes:
+            recorte, caixa_sensor = anterior.matriz, anterior.caixa_sensor
+            origem['forma_sensor'] = anterior.origem['forma_sensor']
+        else:
+            if matriz is None:
+                matriz = self._celsius(origem, novas['celsius'], correcao(p, origem.get('tratamento')),
+                                       arquivo_termica)
+            with etapa('analise.alinhamento'):
+                caixa_sensor = caixa_para_sensor(origem['caixa'], origem['tamanho_visual'], matriz.shape)
+                janela, _ = janela_sensor(caixa_sensor, p['ponderar_area'])
+                recorte = matriz[janela].copy()
+            origem['forma_sensor'] = tuple(matriz.shape)
+
+        janela, pesos = janela_sensor(caixa_sensor, p['ponderar_area'])
+        if anterior is not None and 'mascara' not in pendentes:
+            mascara = anterior.mascara
+        else:
+            with etapa('analise.mascara', segmentacao=p['segmentacao']):
+                if p['segmentacao'] in ('visual', 'ambas') and callable(visual):
+                    visual = visual()
+                mascara = segmentar_recorte(recorte, p['segmentacao'], visual, origem['forma_sensor'], janela)
+        pesos = pesos_recorte(recorte, pesos, mascara)
+        resultado = {'matriz': recorte, 'caixa_sensor': caixa_sensor, 'mascara': mascara,
+                     'impressoes': novas, 'origem': origem}
+        if adiar_estatisticas:
+            resultado['pesos'] = pesos
+        else:
+            with etapa('analise.estatisticas'):
+                resultado['stats'] = calcular_estatisticas(recorte, pesos)
+        return resultado, pendentes
+
+    def analisar_lote(self, itens, parametros):
+        """
+        analisar() para vários itens (dicionários com origem e, opcionalmente,
+        arquivo_termica, visual e anterior). As matrizes brutas das amostras
+        que precisam de nova conversão para °C são empilhadas por resolução e
+        convertidas juntas; itens com a mesma impressão de °C (várias ROIs da
+        mesma imagem) compartilham uma conversão. As estatísticas de todos os
+        itens saem de uma passada rotulada só. Retorna, na ordem dos itens,
+        (resultado, etapas refeitas, erro): erro é None ou a mensagem da falha
+        daquela amostra.
+        """
+        p = dict(PARAMETROS_PADRAO, **parametros)
+        saida = [None] * len(itens)
+        matrizes, pilhas, mesma_matriz = {}, {}, {}
+        primeiro = {}  # impressão de °C -> primeiro item que a converte
+        for i, item in enumerate(itens):
+            anterior = item.get('anterior')
+            novas = impressoes(item['origem'], p)
+            pendentes = etapas_pendentes(anterior.impressoes if anterior is not None else None, novas)
+            if 'celsius' not in pendentes or self._em_memoria(novas['celsius']) is not None:
+                continue
+            if novas['celsius'] in primeiro:
+                mesma_matriz[i] = primeiro[novas['celsius']]
+                continue
+            primeiro[novas['celsius']] = i
+            try:
+                raw, calib = self._bruta(item['origem'], item.get('arquivo_termica'))
+                calib = corrigir_calibracao(calib, correcao(p, item['origem'].get('tratamento')))
+            except Exception as e:
+                saida[i] = (None, None, str(e))
+                continue
+            pilhas.setdefault((raw.shape, raw.dtype.str), []).append((i, raw, calib))
+        for quadros in pilhas.values():
+            with etapa('analise.celsius_lote', quadros=len(quadros)):
+                try:
+                    convertidas = converter_pilha(np.stack([raw for _, raw, _ in quadros]),
+                                                  [calib for _, _, calib in quadros])
+                except ValueError:
+                    # Algum quadro fora da curva: converte um a um para a falha ficar só nele
+                    convertidas = None
+            for k, (i, raw, calib) in enumerate(quadros):
+                if convertidas is not None:
+                    matrizes[i] = convertidas[k]
+                    continue
+                try:
+                    matrizes[i] = perfil_camera(calib).converter(raw)
+                except ValueError as e:
+                    saida[i] = (None, None, str(e))
+        for i, j in mesma_matriz.items():
+            if saida[j] is not None:
+                saida[i] = saida[j]
+            else:
+                matrizes[i] = matrizes[j]
+
+        for i, item in enumerate(itens):
+            if saida[i] is not None:
+                continue
+            try:
+                resultado, refeitas = self._executar(item['origem'], p, item.get('arquivo_termica'),
+                                                     item.get('visual'), item.get('anterior'), matrizes.get(i),
+                                                     adiar_estatisticas=True)
+                saida[i] = (resultado, refeitas, None)
+            except Exception as e:
+                saida[i] = (None, None, str(e))
+
+        calculados = [resultado for resultado, _, erro in saida if resultado is not None]
+        with etapa('analise.estatisticas_lote', rois=len(calculados)):
+            stats = estatisticas_recortes([r['matriz'] for r in calculados], [r.pop('pesos') for r in calculados])
+        for resultado, stats_roi in zip(calculados, stats):
+            resultado['stats'] = stats_roi
+        return saida
+
+    def reanalisar_amostras(self, amostras, pares, parametros, bloco=BLOCO_REANALISE):
+        """
+        Reanálise de uma sequência de amostras (lista ou ColecaoAmostras) com
+        analisar_lote, `bloco` amostras por vez. Os arquivos vêm de `pares`
+        (organizar_pares) pelo ID da origem; fora deles, a matriz bruta sai do
+        cache pelo hash. Amostras sem origem, sem mudança ou removidas do banco
+        (None na coleção) são puladas. Gera
+        (posição, amostra, etapas refeitas, erro): a amostra reanalisada ou,
+        se houve erro, a original.
+        """
+        por_id = {p['id']: p for p in pares}
+        for inicio in range(0, len(amostras), bloco):
+            posicoes, itens = [], []
+            for i, amostra in enumerate(amostras[inicio:inicio + bloco], inicio):
+                if amostra is None or amostra.origem is None:
+                    continue
+                par = por_id.get(amostra.origem['id'])
+                posicoes.append(i)
+                itens.append({
+                    # O tratamento vem dos metadados (amostras antigas não o têm na origem)
+                    'origem': dict(amostra.origem, tratamento=amostra.meta['Tratamento']),
+                    'arquivo_termica': par['thermal'] if par else None,
+                    'visual': (lambda v=par['visual']: self.cache.imagem(v)) if par and par['visual'] else None,
+                    'anterior': amostra,
+                })
+            for i, item, (resultado, refeitas, erro) in zip(posicoes, itens, self.analisar_lote(itens, parametros)):
+                if erro:
+                    yield i, item['anterior'], (), erro
+                elif resultado is not None:
+                    yield i, item['anterior'].reanalisada(resultado), refeitas, None
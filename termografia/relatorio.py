@@ -0,0 +1,225 @@
+"""
+Relatório técnico em PDF.
+
+As páginas são renderizadas em partes de tamanho fixo, em processos
+paralelos, e cada parte é gravada em disco assim que fica pronta. A memória
+usada fica limitada ao tamanho de uma parte por processo, não ao total de
+amostras: só as partes em andamento são fatiadas da lista (que pode ser uma
+coleção lida do banco). Com mais de uma parte, cada uma numera as páginas a
+partir de onde a anterior parou e, no fim, as partes são juntadas (pypdf,
+sem renderizar de novo) num único PDF. Os mapas de calor saem direto do colormap para PNG (sem
+pyplot) e ficam no cache de renderização (renderizacao.CacheRenderizacao):
+um relatório gerado de novo reaproveita os PNGs. O documento final é
+escrito no arquivo à medida que o FPDF o monta; o fpdf só é importado
+quando um relatório é gerado.
+"""
+import itertools
+import multiprocessing
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+from termografia.renderizacao import barra_de_cores, codificar_png, cache_padrao, PASTA_CACHE
+
+PAGINAS_POR_PARTE = 50
+
+
+class _BufferPDF:
+    """
+    Substitui a string interna do FPDF, que cresce por concatenação (custo
+    quadrático com muitas imagens), por escrita incremental em arquivo ou lista.
+    """
+    def __init__(self, arquivo=None):
+        self._arquivo = arquivo
+        self._partes = []
+        self._tamanho = 0
+    def __iadd__(self, s):
+        dados = s.encode('latin-1')
+        self._tamanho += len(dados)
+        if self._arquivo:
+            self._arquivo.write(dados)
+        else:
+            self._partes.append(dados)
+        return self
+    def __len__(self):
+        return self._tamanho
+    def encode(self, *args):
+        return b''.join(self._partes)
+
+
+@lru_cache(maxsize=None)
+def classe_pdf():
+    """Classe PDFRelatorio (subclasse do FPDF), criada na primeira chamada."""
+    from fpdf import FPDF
+
+    class PDFRelatorio(FPDF):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.buffer = _BufferPDF()
+            self.primeira_pagina = 1
+        def gravar(self, caminho):
+            """Finaliza o documento escrevendo direto no arquivo, sem montar o PDF em memória."""
+            with open(caminho, 'wb') as f:
+                self.buffer = _BufferPDF(f)
+                self.close()
+        def header(self):
+            self.set_font('Arial', 'B', 16)
+            self.cell(0, 10, 'Relatório técnico', 0, 1, 'C')
+            self.ln(5)
+        def footer(self):
+            self.set_y(-15)
+            self.set_font('Arial', 'I', 8)
+            self.cell(0, 10, f'Página {self.page_no() + self.primeira_pagina - 1}', 0, 0, 'C')
+
+    return PDFRelatorio
+
+
+def _gravar(caminho, dados):
+    with open(caminho, 'wb') as f:
+        f.write(dados)
+    return caminho
+
+
+def _pagina(pdf, item, n, tmpdir, path_barra, cache_render):
+    pdf.add_page()
+    meta = item.meta
+    stats = item.stats
+
+    pdf.set_font('Arial', 'B', 12)
+    pdf.set_fill_color(240, 240, 240)
+    pdf.cell(0, 10, f"ID: {meta['Planta']} | Trat: {meta['Tratamento']} | Amb: {meta['Ambiente']}", 1, 1, 'L', fill=True)
+
+    y_img = pdf.get_y() + 10
+
+    # 1. Imagem Visual
+    if item.jpeg_visual:
+        path_v = _gravar(os.path.join(tmpdir, f"v_{n}.jpg"), item.jpeg_visual)
+        pdf.image(path_v, x=10, y=y_img, w=60, h=50)
+        pdf.text(10, y_img - 3, "Imagem visual")
+
+    # 2. Imagem Térmica (Crop Visual)
+    if item.jpeg_recorte:
+        path_t = _gravar(os.path.join(tmpdir, f"t_{n}.jpg"), item.jpeg_recorte)
+        pdf.image(path_t, x=75, y=y_img, w=60, h=50)
+        pdf.text(75, y_img - 3, "Recorte analisado")
+
+    # 3. Mapa de Calor Radiométrico (LUT -> PNG) com barra de cores
+    matriz = item.matriz
+    if matriz is not None:
+        path_h = cache_render.arquivo(matriz, lado_minimo=200)
+        pdf.image(path_h, x=140, y=y_img, w=50, h=50)
+        pdf.image(path_barra, x=192, y=y_img, w=3, h=50)
+        pdf.set_font('Arial', '', 7)
+        pdf.text(196, y_img + 2, f"{np.nanmax(matriz):.1f}")
+        pdf.text(196, y_img + 50, f"{np.nanmin(matriz):.1f}")
+        pdf.text(140, y_img - 3, "Dados reais (°C)")
+
+    pdf.set_y(y_img + 60)
+    pdf.set_font('Arial', 'B', 10)
+    pdf.cell(0, 8, "Estatísticas da área selecionada", 0, 1, 'L')
+
+    pdf.set_font('Arial', '', 10)
+    col_w = 45
+    h_row = 8
+
+    pdf.cell(col_w, h_row, "Temperatura média", 1)
+    pdf.cell(col_w, h_row, f"{stats['Temp_Media']:.2f} C", 1, 1)
+    pdf.cell(col_w, h_row, "Temperatura máxima", 1)
+    pdf.cell(col_w, h_row, f"{stats['Temp_Max']:.2f} C", 1, 1)
+    pdf.cell(col_w, h_row, "Temperatura mínima", 1)
+    pdf.cell(col_w, h_row, f"{stats['Temp_Min']:.2f} C", 1, 1)
+    pdf.cell(col_w, h_row, "Desvio padrão", 1)
+    pdf.cell(col_w, h_row, f"{stats['Desvio']:.2f}", 1, 1)
+    if 'Temp_P50' in stats:
+        pdf.cell(col_w, h_row, "Percentis 10/50/90", 1)
+        pdf.cell(col_w, h_row, f"{stats['Temp_P10']:.2f} / {stats['Temp_P50']:.2f} / {stats['Temp_P90']:.2f} C", 1, 1)
+
+    pdf.ln(5)
+
+
+def gerar_pdf_final(lista_dados, destino=None, progresso=None, pasta_render=PASTA_CACHE, primeira_pagina=1):
+    """
+    Gera o PDF das amostras. Com `destino`, grava no arquivo e retorna o caminho; sem, retorna os bytes.
+    `progresso(paginas_prontas, total_paginas)` é chamado a cada página, se informado.
+    `pasta_render` é a pasta do cache dos mapas de calor; `primeira_pagina` é o número impresso
+    no rodapé da primeira página (as partes de um relatório continuam a numeração da anterior).
+    """
+    cache_render = cache_padrao(pasta_render)
+    pdf = classe_pdf()()
+    pdf.primeira_pagina = primeira_pagina
+    pdf.set_auto_page_break(auto=True, margin=15)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # A barra de cores é a mesma em todas as páginas: codificada uma vez, embutida uma vez
+        path_barra = _gravar(os.path.join(tmpdir, "barra.png"), codificar_png(barra_de_cores()))
+        for n, item in enumerate(lista_dados):
+            if item is None:  # amostra removida do banco depois de a coleção ser aberta
+                continue
+            _pagina(pdf, item, n, tmpdir, path_barra, cache_render)
+            if progresso:
+                progresso(n + 1, len(lista_dados))
+        if destino is None:
+            return pdf.output(dest='S').encode('latin-1')
+        pdf.gravar(destino)
+    return destino
+
+
+def _renderizar_parte(args):
+    lista_dados, destino, pasta_render, primeira_pagina = args
+    return gerar_pdf_final(lista_dados, destino, pasta_render=pasta_render, primeira_pagina=primeira_pagina)
+
+
+def gerar_relatorio(lista_dados, destino, paginas_por_parte=PAGINAS_POR_PARTE, workers=None, progresso=None,
+                    pasta_render=PASTA_CACHE):
+    """
+    Gera o relatório em disco, parte a parte, e retorna o PDF final (`destino` + '.pdf').
+    `progresso(feitos, total)` é chamado a cada parte gravada (a cada página, se houver uma parte só);
+    uma exceção levantada por ele interrompe a geração e descarta as partes ainda não iniciadas.
+    """
+    final = destino + '.pdf'
+    inicios = range(0, len(lista_dados), paginas_por_parte)
+    if len(inicios) <= 1:
+        return gerar_pdf_final(lista_dados[:paginas_por_parte], final, progresso, pasta_render)
+
+    from pypdf import PdfWriter
+
+    pasta_partes = tempfile.mkdtemp(prefix='relatorio_')
+    workers = workers or min(4, os.cpu_count() or 1)
+    documento = PdfWriter()
+    try:
+        # spawn: o relatório roda na thread da fila de tarefas, e um fork a partir de um processo com
+        # threads (Streamlit, fila, pré-carregamento) pode herdar travas presas no filho
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            try:
+                # Fatia (e, numa coleção lida do banco, carrega) só as partes em andamento; cada amostra
+                # é uma página, então a parte seguinte começa depois das amostras presentes nesta
+                em_andamento = deque()
+                proximas = iter(enumerate(inicios, 1))
+                pagina = 1
+                for i in range(1, len(inicios) + 1):
+                    for n, inicio in itertools.islice(proximas, 2 * workers - len(em_andamento)):
+                        parte = lista_dados[inicio:inicio + paginas_por_parte]
+                        paginas = sum(item is not None for item in parte)
+                        caminho = os.path.join(pasta_partes, f"relatorio_parte_{n:03d}.pdf")
+                        # Uma parte sem amostras (todas removidas do banco) viraria uma página em branco
+                        em_andamento.append(paginas and executor.submit(
+                            _renderizar_parte, (parte, caminho, pasta_render, pagina)))
+                        pagina += paginas
+                    futuro = em_andamento.popleft()
+                    if futuro:
+                        documento.append(futuro.result())
+                    if progresso:
+                        progresso(i, len(inicios))
+            except BaseException:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+        documento.write(final)
+    finally:
+        documento.close()
+        shutil.rmtree(pasta_partes, ignore_errors=True)
+    return final
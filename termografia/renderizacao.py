@@ -0,0 +1,251 @@
+"""
+Renderização direta de mapas térmicos: colormap por tabela (LUT) de 256
+cores sobre a matriz quantizada e codificação PNG/JPEG pelo OpenCV. A
+tabela vem pronta no módulo: nem o app nem os processos do relatório
+importam o Matplotlib.
+
+CacheRenderizacao guarda as imagens já codificadas, pela identidade da
+matriz (o ID da amostra com a sua versão, ou o hash do conteúdo) e pelos
+parâmetros de renderização: LRU em memória e arquivos em disco
+(.cache_render/), compartilhados entre o relatório PDF (inclusive entre os
+processos das partes), as miniaturas do Dashboard e as ferramentas de debug.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+PASTA_CACHE = '.cache_render'
+LIMITE_MEMORIA = 64 * 1024 ** 2
+LIMITE_DISCO = 512 * 1024 ** 2
+FORMATOS = {'png': '.png', 'jpeg': '.jpg'}
+
+_caches = {}
+_trava_caches = threading.Lock()
+
+# Colormap 'inferno' do Matplotlib em 256 cores RGB (uint8), 16 cores por linha
+_INFERNO = (
+    '00000401000501010601010802010a02020c02020e03021004031204031405041706041907051b08051d09061f0a0722'
+    '0b07240c08260d08290e092b10092d110a30120a32140b34150b37160b39180c3c190c3e1b0c411c0c431e0c451f0c48'
+    '210c4a230c4c240c4f260c51280b53290b552b0b572d0b592f0a5b310a5c320a5e340a5f3609613809623909633b0964'
+    '3d09653e0966400a67420a68440a68450a69470b6a490b6a4a0c6b4c0c6b4d0d6c4f0d6c510e6c520e6d540f6d550f6d'
+    '57106e59106e5a116e5c126e5d126e5f136e61136e62146e64156e65156e67166e69166e6a176e6c186e6d186e6f196e'
+    '71196e721a6e741a6e751b6e771c6d781c6d7a1d6d7c1d6d7d1e6d7f1e6c801f6c82206c84206b85216b87216b88226a'
+    '8a226a8c23698d23698f24699025689225689326679526679727669827669a28659b29649d29649f2a63a02a63a22b62'
+    'a32c61a52c60a62d60a82e5fa92e5eab2f5ead305dae305cb0315bb1325ab3325ab43359b63458b73557b93556ba3655'
+    'bc3754bd3853bf3952c03a51c13a50c33b4fc43c4ec63d4dc73e4cc83f4bca404acb4149cc4248ce4347cf4446d04545'
+    'd24644d34743d44842d54a41d74b3fd84c3ed94d3dda4e3cdb503bdd513ade5238df5337e05536e15635e25734e35933'
+    'e45a31e55c30e65d2fe75e2ee8602de9612bea632aeb6429eb6628ec6726ed6925ee6a24ef6c23ef6e21f06f20f1711f'
+    'f1731df2741cf3761bf37819f47918f57b17f57d15f67e14f68013f78212f78410f8850ff8870ef8890cf98b0bf98c0a'
+    'f98e09fa9008fa9207fa9407fb9606fb9706fb9906fb9b06fb9d07fc9f07fca108fca309fca50afca60cfca80dfcaa0f'
+    'fcac11fcae12fcb014fcb216fcb418fbb61afbb81dfbba1ffbbc21fbbe23fac026fac228fac42afac62df9c72ff9c932'
+    'f9cb35f8cd37f8cf3af7d13df7d340f6d543f6d746f5d949f5db4cf4dd4ff4df53f4e156f3e35af3e55df2e661f2e865'
+    'f2ea69f1ec6df1ed71f1ef75f1f179f2f27df2f482f3f586f3f68af4f88ef5f992f6fa96f8fb9af9fc9dfafda1fcffa4'
+)
+LUTS = {'inferno': np.frombuffer(bytes.fromhex(''.join(_INFERNO)), dtype=np.uint8).reshape(256, 3)}
+
+
+def lut(nome='inferno'):
+    """Tabela (256, 3) uint8 RGB do colormap (os mesmos valores do Matplotlib, sem importá-lo)."""
+    if nome not in LUTS:
+        raise ValueError(f"Colormap desconhecido: '{nome}' (disponíveis: {', '.join(LUTS)})")
+    return LUTS[nome]
+
+
+def quantizar(matriz, vmin=None, vmax=None):
+    """Mapeia a matriz para índices 0..255 entre vmin e vmax (padrão: mínimo e máximo da matriz)."""
+    matriz = np.asarray(matriz, dtype=np.float32)
+    vmin = float(np.nanmin(matriz)) if vmin is None else vmin
+    vmax = float(np.nanmax(matriz)) if vmax is None else vmax
+    escala = 255.0 / (vmax - vmin) if vmax > vmin else 0.0
+    indices = np.nan_to_num((matriz - vmin) * escala, nan=0.0)
+    return np.clip(indices, 0, 255).astype(np.uint8)
+
+
+def colorir(matriz, cmap='inferno', vmin=None, vmax=None, lado_minimo=None):
+    """
+    Imagem RGB uint8 da matriz no colormap. Com `lado_minimo`, a imagem é
+    ampliada por vizinho mais próximo (pixels do sensor nítidos no PDF).
+    """
+    rgb = lut(cmap)[quantizar(matriz, vmin, vmax)]
+    if lado_minimo:
+        fator = int(np.ceil(lado_minimo / max(1, min(rgb.shape[:2]))))
+        if fator > 1:
+            rgb = cv2.resize(rgb, (rgb.shape[1] * fator, rgb.shape[0] * fator), interpolation=cv2.INTER_NEAREST)
+    return rgb
+
+
+def barra_de_cores(cmap='inferno', altura=256, largura=16):
+    """Barra vertical do colormap (máximo em cima)."""
+    barra = np.repeat(lut(cmap)[::-1][:, None, :], largura, axis=1)
+    if altura != 256:
+        barra = cv2.resize(barra, (largura, altura), interpolation=cv2.INTER_LINEAR)
+    return barra
+
+
+def codificar_png(rgb):
+    """PNG em bytes a partir de um array RGB."""
+    ok, buf = cv2.imencode('.png', cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR))
+    if not ok:
+        raise ValueError("Falha ao codificar PNG.")
+    return buf.tobytes()
+
+
+def codificar_jpeg(rgb, qualidade=85):
+    """JPEG em bytes a partir de um array RGB (ou imagem PIL)."""
+    rgb = np.asarray(rgb)
+    if rgb.ndim == 3 and rgb.shape[2] == 4:
+        rgb = rgb[..., :3]
+    bgr = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR) if rgb.ndim == 3 else rgb
+    ok, buf = cv2.imencode('.jpg', bgr, [cv2.IMWRITE_JPEG_QUALITY, qualidade])
+    if not ok:
+        raise ValueError("Falha ao codificar JPEG.")
+    return buf.tobytes()
+
+
+def renderizar(matriz, formato='png', cmap='inferno', vmin=None, vmax=None, lado_minimo=None, qualidade=85):
+    """Mapa de calor da matriz já codificado (bytes PNG ou JPEG)."""
+    rgb = colorir(matriz, cmap, vmin, vmax, lado_minimo)
+    if formato == 'png':
+        return codificar_png(rgb)
+    if formato == 'jpeg':
+        return codificar_jpeg(rgb, qualidade)
+    raise ValueError(f"Formato desconhecido: {formato} (use {', '.join(FORMATOS)}).")
+
+
+def chave_matriz(matriz):
+    """Identidade do conteúdo da matriz: hash dos bytes, da forma e do tipo."""
+    matriz = np.ascontiguousarray(matriz)
+    h = hashlib.blake2b(matriz.view(np.uint8).ravel() if matriz.size else b'', digest_size=16)
+    h.update(repr((matriz.shape, matriz.dtype.str)).encode())
+    return h.hexdigest()
+
+
+class CacheRenderizacao:
+    """Mapas de calor codificados em duas camadas (memória LRU + disco), por identidade da matriz e parâmetros."""
+
+    def __init__(self, pasta=PASTA_CACHE, limite_memoria=LIMITE_MEMORIA, limite_disco=LIMITE_DISCO):
+        self.pasta = pasta
+        self.limite_memoria = limite_memoria
+        self.limite_disco = limite_disco
+        self.estatisticas = {'memoria': 0, 'disco': 0, 'faltas': 0}
+        self._memoria = OrderedDict()
+        self._bytes_memoria = 0
+        self._lock = threading.Lock()
+        os.makedirs(pasta, exist_ok=True)
+        self._bytes_disco = sum(e.stat().st_size for e in self._arquivos())
+
+    def _arquivos(self):
+        for sub in os.scandir(self.pasta):
+            if sub.is_dir():
+                yield from (e for e in os.scandir(sub.path) if e.is_file() and not e.name.endswith('.tmp'))
+
+    def _caminho(self, chave, formato, parametros):
+        nome = hashlib.blake2b(repr((chave, formato, parametros)).encode(), digest_size=16).hexdigest()
+        return os.path.join(self.pasta, nome[:2], nome + FORMATOS[formato])
+
+    def _guardar_memoria(self, caminho, dados):
+        with self._lock:
+            if caminho in self._memoria:
+                return
+            self._memoria[caminho] = dados
+            self._bytes_memoria += len(dados)
+            while self._bytes_memoria > self.limite_memoria:
+                _, antigo = self._memoria.popitem(last=False)
+                self._bytes_memoria -= len(antigo)
+
+    def _gravar_disco(self, caminho, dados):
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporario, 'wb') as f:
+            f.write(dados)
+        os.replace(temporario, caminho)
+        with self._lock:
+            self._bytes_disco += len(dados)
+            excedeu = self._bytes_disco > self.limite_disco
+        if excedeu:
+            self._despejar_disco(manter=caminho)
+
+    def _despejar_disco(self, manter=None):
+        """Remove os arquivos usados há mais tempo (exceto `manter`) até o disco voltar a 80% do limite."""
+        arquivos = sorted(((e.stat().st_mtime, e.stat().st_size, e.path) for e in self._arquivos()))
+        total = sum(t for _, t, _ in arquivos)
+        for _, tamanho, caminho in arquivos:
+            if total <= 0.8 * self.limite_disco:
+                break
+            if caminho == manter:
+                continue
+            try:
+                os.remove(caminho)
+            except OSError:
+                continue
+            total -= tamanho
+        with self._lock:
+            self._bytes_disco = total
+
+    def _obter(self, matriz, chave, formato, parametros, em_disco=False):
+        """
+        (caminho, bytes) da imagem. Com `em_disco`, garante também o arquivo:
+        num acerto em memória, ele pode ter sido despejado do disco.
+        """
+        if chave is None:
+            matriz = matriz() if callable(matriz) else matriz
+            chave = chave_matriz(matriz)
+        caminho = self._caminho(chave, formato, parametros)
+        with self._lock:
+            dados = self._memoria.get(caminho)
+            if dados is not None:
+                self._memoria.move_to_end(caminho)
+                self.estatisticas['memoria'] += 1
+        if dados is not None:
+            if em_disco:
+                try:
+                    os.utime(caminho)  # uso recente, para o despejo
+                except FileNotFoundError:
+                    self._gravar_disco(caminho, dados)
+            return caminho, dados
+        try:
+            with open(caminho, 'rb') as f:
+                dados = f.read()
+            os.utime(caminho)  # uso recente, para o despejo
+            self.estatisticas['disco'] += 1
+        except FileNotFoundError:
+            matriz = matriz() if callable(matriz) else matriz
+            dados = renderizar(matriz, formato, *parametros)
+            self._gravar_disco(caminho, dados)
+            self.estatisticas['faltas'] += 1
+        self._guardar_memoria(caminho, dados)
+        return caminho, dados
+
+    def obter(self, matriz, chave=None, formato='png', cmap='inferno', vmin=None, vmax=None, lado_minimo=None,
+              qualidade=85):
+        """
+        Bytes do mapa de calor (ver renderizar). `chave` identifica o conteúdo
+        da matriz (ex.: ID da amostra e versão); sem ela, usa chave_matriz.
+        Com chave, `matriz` pode ser uma função que a carrega, chamada só se
+        a imagem ainda não estiver em cache.
+        """
+        return self._obter(matriz, chave, formato, (cmap, vmin, vmax, lado_minimo, qualidade))[1]
+
+    def arquivo(self, matriz, chave=None, formato='png', cmap='inferno', vmin=None, vmax=None, lado_minimo=None,
+                qualidade=85):
+        """Como obter, mas retorna o caminho do arquivo em disco (para quem lê imagens por caminho, como o FPDF)."""
+        return self._obter(matriz, chave, formato, (cmap, vmin, vmax, lado_minimo, qualidade), em_disco=True)[0]
+
+    def resumo(self):
+        """Texto curto com acertos/faltas e ocupação, como CacheTermico.resumo."""
+        e = self.estatisticas
+        return (f"Acertos: {e['memoria'] + e['disco']} (memória {e['memoria']}, disco {e['disco']}) · "
+                f"Faltas: {e['faltas']} · "
+                f"{self._bytes_memoria / 1024 ** 2:.0f} MB em memória, {self._bytes_disco / 1024 ** 2:.0f} MB em disco")
+
+
+def cache_padrao(pasta=PASTA_CACHE):
+    """CacheRenderizacao do processo para a pasta (criado no primeiro uso e reaproveitado depois)."""
+    with _trava_caches:
+        if pasta not in _caches:
+            _caches[pasta] = CacheRenderizacao(pasta)
+        return _caches[pasta]
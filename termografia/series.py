@@ -0,0 +1,257 @@
+"""
+Séries temporais por planta e métricas derivadas, vetorizadas.
+
+Cada série é uma planta (Planta x Ambiente x Tratamento, por padrão)
+observada ao longo do tempo: a coluna de tempo (Réplica por padrão, com
+r1, r2, ... como os dias repetidos da campanha, em ordem natural) e o
+período (Dia/Noite). As observações ficam num cubo NumPy alinhado
+[série, tempo, período], com NaN onde falta observação; observações
+repetidas na mesma célula entram pela média. As métricas são operações
+sobre os eixos do cubo:
+
+* delta dia–noite: cubo[:, :, dia] - cubo[:, :, noite];
+* CWSI (índice de estresse hídrico da cultura): (T - T_úmida) / (T_seca -
+  T_úmida). As referências são temperaturas em °C, ROIs de referência
+  recortadas na mesma imagem (Planta = nome da referência) ou, sem
+  referência, a planta mais fria e a mais quente de cada tempo e período;
+* tendência: média móvel e inclinação (°C por passo de tempo, mínimos
+  quadrados) numa janela do eixo do tempo, por somas acumuladas. Valem
+  sobre qualquer outra métrica (ex.: tendência do delta dia–noite).
+
+Os resultados ficam em cache por métrica e parâmetros, e as médias por
+grupo (ex.: por Tratamento) também: o Dashboard só recalcula quando a
+tabela muda (o app reconstrói as séries pela versão da TabelaResultados).
+"""
+import re
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+CHAVES_SERIE = ('Planta', 'Ambiente', 'Tratamento')
+COLUNA_TEMPO = 'Replica'
+COLUNA_PERIODO = 'Periodo'
+METRICAS = {
+    'valor': "Temperatura",
+    'delta_dia_noite': "Delta dia–noite",
+    'cwsi': "CWSI (estresse hídrico)",
+    'media_movel': "Média móvel",
+    'inclinacao': "Tendência (inclinação por passo)",
+}
+LIMITE_CACHE = 64
+
+
+def ordem_natural(valor):
+    """Chave de ordenação que compara pelo valor os números dentro do texto (r2 antes de r10)."""
+    return [(0, int(p), '') if p.isdigit() else (1, 0, p.lower()) for p in re.split(r'(\d+)', str(valor)) if p]
+
+
+def _media_nan(soma, contagem):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(contagem > 0, soma / contagem, np.nan)
+
+
+def _somas_moveis(x, janela, eixo=1):
+    """Somas em janelas móveis (as `janela` posições até a atual) ao longo do eixo, por soma acumulada."""
+    acumulada = np.cumsum(x, axis=eixo)
+    deslocada = np.zeros_like(acumulada)
+    fatia = [slice(None)] * x.ndim
+    origem = list(fatia)
+    fatia[eixo], origem[eixo] = slice(janela, None), slice(None, -janela)
+    deslocada[tuple(fatia)] = acumulada[tuple(origem)]
+    return acumulada - deslocada
+
+
+class SeriesTemporais:
+    """Cubo [série, tempo, período] de uma coluna da tabela de resultados, com métricas em cache."""
+
+    def __init__(self, df, valor='Temp_Media', chaves=CHAVES_SERIE, tempo=COLUNA_TEMPO, periodo=COLUNA_PERIODO):
+        self.valor = valor
+        self.chaves = tuple(chaves)
+        self.coluna_tempo = tempo
+        self.coluna_periodo = periodo
+        self._cache = OrderedDict()
+
+        colunas = {c: df[c].astype(str).to_numpy() for c in self.chaves + (tempo, periodo)}
+        # Séries na ordem da primeira observação; tempos e períodos em ordem natural
+        codigos_serie, series = pd.MultiIndex.from_arrays([colunas[c] for c in self.chaves]).factorize()
+        self.series = pd.DataFrame(list(series), columns=list(self.chaves)) if len(series) else \
+            pd.DataFrame(columns=list(self.chaves))
+        self.tempos = sorted(set(colunas[tempo]), key=ordem_natural)
+        self.periodos = sorted(set(colunas[periodo]), key=ordem_natural)
+        codigos_tempo = pd.Categorical(colunas[tempo], categories=self.tempos).codes
+        codigos_periodo = pd.Categorical(colunas[periodo], categories=self.periodos).codes
+
+        forma = (len(self.series), len(self.tempos), len(self.periodos))
+        celula = np.ravel_multi_index((codigos_serie, codigos_tempo, codigos_periodo), forma) if df.shape[0] else \
+            np.empty(0, dtype=np.intp)
+        valores = df[valor].to_numpy(dtype=np.float64)
+        validos = np.isfinite(valores)
+        tamanho = int(np.prod(forma))
+        self.contagem = np.bincount(celula[validos], minlength=tamanho).reshape(forma)
+        self.cubo = _media_nan(np.bincount(celula[validos], valores[validos], tamanho).reshape(forma), self.contagem)
+
+    def __len__(self):
+        return len(self.series)
+
+    # --- CACHE ---
+
+    def _em_cache(self, chave, calcular):
+        if chave in self._cache:
+            self._cache.move_to_end(chave)
+            return self._cache[chave]
+        resultado = calcular()
+        self._cache[chave] = resultado
+        if len(self._cache) > LIMITE_CACHE:
+            self._cache.popitem(last=False)
+        return resultado
+
+    # --- MÉTRICAS ---
+
+    def _periodo(self, nome):
+        for k, p in enumerate(self.periodos):
+            if p.lower() == str(nome).lower():
+                return k
+        raise ValueError(f"Período '{nome}' não encontrado (períodos: {', '.join(self.periodos) or 'nenhum'}).")
+
+    def calcular(self, metrica='valor', **parametros):
+        """
+        Métrica para todas as séries: (array [série, tempo, k], rótulos dos k).
+        Parâmetros por métrica:
+
+        * valor: nenhum (k = períodos);
+        * delta_dia_noite: dia='dia', noite='noite' (k = 1);
+        * cwsi: umida e seca, cada uma None, temperatura em °C ou nome da
+          Planta de referência (k = períodos);
+        * media_movel e inclinacao: janela=3 e base (outra métrica, com os
+          parâmetros dela em base_parametros), 'valor' por padrão.
+        """
+        chave = ('metrica', metrica, _congelar(parametros))
+        return self._em_cache(chave, lambda: self._calcular(metrica, **parametros))
+
+    def _calcular(self, metrica, **p):
+        if metrica == 'valor':
+            return self.cubo, list(self.periodos)
+        if metrica == 'delta_dia_noite':
+            dia, noite = self._periodo(p.get('dia', 'dia')), self._periodo(p.get('noite', 'noite'))
+            return self.cubo[:, :, [dia]] - self.cubo[:, :, [noite]], [f"{self.periodos[dia]}–{self.periodos[noite]}"]
+        if metrica == 'cwsi':
+            return self._cwsi(p.get('umida'), p.get('seca')), list(self.periodos)
+        if metrica in ('media_movel', 'inclinacao'):
+            base, rotulos = self.calcular(p.get('base', 'valor'), **p.get('base_parametros', {}))
+            janela = max(1, int(p.get('janela', 3)))
+            funcao = _media_movel if metrica == 'media_movel' else _inclinacao
+            return funcao(base, janela), rotulos
+        raise ValueError(f"Métrica desconhecida: {metrica} (use {', '.join(METRICAS)}).")
+
+    def _referencia(self, referencia, agregar):
+        """Temperatura de referência por [série, tempo, período] e a máscara das séries que são referência."""
+        eh_referencia = np.zeros(len(self.series), dtype=bool)
+        if referencia is None:
+            with warnings.catch_warnings():
+                # Tempo e período sem nenhuma observação: NaN, sem aviso
+                warnings.simplefilter('ignore', RuntimeWarning)
+                return agregar(self.cubo, axis=0, keepdims=True), eh_referencia
+        if isinstance(referencia, (int, float, np.number)):
+            return np.full((1,) + self.cubo.shape[1:], float(referencia)), eh_referencia
+        # ROI de referência: a série com Planta = nome e as mesmas demais chaves (mesma imagem)
+        if 'Planta' not in self.chaves:
+            raise ValueError("Referência por nome exige 'Planta' entre as chaves da série.")
+        outras = [c for c in self.chaves if c != 'Planta']
+        eh_referencia = (self.series['Planta'].astype(str).str.lower() == str(referencia).lower()).to_numpy()
+        if not eh_referencia.any():
+            raise ValueError(f"Referência '{referencia}' não encontrada entre as plantas.")
+        grupo = self.series[outras].apply(tuple, axis=1) if outras else pd.Series([()] * len(self.series))
+        indice_ref = {g: i for g, i in zip(grupo[eh_referencia], np.flatnonzero(eh_referencia))}
+        posicao = np.array([indice_ref.get(g, -1) for g in grupo])
+        cubo_ref = np.concatenate([self.cubo, np.full((1,) + self.cubo.shape[1:], np.nan)])
+        return cubo_ref[posicao], eh_referencia
+
+    def _cwsi(self, umida, seca):
+        t_umida, ref_umida = self._referencia(umida, np.nanmin)
+        t_seca, ref_seca = self._referencia(seca, np.nanmax)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            amplitude = t_seca - t_umida
+            cwsi = np.where(amplitude > 0, (self.cubo - t_umida) / amplitude, np.nan)
+        cwsi[ref_umida | ref_seca] = np.nan
+        return cwsi
+
+    # --- TABELAS PARA GRÁFICOS ---
+
+    def longo(self, metrica='valor', **parametros):
+        """Uma linha por série, tempo e rótulo (período) com observação, para exportar ou plotar por planta."""
+        def montar():
+            cubo, rotulos = self.calcular(metrica, **parametros)
+            s, t, k = np.nonzero(np.isfinite(cubo))
+            df = self.series.iloc[s].reset_index(drop=True)
+            df[self.coluna_tempo] = np.asarray(self.tempos, dtype=object)[t]
+            df[self.coluna_periodo] = np.asarray(rotulos, dtype=object)[k]
+            df[metrica] = cubo[s, t, k]
+            return df
+        return self._em_cache(('longo', metrica, _congelar(parametros)), montar)
+
+    def por_grupo(self, metrica='valor', coluna='Tratamento', **parametros):
+        """
+        Média, desvio (ddof=1) e número de séries da métrica por grupo (valores
+        da `coluna` entre as chaves da série), tempo e período.
+        """
+        if coluna not in self.chaves:
+            raise ValueError(f"Agrupamento só por uma das chaves da série ({', '.join(self.chaves)}).")
+
+        def calcular():
+            cubo, rotulos = self.calcular(metrica, **parametros)
+            codigos, grupos = pd.factorize(self.series[coluna])
+            n_grupos = len(grupos)
+            finito = np.isfinite(cubo)
+            x = np.where(finito, cubo, 0.0)
+            # Soma por grupo no eixo das séries, para todos os (tempo, período) de uma vez
+            soma = np.zeros((n_grupos,) + cubo.shape[1:])
+            n = np.zeros(soma.shape, dtype=np.int64)
+            np.add.at(soma, codigos, x)
+            np.add.at(n, codigos, finito)
+            media = _media_nan(soma, n)
+            # Segunda passada sobre os desvios da média do grupo: sem o cancelamento de Σx² - n·média²
+            desvios = np.where(finito, cubo - media[codigos], 0.0)
+            quadrados = np.zeros_like(soma)
+            np.add.at(quadrados, codigos, desvios * desvios)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                variancia = np.where(n > 1, quadrados / (n - 1), np.nan)
+            g, t, k = np.nonzero(n)
+            return pd.DataFrame({
+                coluna: np.asarray(grupos, dtype=object)[g],
+                self.coluna_tempo: np.asarray(self.tempos, dtype=object)[t],
+                self.coluna_periodo: np.asarray(rotulos, dtype=object)[k],
+                metrica: media[g, t, k],
+                'Desvio_Grupo': np.sqrt(variancia[g, t, k]),
+                'N': n[g, t, k],
+            })
+        return self._em_cache(('grupo', metrica, coluna, _congelar(parametros)), calcular)
+
+
+def _congelar(valor):
+    if isinstance(valor, dict):
+        return tuple(sorted((k, _congelar(v)) for k, v in valor.items()))
+    if isinstance(valor, (list, tuple)):
+        return tuple(_congelar(v) for v in valor)
+    return valor
+
+
+def _media_movel(cubo, janela):
+    finito = np.isfinite(cubo)
+    soma = _somas_moveis(np.where(finito, cubo, 0.0), janela)
+    return _media_nan(soma, _somas_moveis(finito.astype(np.int64), janela))
+
+
+def _inclinacao(cubo, janela):
+    """Inclinação por mínimos quadrados na janela; NaN com menos de duas observações."""
+    finito = np.isfinite(cubo)
+    y = np.where(finito, cubo, 0.0)
+    t = np.arange(cubo.shape[1], dtype=np.float64)[None, :, None] * finito
+    n = _somas_moveis(finito.astype(np.float64), janela)
+    st, sy = _somas_moveis(t, janela), _somas_moveis(y, janela)
+    stt, sty = _somas_moveis(t * t, janela), _somas_moveis(t * y, janela)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        denominador = n * stt - st * st
+        return np.where((n > 1) & (denominador > 0), (n * sty - st * sy) / denominador, np.nan)
+
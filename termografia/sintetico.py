@@ -0,0 +1,200 @@
+"""
+Gerador de pares sintéticos no formato FLIR, com temperatura conhecida.
+
+Cada par tem uma térmica radiométrica (JPEG com os segmentos APP1 "FLIR":
+bloco FFF com RawThermalImage em PNG e CameraInfo) e uma visual alinhada à
+mesma cena. A cena é um fundo quente (solo/vaso) com uma planta mais fria
+formada por elipses; o campo de temperatura e a máscara da planta são
+devolvidos como gabarito. As contagens do sensor saem da inversa da equação
+de Planck (celsius_para_raw), então o erro de decodificação esperado é só
+o da quantização em 16 bits.
+
+Uso:
+    python -m termografia.sintetico PASTA -n 20 --resolucao 320x240
+"""
+import argparse
+import io
+import os
+import struct
+import sys
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from termografia.decodificador import CAMPOS_CAMERA, CAMPOS_TEXTO, REGISTRO_RAW, REGISTRO_CAMERA, ZERO_ABSOLUTO, \
+    celsius_para_raw
+from termografia.renderizacao import colorir, codificar_jpeg
+
+# Parâmetros típicos de uma câmera FLIR da série E, já na precisão impressa pelo exiftool
+CALIBRACAO_SINTETICA = {
+    'emissivity': 0.95, 'object_distance': 1.0,
+    'reflected_apparent_temperature': 20.0, 'atmospheric_temperature': 20.0,
+    'ir_window_temperature': 20.0, 'ir_window_transmission': 1.0,
+    'relative_humidity': 50.0,
+    'planck_r1': 17096.453, 'planck_b': 1428.0, 'planck_f': 1.0,
+    'planck_o': -5865.0, 'planck_r2': 0.046642166,
+    'ata1': 0.006569, 'ata2': 0.01262, 'atb1': -0.002276, 'atb2': -0.00667, 'atx': 1.9,
+    'camera_model': 'FLIR E8 (sintetico)', 'camera_serial': '000000000',
+}
+
+RESOLUCOES = {'80x60': (80, 60), '160x120': (160, 120), '320x240': (320, 240), '640x480': (640, 480)}
+AMBIENTES = ('27', '32')
+TRATAMENTOS = ('Controle', 'Estresse')
+PERIODOS = ('Dia', 'Noite')
+TAMANHO_SEGMENTO = 65000
+
+# --- CENA ---
+
+def campo_temperatura(altura, largura, rng, tratamento='Controle', periodo='Dia'):
+    """(temperaturas °C float64, máscara booleana da planta) de uma cena com planta central."""
+    y, x = np.mgrid[0:altura, 0:largura]
+    yn, xn = y / altura, x / largura
+    t_fundo = 31.0 if periodo == 'Dia' else 21.0
+    t_planta = t_fundo - (6.0 if tratamento == 'Controle' else 3.0) * (1.0 if periodo == 'Dia' else 0.5)
+    campo = t_fundo + 0.6 * xn - 0.4 * yn + rng.normal(0, 0.15, (altura, largura))
+
+    mascara = np.zeros((altura, largura), dtype=bool)
+    for _ in range(rng.integers(3, 7)):
+        cy, cx = rng.uniform(0.3, 0.7), rng.uniform(0.3, 0.7)
+        ry, rx = rng.uniform(0.08, 0.2), rng.uniform(0.08, 0.2)
+        angulo = rng.uniform(0, np.pi)
+        dy, dx = yn - cy, xn - cx
+        u = dx * np.cos(angulo) + dy * np.sin(angulo)
+        v = -dx * np.sin(angulo) + dy * np.cos(angulo)
+        mascara |= (u / rx) ** 2 + (v / ry) ** 2 <= 1
+    campo[mascara] = t_planta + rng.normal(0, 0.2, int(mascara.sum()))
+    return campo, mascara
+
+
+def imagem_visual(mascara, tamanho_visual, rng):
+    """RGB da cena: planta verde sobre solo marrom, na resolução da câmera visual."""
+    largura, altura = tamanho_visual
+    planta = cv2.resize(mascara.astype(np.uint8), (largura, altura), interpolation=cv2.INTER_NEAREST).astype(bool)
+    rgb = np.empty((altura, largura, 3), dtype=np.float32)
+    rgb[:] = (120, 90, 60)
+    rgb[planta] = (45, 140, 50)
+    rgb += rng.normal(0, 8, rgb.shape)
+    return np.clip(rgb, 0, 255).astype(np.uint8)
+
+# --- FORMATO FLIR ---
+
+def _registro_camera(calib, ordem='<'):
+    dados = bytearray(0x400)
+    struct.pack_into(ordem + 'H', dados, 0, 2)
+    valores = dict(calib)
+    for k in ('reflected_apparent_temperature', 'atmospheric_temperature', 'ir_window_temperature'):
+        valores[k] = valores[k] + ZERO_ABSOLUTO
+    valores['relative_humidity'] = valores['relative_humidity'] / 100
+    for k, (pos, fmt) in CAMPOS_CAMERA.items():
+        struct.pack_into(ordem + fmt, dados, pos, int(valores[k]) if fmt == 'i' else valores[k])
+    for k, (pos, tam) in CAMPOS_TEXTO.items():
+        texto = valores.get(k, '').encode('latin-1')[:tam - 1]
+        dados[pos:pos + len(texto)] = texto
+    return bytes(dados)
+
+
+def _registro_raw(raw, formato='png', ordem='<'):
+    altura, largura = raw.shape
+    if formato == 'png':
+        # Como a FLIR: valores little-endian dentro de um PNG de 16 bits
+        buf = io.BytesIO()
+        Image.fromarray(raw.astype(np.uint16).byteswap()).save(buf, 'PNG')
+        blob = buf.getvalue()
+    else:
+        blob = raw.astype(ordem + 'u2').tobytes()
+    return struct.pack(ordem + 'HHH', 2, largura, altura).ljust(32, b'\x00') + blob
+
+
+def bloco_fff(raw, calib, formato='png'):
+    """Bloco FFF com os registros RawData e CameraInfo."""
+    registros = [(REGISTRO_RAW, _registro_raw(raw, formato)), (REGISTRO_CAMERA, _registro_camera(calib))]
+    offset_dir = 0x40
+    cabecalho = bytearray(b'FFF\x00'.ljust(offset_dir, b'\x00'))
+    struct.pack_into('>III', cabecalho, 0x14, 100, offset_dir, len(registros))
+    diretorio, corpo = b'', b''
+    offset = offset_dir + 32 * len(registros)
+    for tipo, dados in registros:
+        diretorio += struct.pack('>HHIIIIIII', tipo, 1, 0x64, 1, offset, len(dados), 0, 0, 0)
+        corpo += dados
+        offset += len(dados)
+    return bytes(cabecalho) + diretorio + corpo
+
+
+def embutir_fff(jpeg, fff):
+    """Insere o bloco FFF em segmentos APP1 'FLIR' logo após o SOI do JPEG."""
+    partes = [fff[i:i + TAMANHO_SEGMENTO] for i in range(0, len(fff), TAMANHO_SEGMENTO)]
+    segmentos = b''
+    for i, parte in enumerate(partes):
+        carga = b'FLIR\x00\x01' + bytes([i, len(partes) - 1]) + parte
+        segmentos += b'\xff\xe1' + struct.pack('>H', len(carga) + 2) + carga
+    return jpeg[:2] + segmentos + jpeg[2:]
+
+
+def arquivo_flir(temperaturas, calib=CALIBRACAO_SINTETICA, tamanho_visual=None, formato='png'):
+    """JPEG radiométrico (bytes) cujas temperaturas decodificadas reproduzem `temperaturas`."""
+    raw = np.clip(np.round(celsius_para_raw(temperaturas, calib)), 0, 65535).astype(np.uint16)
+    altura, largura = temperaturas.shape
+    tamanho_visual = tamanho_visual or (largura, altura)
+    exibida = cv2.resize(colorir(temperaturas), tamanho_visual, interpolation=cv2.INTER_LINEAR)
+    return embutir_fff(codificar_jpeg(exibida), bloco_fff(raw, calib, formato))
+
+# --- CORPUS ---
+
+def gerar_par(indice, resolucao=(320, 240), tamanho_visual=(640, 480), semente=0):
+    """
+    Um par sintético. Retorna dict com id, meta, nomes dos arquivos, bytes da
+    térmica e da visual e o gabarito (campo de temperatura e máscara da planta).
+    """
+    rng = np.random.default_rng((semente, indice))
+    ambiente = AMBIENTES[indice % len(AMBIENTES)]
+    tratamento = TRATAMENTOS[(indice // len(AMBIENTES)) % len(TRATAMENTOS)]
+    periodo = PERIODOS[(indice // (len(AMBIENTES) * len(TRATAMENTOS))) % len(PERIODOS)]
+    base = f"P{indice:04d}_{ambiente}_{tratamento}_{periodo}_R1"
+    largura, altura = resolucao
+    campo, mascara = campo_temperatura(altura, largura, rng, tratamento, periodo)
+    return {
+        'id': base.lower(),
+        'meta': {'Planta': f"p{indice:04d}", 'Ambiente': ambiente, 'Tratamento': tratamento.lower(),
+                 'Periodo': periodo.lower(), 'Replica': 'r1'},
+        'nome_termica': f"{base}_thermal.jpg",
+        'nome_visual': f"{base}_visual.jpg",
+        'termica': arquivo_flir(campo, tamanho_visual=tamanho_visual),
+        'visual': codificar_jpeg(imagem_visual(mascara, tamanho_visual, rng), qualidade=90),
+        'campo': campo,
+        'mascara': mascara,
+    }
+
+
+def gravar_corpus(pasta, n, resolucao=(320, 240), tamanho_visual=(640, 480), semente=0):
+    """Grava n pares em `pasta` e o gabarito em gabarito.npz. Retorna a lista de IDs."""
+    os.makedirs(pasta, exist_ok=True)
+    ids, gabarito = [], {}
+    for i in range(n):
+        par = gerar_par(i, resolucao, tamanho_visual, semente)
+        for chave in ('termica', 'visual'):
+            with open(os.path.join(pasta, par[f"nome_{chave}"]), 'wb') as f:
+                f.write(par[chave])
+        gabarito[f"{par['id']}_campo"] = par['campo'].astype(np.float32)
+        gabarito[f"{par['id']}_mascara"] = par['mascara']
+        ids.append(par['id'])
+    np.savez_compressed(os.path.join(pasta, 'gabarito.npz'), **gabarito)
+    return ids
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera pares sintéticos FLIR (térmica radiométrica + visual).")
+    parser.add_argument('pasta', help="Pasta de destino")
+    parser.add_argument('-n', type=int, default=20, help="Número de pares")
+    parser.add_argument('--resolucao', choices=list(RESOLUCOES), default='320x240', help="Resolução do sensor")
+    parser.add_argument('--visual', default='640x480', help="Resolução das imagens exibidas (LxA)")
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args(argv)
+    tamanho_visual = tuple(int(v) for v in args.visual.lower().split('x'))
+    ids = gravar_corpus(args.pasta, args.n, RESOLUCOES[args.resolucao], tamanho_visual, args.semente)
+    print(f"{len(ids)} pares gravados em {args.pasta}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""
+Tabela de resultados colunar, mantida de forma incremental.
+
+Cada amostra confirmada entra como uma linha: as colunas de metadados são
+guardadas como códigos inteiros de categorias e as estatísticas em arrays
+float64 que crescem por dobra de capacidade. Os agregados por grupo
+(Tratamento x Período por padrão) são atualizados a cada linha (média e
+variância pelo método de Welford), então os gráficos do Dashboard não
+precisam de groupby/pivot_table a cada rerun. Uma amostra reanalisada
+substitui a sua linha, tirando o valor antigo do agregado do grupo. Os
+recortes por filtro ficam em cache até a próxima alteração. O pandas só é
+importado quando um DataFrame é montado ou lido (processos que só usam as
+colunas não pagam a importação).
+"""
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+COLUNAS_META = ('Planta', 'Ambiente', 'Tratamento', 'Periodo', 'Replica')
+COLUNAS_STATS = ('Temp_Media', 'Temp_Max', 'Temp_Min', 'Desvio', 'Temp_P10', 'Temp_P50', 'Temp_P90')
+CHAVES_GRUPO = ('Tratamento', 'Periodo')
+CAPACIDADE_INICIAL = 64
+LIMITE_CACHE_FILTROS = 32
+LINHAS_POR_BLOCO_CSV = 10_000
+
+
+def gravar_csv(df, destino, progresso=None, linhas_por_bloco=LINHAS_POR_BLOCO_CSV):
+    """
+    Grava o DataFrame em CSV em blocos de linhas, chamando `progresso(linhas_gravadas, total)`
+    a cada bloco (numa tarefa da fila, é onde um cancelamento interrompe a gravação).
+    """
+    with open(destino, 'w', encoding='utf-8', newline='') as f:
+        for inicio in range(0, max(len(df), 1), linhas_por_bloco):
+            df.iloc[inicio:inicio + linhas_por_bloco].to_csv(f, index=False, header=inicio == 0)
+            if progresso:
+                progresso(min(inicio + linhas_por_bloco, len(df)), len(df))
+    return destino
+
+
+class TabelaResultados:
+    """Resultados das amostras em colunas, com agregados por grupo atualizados a cada inserção."""
+
+    def __init__(self, linhas=(), valor='Temp_Media', chaves_grupo=CHAVES_GRUPO):
+        self.valor = valor
+        self.chaves_grupo = tuple(chaves_grupo)
+        self.versao = 0
+        self._n = 0
+        self._capacidade = CAPACIDADE_INICIAL
+        self._codigos = {c: np.empty(self._capacidade, dtype=np.int32) for c in COLUNAS_META}
+        self._stats = {c: np.empty(self._capacidade, dtype=np.float64) for c in COLUNAS_STATS}
+        self._categorias = {c: [] for c in COLUNAS_META}
+        self._indice_categorias = {c: {} for c in COLUNAS_META}
+        # chave do grupo (códigos) -> [n, média, M2, mínimo, máximo]
+        self._grupos = {}
+        self._cache = OrderedDict()
+        for linha in linhas:
+            self.adicionar(linha)
+
+    @classmethod
+    def de_dataframe(cls, df, valor='Temp_Media', chaves_grupo=CHAVES_GRUPO):
+        """Monta a tabela de uma vez a partir das colunas (ex.: lidas do banco), sem inserir linha a linha."""
+        import pandas as pd
+        tabela = cls(valor=valor, chaves_grupo=chaves_grupo)
+        n = len(df)
+        while tabela._capacidade < n:
+            tabela._capacidade *= 2
+        for c in COLUNAS_META:
+            codigos, categorias = pd.factorize(df[c].astype(str) if c in df else pd.Series(['N/A'] * n))
+            tabela._codigos[c] = np.empty(tabela._capacidade, dtype=np.int32)
+            tabela._codigos[c][:n] = codigos
+            tabela._categorias[c] = list(categorias)
+            tabela._indice_categorias[c] = {v: k for k, v in enumerate(categorias)}
+        for c in COLUNAS_STATS:
+            tabela._stats[c] = np.empty(tabela._capacidade, dtype=np.float64)
+            tabela._stats[c][:n] = df[c].to_numpy(dtype=np.float64) if c in df else np.nan
+        tabela._n = n
+        if n:
+            chaves = pd.DataFrame({c: tabela._codigos[c][:n] for c in tabela.chaves_grupo})
+            x = pd.Series(tabela._stats[valor][:n])
+            grupos = x.groupby([chaves[c] for c in tabela.chaves_grupo], sort=False).agg(
+                ['count', 'mean', lambda v: float(((v - v.mean()) ** 2).sum()), 'min', 'max'])
+            for chave, (contagem, media, m2, minimo, maximo) in zip(grupos.index, grupos.itertuples(index=False)):
+                chave = chave if isinstance(chave, tuple) else (chave,)
+                tabela._grupos[tuple(int(k) for k in chave)] = [int(contagem), media, m2, minimo, maximo]
+        tabela.versao += 1
+        return tabela
+
+    def __len__(self):
+        return self._n
+
+    # --- INSERÇÃO ---
+
+    def _codigo(self, coluna, valor):
+        indice = self._indice_categorias[coluna]
+        if valor not in indice:
+            indice[valor] = len(self._categorias[coluna])
+            self._categorias[coluna].append(valor)
+        return indice[valor]
+
+    def _crescer(self):
+        self._capacidade *= 2
+        for colunas in (self._codigos, self._stats):
+            for c, arr in colunas.items():
+                novo = np.empty(self._capacidade, dtype=arr.dtype)
+                novo[:self._n] = arr[:self._n]
+                colunas[c] = novo
+
+    def adicionar(self, linha):
+        """Acrescenta uma amostra (dicionário com metadados e estatísticas)."""
+        if self._n == self._capacidade:
+            self._crescer()
+        i = self._n
+        for c in COLUNAS_META:
+            self._codigos[c][i] = self._codigo(c, str(linha.get(c, 'N/A')))
+        for c in COLUNAS_STATS:
+            # Amostras anteriores aos percentis não os têm
+            self._stats[c][i] = linha.get(c, math.nan)
+        self._n += 1
+        self._entrar_grupo(i)
+        self.versao += 1
+        self._cache.clear()
+
+    def atualizar(self, i, linha):
+        """Substitui a linha i (amostra reanalisada), ajustando só o agregado dos grupos envolvidos."""
+        if not 0 <= i < self._n:
+            raise IndexError(i)
+        self._sair_grupo(i)
+        for c in COLUNAS_META:
+            self._codigos[c][i] = self._codigo(c, str(linha.get(c, 'N/A')))
+        for c in COLUNAS_STATS:
+            self._stats[c][i] = linha.get(c, math.nan)
+        self._entrar_grupo(i)
+        self.versao += 1
+        self._cache.clear()
+
+    def _chave_grupo(self, i):
+        return tuple(int(self._codigos[c][i]) for c in self.chaves_grupo)
+
+    def _entrar_grupo(self, i):
+        x = self._stats[self.valor][i]
+        g = self._grupos.setdefault(self._chave_grupo(i), [0, 0.0, 0.0, math.inf, -math.inf])
+        g[0] += 1
+        delta = x - g[1]
+        g[1] += delta / g[0]
+        g[2] += delta * (x - g[1])
+        g[3] = min(g[3], x)
+        g[4] = max(g[4], x)
+
+    def _sair_grupo(self, i):
+        """Welford ao contrário; mínimo/máximo só são recalculados se a linha era o extremo."""
+        x = self._stats[self.valor][i]
+        chave = self._chave_grupo(i)
+        g = self._grupos[chave]
+        if g[0] == 1:
+            del self._grupos[chave]
+            return
+        media_antiga = g[1]
+        g[0] -= 1
+        g[1] = (media_antiga * (g[0] + 1) - x) / g[0]
+        g[2] = max(g[2] - (x - g[1]) * (x - media_antiga), 0.0)
+        if x <= g[3] or x >= g[4]:
+            no_grupo = np.ones(self._n, dtype=bool)
+            for c, codigo in zip(self.chaves_grupo, chave):
+                no_grupo &= self._codigos[c][:self._n] == codigo
+            no_grupo[i] = False
+            valores = self._stats[self.valor][:self._n][no_grupo]
+            g[3], g[4] = float(valores.min()), float(valores.max())
+
+    # --- CONSULTA ---
+
+    def categorias(self, coluna):
+        """Valores distintos da coluna, na ordem em que apareceram."""
+        return list(self._categorias[coluna])
+
+    def _em_cache(self, tipo, selecao, calcular):
+        chave = (tipo, tuple(sorted((c, frozenset(v)) for c, v in selecao.items())))
+        if chave in self._cache:
+            self._cache.move_to_end(chave)
+            return self._cache[chave]
+        resultado = calcular()
+        self._cache[chave] = resultado
+        if len(self._cache) > LIMITE_CACHE_FILTROS:
+            self._cache.popitem(last=False)
+        return resultado
+
+    def _codigos_selecionados(self, coluna, valores):
+        indice = self._indice_categorias[coluna]
+        return np.array([indice[v] for v in valores if v in indice], dtype=np.int32)
+
+    def tabela(self):
+        """DataFrame completo (metadados categóricos + estatísticas)."""
+        return self._em_cache('tabela', {}, lambda: self._montar(slice(0, self._n)))
+
+    def _montar(self, linhas):
+        import pandas as pd
+        dados = {c: pd.Categorical.from_codes(self._codigos[c][:self._n][linhas], categories=self._categorias[c])
+                 for c in COLUNAS_META}
+        dados.update({c: self._stats[c][:self._n][linhas] for c in COLUNAS_STATS})
+        return pd.DataFrame(dados)
+
+    def filtrar(self, **selecao):
+        """Linhas cujas colunas de metadados estão nos valores selecionados: filtrar(Tratamento=[...], ...)."""
+        def calcular():
+            manter = np.ones(self._n, dtype=bool)
+            for coluna, valores in selecao.items():
+                manter &= np.isin(self._codigos[coluna][:self._n], self._codigos_selecionados(coluna, valores))
+            return self._montar(np.flatnonzero(manter))
+        return self._em_cache('filtro', selecao, calcular)
+
+    def agregados(self, **selecao):
+        """
+        Média, desvio (ddof=1, como o pandas), contagem, mínimo e máximo do valor
+        por grupo, restritos aos grupos selecionados (selecao pelas colunas de grupo).
+        """
+        fora = set(selecao) - set(self.chaves_grupo)
+        if fora:
+            raise ValueError(f"Agregados só podem ser filtrados pelas colunas de grupo, não por {sorted(fora)}.")
+
+        def calcular():
+            import pandas as pd
+            permitidos = {c: set(self._codigos_selecionados(c, v).tolist()) for c, v in selecao.items()}
+            linhas = []
+            for chave, (n, media, m2, minimo, maximo) in self._grupos.items():
+                codigos = dict(zip(self.chaves_grupo, chave))
+                if any(codigos[c] not in permitidos[c] for c in permitidos):
+                    continue
+                linha = {c: self._categorias[c][codigo] for c, codigo in codigos.items()}
+                linha.update({self.valor: media, 'Desvio_Grupo': math.sqrt(m2 / (n - 1)) if n > 1 else math.nan,
+                              'N': n, 'Minimo': minimo, 'Maximo': maximo})
+                linhas.append(linha)
+            colunas = list(self.chaves_grupo) + [self.valor, 'Desvio_Grupo', 'N', 'Minimo', 'Maximo']
+            return pd.DataFrame(linhas, columns=colunas).sort_values(list(self.chaves_grupo), ignore_index=True)
+        return self._em_cache('agregados', selecao, calcular)
@@ -0,0 +1,186 @@
+"""
+Fila de tarefas demoradas (relatório PDF, CSV, exportação das matrizes) em segundo plano.
+
+Cada tarefa roda numa thread da fila e grava o resultado numa pasta própria
+em `.tarefas/<id>/`, junto com `estado.json` (estado, progresso, mensagem,
+arquivo final). O script do Streamlit só enfileira e consulta: o operador
+continua recortando enquanto o relatório é gerado, e um rerun (ou um novo
+processo, que relê a pasta) não perde o que já ficou pronto.
+
+Cada tarefa guarda o projeto e o dono (a sessão que a enfileirou): a
+listagem pode ser restrita a um projeto, e só o dono cancela ou remove.
+
+A função da tarefa recebe o caminho de destino e uma função `progresso(feitos,
+total, mensagem='')`; o cancelamento é cooperativo: a próxima chamada de
+`progresso` depois do pedido levanta TarefaCancelada.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+PASTA_PADRAO = '.tarefas'
+WORKERS = 2
+LIMITE_HISTORICO = 20
+ARQUIVO_ESTADO = 'estado.json'
+
+NA_FILA, EXECUTANDO, CONCLUIDA, ERRO, CANCELADA, INTERROMPIDA = \
+    'na_fila', 'executando', 'concluida', 'erro', 'cancelada', 'interrompida'
+ATIVAS = (NA_FILA, EXECUTANDO)
+
+
+class TarefaCancelada(Exception):
+    pass
+
+
+class Tarefa:
+    """Estado de uma tarefa, espelhado em estado.json na pasta dela."""
+
+    CAMPOS = ('id', 'tipo', 'descricao', 'estado', 'progresso', 'mensagem', 'arquivo', 'erro', 'criada', 'concluida',
+              'projeto', 'dono')
+
+    def __init__(self, pasta, **estado):
+        self.pasta = pasta
+        self.id = estado['id']
+        self.tipo = estado.get('tipo', '')
+        self.descricao = estado.get('descricao', '')
+        self.estado = estado.get('estado', NA_FILA)
+        self.progresso = estado.get('progresso', 0.0)
+        self.mensagem = estado.get('mensagem', '')
+        self.arquivo = estado.get('arquivo')
+        self.erro = estado.get('erro')
+        self.criada = estado.get('criada', time.time())
+        self.concluida = estado.get('concluida')
+        self.projeto = estado.get('projeto')
+        self.dono = estado.get('dono')
+        self._cancelar = threading.Event()
+        self._futuro = None
+
+    @property
+    def ativa(self):
+        return self.estado in ATIVAS
+
+    def como_dict(self):
+        return {c: getattr(self, c) for c in self.CAMPOS}
+
+    def salvar(self):
+        # Grava num temporário e troca, para quem lê nunca pegar o JSON pela metade
+        temporario = os.path.join(self.pasta, ARQUIVO_ESTADO + '.tmp')
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(self.como_dict(), f, ensure_ascii=False)
+        os.replace(temporario, os.path.join(self.pasta, ARQUIVO_ESTADO))
+
+    def _progresso(self, feitos, total, mensagem=''):
+        if self._cancelar.is_set():
+            raise TarefaCancelada()
+        self.progresso = feitos / total if total else 1.0
+        self.mensagem = mensagem or f"{feitos}/{total}"
+        self.salvar()
+
+
+class FilaTarefas:
+    """Fila de tarefas em threads, com o estado persistido em disco."""
+
+    def __init__(self, pasta=PASTA_PADRAO, workers=WORKERS, limite_historico=LIMITE_HISTORICO):
+        self.pasta = pasta
+        self.limite_historico = limite_historico
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tarefa')
+        self._lock = threading.Lock()
+        self._tarefas = {}
+
+        os.makedirs(pasta, exist_ok=True)
+        for e in os.scandir(pasta):
+            caminho_estado = os.path.join(e.path, ARQUIVO_ESTADO)
+            if not e.is_dir() or not os.path.exists(caminho_estado):
+                continue
+            try:
+                with open(caminho_estado, encoding='utf-8') as f:
+                    tarefa = Tarefa(e.path, **json.load(f))
+            except (OSError, ValueError, KeyError):
+                continue
+            if tarefa.ativa:
+                # Processo anterior terminou no meio da tarefa
+                tarefa.estado = INTERROMPIDA
+                tarefa.salvar()
+            self._tarefas[tarefa.id] = tarefa
+
+    def submeter(self, tipo, descricao, funcao, nome_arquivo, projeto=None, dono=None):
+        """
+        Enfileira `funcao(destino, progresso)`, que grava o resultado em `destino`
+        (caminho dentro da pasta da tarefa) e retorna o caminho do arquivo final.
+        """
+        id_tarefa = uuid.uuid4().hex[:12]
+        pasta = os.path.join(self.pasta, id_tarefa)
+        os.makedirs(pasta)
+        tarefa = Tarefa(pasta, id=id_tarefa, tipo=tipo, descricao=descricao, projeto=projeto, dono=dono)
+        tarefa.salvar()
+        with self._lock:
+            self._tarefas[id_tarefa] = tarefa
+        tarefa._futuro = self._executor.submit(self._executar, tarefa, funcao, os.path.join(pasta, nome_arquivo))
+        self._limpar_historico()
+        return id_tarefa
+
+    def _executar(self, tarefa, funcao, destino):
+        if tarefa._cancelar.is_set():
+            # Cancelada depois de a thread pegá-la (future.cancel() já não vale): finaliza aqui
+            tarefa.estado = CANCELADA
+            tarefa.concluida = time.time()
+            tarefa.salvar()
+            return
+        tarefa.estado = EXECUTANDO
+        tarefa.salvar()
+        try:
+            tarefa.arquivo = funcao(destino, tarefa._progresso)
+            tarefa.estado = CONCLUIDA
+            tarefa.progresso = 1.0
+            tarefa.mensagem = ''
+        except TarefaCancelada:
+            tarefa.estado = CANCELADA
+        except Exception as e:
+            tarefa.estado = ERRO
+            tarefa.erro = f"{type(e).__name__}: {e}"
+        tarefa.concluida = time.time()
+        tarefa.salvar()
+
+    def cancelar(self, id_tarefa, dono=None):
+        """
+        Pede o cancelamento: na fila, não chega a rodar; em execução, para no
+        próximo progresso. Com `dono`, só cancela as tarefas dele.
+        """
+        tarefa = self._tarefas.get(id_tarefa)
+        if tarefa is None or not tarefa.ativa or (dono is not None and tarefa.dono != dono):
+            return
+        tarefa._cancelar.set()
+        if tarefa._futuro is not None and tarefa._futuro.cancel():
+            tarefa.estado = CANCELADA
+            tarefa.concluida = time.time()
+            tarefa.salvar()
+
+    def remover(self, id_tarefa, dono=None):
+        """Apaga a tarefa (e o arquivo gerado) se ela não estiver ativa. Com `dono`, só as tarefas dele."""
+        with self._lock:
+            tarefa = self._tarefas.get(id_tarefa)
+            if tarefa is None or tarefa.ativa or (dono is not None and tarefa.dono != dono):
+                return
+            del self._tarefas[id_tarefa]
+        shutil.rmtree(tarefa.pasta, ignore_errors=True)
+
+    def _limpar_historico(self):
+        finalizadas = [t for t in self.tarefas() if not t.ativa]
+        for tarefa in finalizadas[self.limite_historico:]:
+            self.remover(tarefa.id)
+
+    def obter(self, id_tarefa):
+        return self._tarefas.get(id_tarefa)
+
+    def tarefas(self, projeto=None):
+        """Tarefas (todas, ou só as do projeto), da mais recente para a mais antiga."""
+        with self._lock:
+            tarefas = [t for t in self._tarefas.values() if projeto is None or t.projeto == projeto]
+        return sorted(tarefas, key=lambda t: t.criada, reverse=True)
+
+    def ha_ativas(self, projeto=None):
+        return any(t.ativa for t in self.tarefas(projeto))
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Testes rodam a partir da raiz do repositório (python -m pytest) ou de qualquer pasta (pytest)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
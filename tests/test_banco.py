@@ -0,0 +1,57 @@
+import numpy as np
+
+from termografia.amostra import Amostra
+from termografia.banco import BancoResultados, ColecaoAmostras
+
+
+def _amostra(planta, media=30.0):
+    return Amostra(meta={'Planta': planta, 'Ambiente': '27', 'Tratamento': 'controle', 'Periodo': 'dia',
+                         'Replica': 'r1'},
+                   stats={'Temp_Media': media, 'Temp_Max': media + 1, 'Temp_Min': media - 1, 'Desvio': 0.5},
+                   matriz=np.full((3, 4), media, dtype=np.float32), caixa_sensor=(0, 0, 4, 3), jpeg_visual=b'',
+                   jpeg_recorte=b'', mascara=None, origem=None, impressoes=None)
+
+
+def test_inserir_e_carregar_na_ordem_pedida(tmp_path):
+    banco = BancoResultados(str(tmp_path / 'r.db'))
+    ids = banco.inserir('p', [_amostra('a', 20), _amostra('b', 30)])
+    carregadas = banco.carregar(ids[::-1])
+    assert [a.meta['Planta'] for a in carregadas] == ['b', 'a']
+    np.testing.assert_array_equal(carregadas[0].matriz, np.full((3, 4), 30, dtype=np.float32))
+
+
+def test_colecao_sobrevive_a_projeto_apagado_por_outra_sessao(tmp_path):
+    banco = BancoResultados(str(tmp_path / 'r.db'))
+    banco.inserir('p', [_amostra('a'), _amostra('b')])
+    dados = ColecaoAmostras(banco, 'p', limite_memoria=0)
+    banco.remover_projeto('p')
+
+    assert banco.carregar([dados.id(0), dados.id(1)]) == []
+    assert dados[0] is None
+    assert dados[0:2] == [None, None]
+    assert list(dados) == []
+    assert dados.removidas > 0
+    # Regravar uma amostra apagada não a recria nem deixa arrays órfãos
+    dados[0] = _amostra('a', 40)
+    assert banco.ids('p') == [] and banco.matriz(dados.id(0)) is None
+
+
+def test_extend_grava_as_plantas_numa_transacao(tmp_path):
+    banco = BancoResultados(str(tmp_path / 'r.db'))
+    dados = ColecaoAmostras(banco, 'p')
+    transacoes = []
+    original = banco._transacao
+    banco._transacao = lambda: (transacoes.append(1), original())[1]
+    dados.extend([_amostra('a'), _amostra('b'), _amostra('c')])
+    assert len(transacoes) == 1
+    assert [a.meta['Planta'] for a in ColecaoAmostras(banco, 'p')] == ['a', 'b', 'c']
+    assert dados.id(2) == banco.ids('p')[2]
+
+
+def test_memoria_conta_so_as_amostras_carregadas(tmp_path):
+    banco = BancoResultados(str(tmp_path / 'r.db'))
+    banco.inserir('p', [_amostra('a'), _amostra('b')])
+    dados = ColecaoAmostras(banco, 'p')
+    assert dados.memoria() == (0, 0)
+    amostra = dados[1]
+    assert dados.memoria() == (1, amostra.tamanho_bytes())
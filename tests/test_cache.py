@@ -0,0 +1,76 @@
+import io
+import os
+
+import numpy as np
+
+from termografia import cache as modulo_cache
+from termografia.cache import CacheTermico, hash_conteudo
+from termografia.ingestao import ArquivoCampanha
+from termografia.sintetico import gerar_par
+
+
+class _Upload(io.BytesIO):
+    """Como o UploadedFile do Streamlit: tem file_id, mas não tem o atributo `hash`."""
+
+    def __init__(self, dados, file_id):
+        super().__init__(dados)
+        self.file_id = file_id
+        self.name = 'P1_visual.jpg'
+
+
+def _termica(indice=0):
+    return gerar_par(indice, resolucao=(40, 30), tamanho_visual=(80, 60))['termica']
+
+
+def test_mesmo_conteudo_com_outro_nome_nao_e_decodificado_de_novo(tmp_path, monkeypatch):
+    termica = _termica()
+    cache = CacheTermico(str(tmp_path))
+    raw, calib = cache.termica(io.BytesIO(termica))
+    monkeypatch.setattr(modulo_cache, 'decodificar', lambda a: (_ for _ in ()).throw(AssertionError("decodificou")))
+    raw_outro, _ = cache.termica(ArquivoCampanha('renomeado_thermal.jpg', len(termica), 'x', lambda: termica))
+    np.testing.assert_array_equal(raw_outro, raw)
+    assert cache.estatisticas == {'memoria': 1, 'disco': 0, 'faltas': 1}
+
+    # Outra instância (outra sessão ou processo) lê do disco, também só pelo hash
+    outro = CacheTermico(str(tmp_path))
+    raw_disco, calib_disco = outro.termica_salva(hash_conteudo(termica))
+    np.testing.assert_array_equal(raw_disco, raw)
+    assert calib_disco == calib and outro.estatisticas['disco'] == 1
+    assert outro.termica_salva('0' * 32) is None
+
+
+def test_disco_despeja_as_entradas_menos_usadas(tmp_path):
+    cache = CacheTermico(str(tmp_path))
+    cache.termica(io.BytesIO(_termica(0)))
+    cache.limite_disco = cache._bytes_disco  # cabe uma entrada
+    cache.termica(io.BytesIO(_termica(1)))
+    assert len(os.listdir(tmp_path)) == 1
+    assert cache.termica_salva(hash_conteudo(_termica(1))) is not None
+    assert CacheTermico(str(tmp_path)).termica_salva(hash_conteudo(_termica(0))) is None
+
+
+def test_hash_de_upload_memorizado_pelo_file_id(monkeypatch):
+    upload = _Upload(b'conteudo', 'id-1')
+    esperado = hash_conteudo(upload)
+    chamadas = []
+    monkeypatch.setattr(modulo_cache, 'bytes_do_arquivo', lambda a: chamadas.append(a) or b'')
+    assert hash_conteudo(upload) == esperado and not chamadas
+    # Outro upload (outro file_id) é calculado
+    hash_conteudo(_Upload(b'conteudo', 'id-2'))
+    assert len(chamadas) == 1
+
+
+def test_previa_em_jpeg_no_disco_e_resolucao_cheia_so_na_memoria(tmp_path):
+    visual = gerar_par(0, resolucao=(80, 60), tamanho_visual=(640, 480))['visual']
+    cache = CacheTermico(str(tmp_path))
+    cheia = cache.imagem(_Upload(visual, 'v'))
+    previa = cache.imagem(_Upload(visual, 'v'), lado=160)
+    assert cheia.size == (640, 480) and previa.size == (320, 240)  # draft de 1/2
+
+    entradas = os.listdir(tmp_path)
+    assert len(entradas) == 1 and entradas[0].startswith('previa160-')
+    assert sorted(os.listdir(tmp_path / entradas[0])) == ['jpeg.npy', 'meta.json']
+    # Outra instância (outro processo) lê a prévia do disco
+    outro = CacheTermico(str(tmp_path))
+    assert outro.imagem(_Upload(visual, 'v'), lado=160).size == (320, 240)
+    assert outro.estatisticas['disco'] == 1
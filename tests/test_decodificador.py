@@ -0,0 +1,103 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from termografia import decodificador
+from termografia.decodificador import LIMITE_PERFIS, calibracao, carregar_perfis, converter_pilha, \
+    corrigir_calibracao, decodificar, extrair_termica, perfil_camera, perfis_carregados, raw_para_celsius
+from termografia.sintetico import CALIBRACAO_SINTETICA, arquivo_flir
+
+PASTA_IMAGENS = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'images')
+# Térmicas reais: FLIR AX8 (EXIF SubjectDistance 0, ObjectDistance 1 m) e FLIR C2
+AMOSTRAS_FLIR = ('image-16.jpg', 'image-8.jpg')
+
+
+def _ler(nome):
+    with open(os.path.join(PASTA_IMAGENS, nome), 'rb') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('nome', AMOSTRAS_FLIR)
+def test_raw_igual_ao_unpack_do_flirimageextractor(nome):
+    """Segmentos APP1, bloco FFF e troca de bytes do PNG conferidos contra o leitor do próprio FlirImageExtractor."""
+    unpack = pytest.importorskip('flirimageextractor.flyr_unpack').unpack
+    raw, _ = decodificar(_ler(nome))
+    np.testing.assert_array_equal(raw, unpack(os.path.join(PASTA_IMAGENS, nome)))
+
+
+@pytest.mark.skipif(shutil.which('exiftool') is None, reason="exiftool não instalado")
+@pytest.mark.parametrize('nome', AMOSTRAS_FLIR)
+def test_igual_ao_process_image_do_flirimageextractor(nome):
+    """Caminho antigo completo (exiftool + FlirImageExtractor.process_image) nas térmicas reais."""
+    FlirImageExtractor = pytest.importorskip('flirimageextractor').FlirImageExtractor
+    flir = FlirImageExtractor(is_debug=False)
+    try:
+        flir.process_image(os.path.join(PASTA_IMAGENS, nome))
+    except RuntimeError as e:  # o Thermal baixa o SDK da DJI na primeira vez
+        pytest.skip(f"FlirImageExtractor indisponível: {e}")
+    np.testing.assert_allclose(extrair_termica(_ler(nome)), flir.get_thermal_np(), atol=1e-3)
+
+
+def test_distancia_e_atmosfera_do_camera_info():
+    calib = calibracao(_ler('image-16.jpg'))
+    assert calib['object_distance'] == 1.0  # o SubjectDistance do EXIF desta imagem é 0
+    assert calib['camera_model'] == 'FLIR AX8'
+    raw, _ = decodificar(_ler('image-16.jpg'))
+    outra_atmosfera = dict(calib, ata1=0.5)
+    assert not np.allclose(raw_para_celsius(raw, outra_atmosfera), raw_para_celsius(raw, calib))
+
+
+def test_ida_e_volta_com_calibracao_fora_do_padrao():
+    calib = dict(CALIBRACAO_SINTETICA, emissivity=0.9, reflected_apparent_temperature=15.0,
+                 atmospheric_temperature=28.0, relative_humidity=70.0, object_distance=3.5)
+    temperaturas = 25 + 8 * np.random.default_rng(0).random((24, 32))
+    for formato in ('png', 'bruto'):
+        arquivo = arquivo_flir(temperaturas, calib, formato=formato)
+        assert calibracao(arquivo)['object_distance'] == 3.5
+        assert np.abs(extrair_termica(arquivo) - temperaturas).max() < 0.05
+
+
+def test_tabela_do_perfil_igual_a_equacao():
+    raw, calib = decodificar(_ler('image-16.jpg'))
+    perfil = perfil_camera(calib)
+    np.testing.assert_array_equal(perfil.converter(raw), raw_para_celsius(raw, calib))
+    # Fora do uint16 (ex.: float de outra fonte), a conversão cai na equação
+    np.testing.assert_allclose(perfil.converter(raw.astype(np.float64)), raw_para_celsius(raw, calib))
+
+
+def test_perfil_reaproveitado_e_registro_limitado(monkeypatch):
+    calib = calibracao(_ler('image-8.jpg'))
+    assert perfil_camera(dict(calib)) is perfil_camera(dict(calib))
+    # O CameraInfo de um arquivo já visto não é interpretado de novo
+    monkeypatch.setattr(decodificador, 'ler_calibracao', lambda *a: pytest.fail("CameraInfo relido"))
+    extrair_termica(_ler('image-8.jpg'))
+    monkeypatch.undo()
+
+    carregar_perfis([dict(CALIBRACAO_SINTETICA, emissivity=0.5 + i / 100) for i in range(LIMITE_PERFIS + 5)])
+    assert perfis_carregados() == LIMITE_PERFIS
+
+
+def test_correcao_da_calibracao():
+    calib = calibracao(_ler('image-16.jpg'))
+    corrigida = corrigir_calibracao(calib, {'emissivity': '0.9', 'relative_humidity': None})
+    assert corrigida['emissivity'] == 0.9 and corrigida['relative_humidity'] == calib['relative_humidity']
+    assert calib['emissivity'] != 0.9  # a original não é alterada
+    assert corrigir_calibracao(calib, None) == calib
+    with pytest.raises(ValueError, match="desconhecido"):
+        corrigir_calibracao(calib, {'planck_r1': 1.0})
+    with pytest.raises(ValueError, match="fora do intervalo"):
+        corrigir_calibracao(calib, {'emissivity': 1.5})
+
+
+def test_pilha_igual_a_conversao_quadro_a_quadro():
+    raw, calib = decodificar(_ler('image-16.jpg'))
+    calibs = [calib, corrigir_calibracao(calib, {'emissivity': 0.8}), calib]
+    pilha = np.stack([raw, raw, raw[::-1]])
+    saida = converter_pilha(pilha, calibs)
+    for quadro, r, c in zip(saida, pilha, calibs):
+        np.testing.assert_array_equal(quadro, perfil_camera(c).converter(r))
+    np.testing.assert_array_equal(converter_pilha(pilha, calib)[1], saida[0])
+    with pytest.raises(ValueError, match="calibrações"):
+        converter_pilha(pilha, calibs[:2])
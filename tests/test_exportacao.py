@@ -0,0 +1,60 @@
+import json
+import zipfile
+
+import numpy as np
+import pytest
+
+from termografia.amostra import Amostra
+from termografia.exportacao import ARQUIVO_MANIFESTO, CampanhaExportada, exportar, exportar_zip
+
+
+def _amostras():
+    rng = np.random.default_rng(0)
+    amostras = []
+    for i, (forma, tratamento) in enumerate((((3, 4), 'controle'), ((5, 2), 'estresse'), ((1, 1), 'controle'))):
+        matriz = rng.normal(30, 2, forma).astype(np.float32)
+        amostras.append(Amostra(
+            meta={'Planta': f"p{i}", 'Ambiente': '027', 'Tratamento': tratamento, 'Periodo': 'dia', 'Replica': '01'},
+            stats={'Temp_Media': float(matriz.mean())}, matriz=matriz, caixa_sensor=(0.5, 0, 4, 3),
+            jpeg_visual=b'', jpeg_recorte=b'', mascara=matriz > 30 if i == 1 else None, origem=None,
+            impressoes=None))
+    return amostras
+
+
+def test_ida_e_volta_com_mmap(tmp_path):
+    amostras = _amostras()
+    progresso = []
+    exportar(iter(amostras), str(tmp_path), lambda feitas, total: progresso.append((feitas, total)))
+    assert progresso == [(1, 3), (2, 3), (3, 3)]
+
+    exp = CampanhaExportada(str(tmp_path))
+    assert len(exp) == 3
+    for i, a in enumerate(amostras):
+        matriz = exp.matriz(i)
+        np.testing.assert_array_equal(matriz, a.matriz)
+        assert isinstance(matriz.base, np.memmap) and not matriz.flags.writeable
+        np.testing.assert_array_equal(exp.mascara(i), a.mascara if a.mascara is not None else True)
+    # Metadados como texto (zeros à esquerda preservados) e a caixa no sensor
+    linha = exp.indice.iloc[0]
+    assert (linha['Ambiente'], linha['Replica'], linha['sensor_x0']) == ('027', '01', 0.5)
+
+    selecionadas = list(exp.matrizes(Tratamento=['controle']))
+    assert [l['Planta'] for l, _ in selecionadas] == ['p0', 'p2']
+    np.testing.assert_array_equal(selecionadas[1][1], amostras[2].matriz)
+
+
+def test_zip_extraido_abre_igual(tmp_path):
+    amostras = _amostras()
+    exportar_zip(amostras, str(tmp_path / 'exp.zip'))
+    with zipfile.ZipFile(tmp_path / 'exp.zip') as zf:
+        assert all(i.compress_type == zipfile.ZIP_STORED for i in zf.infolist())
+        zf.extractall(tmp_path / 'exp')
+    np.testing.assert_array_equal(CampanhaExportada(str(tmp_path / 'exp')).matriz(1), amostras[1].matriz)
+
+
+def test_formato_mais_novo_recusado(tmp_path):
+    exportar(_amostras(), str(tmp_path))
+    manifesto = json.loads((tmp_path / ARQUIVO_MANIFESTO).read_text())
+    (tmp_path / ARQUIVO_MANIFESTO).write_text(json.dumps(dict(manifesto, versao=manifesto['versao'] + 1)))
+    with pytest.raises(ValueError):
+        CampanhaExportada(str(tmp_path))
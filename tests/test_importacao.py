@@ -0,0 +1,9 @@
+import pytest
+
+from termografia.benchmark import LIMITES_IMPORTACAO_MS, medir_importacao
+
+
+@pytest.mark.parametrize('modulo', sorted(LIMITES_IMPORTACAO_MS))
+def test_modulos_do_nucleo_nao_carregam_as_dependencias_da_interface(modulo):
+    # Só as dependências: o tempo de importação depende da máquina e fica com o benchmark
+    assert medir_importacao(modulo, repeticoes=1)['carregados'] == []
@@ -0,0 +1,82 @@
+import io
+import zipfile
+
+import pytest
+
+from termografia.ingestao import arquivos_do_caminho, arquivos_do_zip, resolver_caminho
+
+JPEG_A = b'\xff\xd8' + bytes(range(256)) * 4 + b'\xff\xd9'
+JPEG_B = b'\xff\xd8' + b'\x00' * 3000 + b'\xff\xd9'
+
+
+class Upload(io.BytesIO):
+    """Como o UploadedFile do Streamlit: BytesIO com nome e file_id."""
+
+    def __init__(self, dados, name, file_id):
+        super().__init__(dados)
+        self.name = name
+        self.file_id = file_id
+
+
+def _zip(caminho=None):
+    destino = caminho or io.BytesIO()
+    with zipfile.ZipFile(destino, 'w') as zf:
+        zf.writestr('campanha/P1_thermal.jpg', JPEG_A, zipfile.ZIP_STORED)
+        zf.writestr('campanha/P1_visual.JPG', JPEG_B, zipfile.ZIP_DEFLATED)
+        zf.writestr('campanha/', b'')
+        zf.writestr('campanha/leia-me.txt', b'texto')
+        zf.writestr('campanha/.oculto.jpg', JPEG_A)
+        zf.writestr('__MACOSX/campanha/._P1_thermal.jpg', b'recurso')
+    return destino
+
+
+def _conteudo(arquivo):
+    return bytes(arquivo.getbuffer())
+
+
+def test_zip_no_disco_entradas_guardadas_e_comprimidas(tmp_path):
+    caminho = tmp_path / 'campanha.zip'
+    _zip(str(caminho))
+    arquivos = arquivos_do_zip(str(caminho))
+    assert [a.name for a in arquivos] == ['campanha/P1_thermal.jpg', 'campanha/P1_visual.JPG']
+    assert [a.size for a in arquivos] == [len(JPEG_A), len(JPEG_B)]
+    assert [_conteudo(a) for a in arquivos] == [JPEG_A, JPEG_B]
+    assert len({a.file_id for a in arquivos}) == 2
+
+    # Mesmo ZIP de novo: as entradas conhecidas são reaproveitadas, não recriadas
+    conhecidos = {a.file_id: a for a in arquivos}
+    assert all(a is conhecidos[a.file_id] for a in arquivos_do_zip(str(caminho), conhecidos))
+
+
+def test_zip_enviado_identificado_pelo_file_id_do_upload():
+    dados = _zip().getvalue()
+    primeiro = arquivos_do_zip(Upload(dados, 'campanha.zip', 'upload-1'))
+    segundo = arquivos_do_zip(Upload(dados, 'campanha.zip', 'upload-2'))
+    assert [_conteudo(a) for a in primeiro] == [JPEG_A, JPEG_B]
+    assert not {a.file_id for a in primeiro} & {a.file_id for a in segundo}
+
+
+def test_zip_com_senha_recusado():
+    dados = bytearray(_zip().getvalue())
+    # Marca a entrada no diretório central como cifrada (bit 0 das flags)
+    central = dados.index(b'PK\x01\x02')
+    dados[central + 8] |= 0x1
+    with pytest.raises(ValueError, match='senha'):
+        arquivos_do_zip(Upload(bytes(dados), 'campanha.zip', 'upload-3'))
+
+
+def test_caminho_do_servidor_so_dentro_da_raiz(tmp_path):
+    raiz = tmp_path / 'dados'
+    (raiz / 'campanha').mkdir(parents=True)
+    (raiz / 'campanha' / 'P1_thermal.jpg').write_bytes(JPEG_A)
+    _zip(str(raiz / 'campanha.zip'))
+    (tmp_path / 'segredo').mkdir()
+    (raiz / 'atalho').symlink_to(tmp_path / 'segredo')
+
+    assert [a.name for a in arquivos_do_caminho('campanha', str(raiz))] == ['P1_thermal.jpg']
+    assert len(arquivos_do_caminho(str(raiz / 'campanha.zip'), str(raiz))) == 2
+    for fora in ('../segredo', str(tmp_path / 'segredo'), 'atalho', '/etc'):
+        with pytest.raises(ValueError, match='fora da pasta'):
+            resolver_caminho(fora, str(raiz))
+    with pytest.raises(ValueError, match='desativada'):
+        arquivos_do_caminho('campanha', None)
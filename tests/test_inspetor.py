@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from termografia.inspetor import Piramide, figura, janela_da_selecao, reduzir
+
+
+def test_reduzir_com_bordas_incompletas():
+    matriz = np.arange(5 * 7, dtype=np.float32).reshape(5, 7)
+    media, minimo, maximo = reduzir(matriz, 2)
+    assert media.shape == (3, 4)
+    assert media[0, 0] == matriz[:2, :2].mean() and minimo[1, 2] == matriz[2, 4] and maximo[1, 2] == matriz[3, 5]
+    # Bloco do canto: só o pixel que existe
+    assert media[2, 3] == minimo[2, 3] == maximo[2, 3] == matriz[4, 6]
+
+
+def test_vista_inteira_no_nivel_grosso_e_selecao_na_grade_nativa():
+    matriz = np.random.default_rng(0).normal(30, 2, (300, 500)).astype(np.float32)
+    piramide = Piramide(matriz, limite_pixels=10_000)
+    assert sorted(piramide.niveis) == [1, 2, 4]
+
+    fator, media, minimo, maximo, linha0, coluna0 = piramide.vista()
+    assert fator == 4 and media.shape == (75, 125) and (linha0, coluna0) == (0, 0)
+    assert minimo.min() == matriz.min() and maximo.max() == matriz.max()
+
+    fator, media, _, _, linha0, coluna0 = piramide.vista((101, 151, 33, 93))
+    assert fator == 1 and (linha0, coluna0) == (101, 33)
+    np.testing.assert_array_equal(media, matriz[101:151, 33:93])
+
+
+def test_janela_da_selecao_em_pixels_nativos():
+    # Coordenadas do gráfico: o pixel k ocupa [k - 0.5, k + 0.5]
+    assert janela_da_selecao({'x': [9.6, 2.4], 'y': [-3, 4.4]}, (10, 20)) == (0, 5, 2, 11)
+    # Seleção menor que um pixel ainda tem um pixel
+    assert janela_da_selecao({'x': [3.1, 3.2], 'y': [3.1, 3.2]}, (10, 20)) == (3, 4, 3, 4)
+
+
+def test_figura_envia_float32_com_eixos_nativos():
+    pytest.importorskip('plotly')
+    piramide = Piramide(np.ones((40, 60), dtype=np.float32), limite_pixels=600)
+    heatmap = figura(piramide).data[0]
+    assert heatmap.z.dtype == np.float32 and heatmap.dx == 2 and heatmap.x0 == 0.5
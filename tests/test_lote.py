@@ -0,0 +1,75 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from termografia.banco import BancoResultados, ColecaoAmostras
+from termografia.cache import CacheTermico
+from termografia.ingestao import arquivos_do_caminho
+from termografia.lote import main, processar_lote, processar_par
+from termografia.pareamento import IndicePares
+from termografia.reanalise import Reanalisador, impressoes, origem_do_par
+from termografia.sintetico import gravar_corpus
+
+CAIXA = [10, 8, 40, 30]
+PARAMETROS = {'ponderar_area': True, 'segmentacao': 'nenhuma'}
+
+
+def test_amostras_do_lote_reanalisaveis_como_as_do_editor(tmp_path):
+    ids = gravar_corpus(str(tmp_path / 'campanha'), 2, resolucao=(40, 30), tamanho_visual=(80, 60))
+    banco = BancoResultados(str(tmp_path / 'r.db'))
+    rois = {'padrao': CAIXA, ids[1]: [{'poligono': [[0, 0], [40, 0], [20, 30]]}]}
+    _, falhas = processar_lote(str(tmp_path / 'campanha'), rois, workers=1, banco=banco, projeto='p')
+    assert not falhas
+    caixa, poligono = ColecaoAmostras(banco, 'p')[:]
+    assert caixa.jpeg_visual.startswith(b'\xff\xd8')
+    # A reanálise recorta caixas: um polígono não tem como ser refeito
+    assert poligono.origem is None and poligono.impressoes is None
+
+    # As mesmas impressões que o Editor calcularia para o mesmo recorte
+    pares = IndicePares().adicionar(arquivos_do_caminho('campanha', str(tmp_path))).pares()
+    assert caixa.impressoes == impressoes(origem_do_par(pares[0], CAIXA, (80, 60)), PARAMETROS)
+
+    reanalisador = Reanalisador(CacheTermico(str(tmp_path / 'cache')))
+    assert list(reanalisador.reanalisar_amostras([caixa], pares, PARAMETROS)) == []
+    (_, _, refeitas, erro), = reanalisador.reanalisar_amostras([caixa], pares, dict(PARAMETROS, segmentacao='termica'))
+    assert erro is None and refeitas == ('mascara', 'estatisticas')
+    (_, nova, refeitas, erro), = reanalisador.reanalisar_amostras([caixa], pares, dict(PARAMETROS, emissividade=0.9))
+    assert erro is None and refeitas[0] == 'celsius' and nova.stats['Temp_Media'] != caixa.stats['Temp_Media']
+
+
+def test_cli_processa_a_pasta_em_paralelo_e_reporta_os_pares_com_erro(tmp_path):
+    pasta = tmp_path / 'campanha'
+    ids = gravar_corpus(str(pasta), 3, resolucao=(40, 30), tamanho_visual=(80, 60))
+    (pasta / 'P9_27_controle_dia_R1_thermal.jpg').write_bytes(b'nao e um jpeg')
+    (tmp_path / 'rois.json').write_text(json.dumps({'padrao': CAIXA, ids[0]: [0, 0, 80, 60]}))
+    saida = tmp_path / 'saida.csv'
+
+    assert main([str(pasta), str(tmp_path / 'rois.json'), '-o', str(saida), '-j', '2']) == 1
+    df = pd.read_csv(saida)
+    assert len(df) == 3 and 'p9' not in set(df['Planta'])
+    # Igual ao processamento de um par isolado, no processo principal
+    for id_par, caixa in zip(ids, ([0, 0, 80, 60], CAIXA, CAIXA)):
+        nome = next(n for n in os.listdir(pasta) if n.lower().startswith(id_par) and 'thermal' in n)
+        esperado = processar_par(str(pasta / nome), caixa)
+        linha = df[df['Planta'] == f"p{id_par[1:5]}"].iloc[0]
+        assert linha['Temp_Media'] == pytest.approx(esperado['Temp_Media'])
+
+
+def test_varias_rois_por_par_viram_replicas(tmp_path):
+    ids = gravar_corpus(str(tmp_path / 'campanha'), 2, resolucao=(40, 30), tamanho_visual=(80, 60))
+    rois = {'padrao': CAIXA,
+            ids[0]: [[0, 0, 40, 30], {'poligono': [[40, 30], [80, 30], [60, 60]]}],
+            ids[1]: [{'caixa': [0, 0, 40, 30], 'Replica': 'folha'}, {'caixa': [40, 30, 40, 30]}]}
+    df, falhas = processar_lote(str(tmp_path / 'campanha'), rois, workers=1)
+    assert not falhas and len(df) == 4
+    primeiro, segundo = (df[df['Planta'] == f"p{i[1:5]}"] for i in ids)
+    # Sem metadados próprios, as ROIs são numeradas; com, ficam os da ROI e o resto vem do par
+    assert primeiro['Replica'].tolist() == ['1', '2']
+    assert segundo['Replica'].tolist() == ['folha', '2']
+    assert segundo['Tratamento'].nunique() == 1
+    # Cada ROI igual ao par processado só com ela
+    nome = next(n for n in os.listdir(tmp_path / 'campanha') if n.lower().startswith(ids[1]) and 'thermal' in n)
+    esperado = processar_par(str(tmp_path / 'campanha' / nome), [40, 30, 40, 30])
+    assert segundo['Temp_Media'].iloc[1] == pytest.approx(esperado['Temp_Media'])
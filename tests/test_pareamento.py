@@ -0,0 +1,76 @@
+import random
+
+from termografia.pareamento import GramaticaNomes, IndicePares
+
+
+class Arquivo:
+    """Como um upload: nome e file_id (que muda a cada envio)."""
+
+    def __init__(self, name, file_id=None):
+        self.name = name
+        if file_id is not None:
+            self.file_id = file_id
+
+
+def _nomes(pares, tipo):
+    return [p[tipo].name if p[tipo] else None for p in pares]
+
+
+def test_gramatica_tipo_so_no_fim_e_campos_na_ordem_configurada():
+    g = GramaticaNomes()
+    assert g.interpretar('P01_27_Controle_Dia_R1_thermal.JPG') == ('p01_27_controle_dia_r1', 'thermal')
+    assert g.interpretar('P01_27_Controle_Dia_R1-visual.jpeg') == ('p01_27_controle_dia_r1', 'visual')
+    assert g.interpretar('thermal_P01_27_Controle_Dia_R1.jpg') is None
+    assert g.interpretar('campanha/dia1/P01_thermal.jpg') == ('p01', 'thermal')
+    assert g.meta('p01_27_controle_dia_r1') == {'Planta': 'p01', 'Ambiente': '27', 'Tratamento': 'controle',
+                                                'Periodo': 'dia', 'Replica': 'r1'}
+    assert g.meta('p01_27') is None
+    outra = GramaticaNomes(('Tratamento', 'Planta'), separador='-')
+    assert outra.meta('controle-p01') == {'Planta': 'p01', 'Ambiente': 'N/A', 'Tratamento': 'controle',
+                                          'Periodo': 'N/A', 'Replica': '1'}
+
+
+def test_pares_sem_par_ignorados_e_fora_do_padrao():
+    indice = IndicePares().adicionar([Arquivo(n) for n in (
+        'P1_27_C_Dia_R1_thermal.jpg', 'P1_27_C_Dia_R1_visual.jpg', 'P2_27_C_Dia_R1_thermal.jpg',
+        'P3_27_C_Dia_R1_visual.jpg', 'foto.jpg', 'P4_thermal.jpg')])
+    assert [p['id'] for p in indice.pares()] == ['p1_27_c_dia_r1', 'p2_27_c_dia_r1', 'p4']
+    rel = indice.relatorio()
+    assert rel['so_termica'] == ['p2_27_c_dia_r1', 'p4']
+    assert rel['so_visual'] == ['p3_27_c_dia_r1']
+    assert rel['ignorados'] == ['foto.jpg']
+    assert rel['fora_do_padrao'] == ['p4']
+    assert indice.pares()[2]['meta']['Ambiente'] == 'N/A'
+
+
+def test_mesmo_nome_em_subpastas_ou_reenviado_e_duplicado_relatado():
+    arquivos = [Arquivo('a/P1_thermal.jpg', 'zip:a/P1_thermal.jpg'), Arquivo('a/P1_visual.jpg', 'zip:a/P1_visual.jpg'),
+                Arquivo('b/P1_thermal.jpg', 'zip:b/P1_thermal.jpg'),
+                Arquivo('P2_thermal.jpg', 'up-1'), Arquivo('P2_thermal.jpg', 'up-2')]
+    indice = IndicePares().adicionar(arquivos)
+    assert _nomes(indice.pares(), 'thermal') == ['a/P1_thermal.jpg', 'P2_thermal.jpg']
+    assert indice.pares()[1]['thermal'].file_id == 'up-1'
+    assert indice.relatorio()['duplicados'] == {'p1_thermal': ['b/P1_thermal.jpg'], 'p2_thermal': ['P2_thermal.jpg']}
+    assert any('duplicado' in aviso for aviso in indice.avisos())
+
+    # O mesmo objeto de novo (rerun) não é duplicado de si mesmo
+    indice.adicionar(arquivos)
+    assert sum(len(n) for n in indice.duplicados.values()) == 2
+
+
+def test_incremental_deterministico_e_sincronizar_reconstroi():
+    nomes = [f"P{i}_{t}.jpg" for i in range(50) for t in ('thermal', 'visual')] + ['P7_thermal.jpeg']
+    arquivos = [Arquivo(n, f"id-{n}") for n in nomes]
+    embaralhados = random.Random(0).sample(arquivos, len(arquivos))
+    inteiro = IndicePares().adicionar(arquivos)
+    aos_poucos = IndicePares()
+    for i in range(0, len(embaralhados), 7):
+        aos_poucos.adicionar(embaralhados[:i + 7])
+    assert _nomes(aos_poucos.pares(), 'thermal') == _nomes(inteiro.pares(), 'thermal')
+    assert aos_poucos.relatorio() == inteiro.relatorio()
+
+    # Saiu o arquivo que valia: o duplicado preterido passa a valer
+    restantes = [a for a in arquivos if a.name != 'P7_thermal.jpg']
+    aos_poucos.sincronizar(restantes)
+    assert [p for p in aos_poucos.pares() if p['id'] == 'p7'][0]['thermal'].name == 'P7_thermal.jpeg'
+    assert aos_poucos.duplicados == {}
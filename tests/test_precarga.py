@@ -0,0 +1,51 @@
+import gc
+
+from termografia.cache import CacheTermico
+from termografia.ingestao import ArquivoCampanha
+from termografia.precarga import PreCarregador, assinatura_upload
+from termografia.sintetico import gerar_par
+
+
+def _arquivo(nome, dados, file_id):
+    return ArquivoCampanha(nome, len(dados), file_id, lambda: dados)
+
+
+def _pares(n):
+    pares = []
+    for i in range(n):
+        par = gerar_par(i, resolucao=(80, 60), tamanho_visual=(160, 120))
+        pares.append({'id': par['id'], 'thermal': _arquivo(par['nome_termica'], par['termica'], f"t{i}"),
+                      'visual': _arquivo(par['nome_visual'], par['visual'], f"v{i}")})
+    return pares
+
+
+def test_assinatura_distingue_reenvio_com_mesmo_nome_e_tamanho():
+    a = _arquivo('P1_thermal.jpg', b'x' * 10, 'id-1')
+    b = _arquivo('P1_thermal.jpg', b'y' * 10, 'id-2')
+    assert assinatura_upload([a]) != assinatura_upload([b])
+    assert assinatura_upload(None) == ()
+
+
+def test_nova_assinatura_troca_as_threads_e_fechar_encerra(tmp_path):
+    precarga = PreCarregador(CacheTermico(str(tmp_path)), antecipar=1)
+    pares = _pares(2)
+    precarga.atualizar(pares, 0, ('a',))
+    primeiro = precarga._executor
+    precarga.aguardar(pares[0]['id'])
+    assert precarga._futuros[pares[0]['id']].result() > 0
+
+    precarga.atualizar(pares, 0, ('b',))
+    assert primeiro._shutdown and precarga._executor is not primeiro
+
+    segundo = precarga._executor
+    precarga.fechar()
+    assert segundo._shutdown and precarga._executor is None and not precarga._futuros
+
+
+def test_sessao_descartada_encerra_as_threads(tmp_path):
+    precarga = PreCarregador(CacheTermico(str(tmp_path)))
+    precarga.atualizar([], 0, ('a',))
+    executor = precarga._executor
+    del precarga
+    gc.collect()
+    assert executor._shutdown
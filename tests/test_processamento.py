@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from termografia.processamento import PERCENTIS, analisar_rois, caixa_para_sensor, calcular_estatisticas, \
+    estatisticas_recortes, estatisticas_roi, estatisticas_rotuladas, geometria_roi, janela_sensor
+
+
+def _referencia(valores, pesos):
+    """Estatísticas ponderadas de um rótulo, calculadas direto (ordenando só os pixels dele)."""
+    valores, pesos = valores[pesos > 0], pesos[pesos > 0]
+    if valores.size == 0:
+        return None
+    ordem = np.argsort(valores, kind='stable')
+    valores, pesos = valores[ordem], pesos[ordem]
+    media = np.average(valores, weights=pesos)
+    acumulado = np.cumsum(pesos)
+    stats = {'Temp_Media': media, 'Temp_Max': valores[-1], 'Temp_Min': valores[0],
+             'Desvio': np.sqrt(np.average((valores - media) ** 2, weights=pesos))}
+    for p in PERCENTIS:
+        i = min(np.searchsorted(acumulado, acumulado[-1] * p / 100, side='left'), valores.size - 1)
+        stats[f'Temp_P{p}'] = valores[i]
+    return stats
+
+
+def test_rotuladas_igual_a_cada_rotulo_isolado():
+    rng = np.random.default_rng(0)
+    n_rotulos = 5
+    valores = rng.normal(30, 3, 4000).round(1)  # empates de valor entre rótulos
+    rotulos = rng.integers(0, n_rotulos - 1, valores.size)  # o último rótulo fica vazio
+    pesos = rng.random(valores.size) * (rng.random(valores.size) > 0.2)  # pesos zero não contam
+    obtido = estatisticas_rotuladas(valores, rotulos, pesos, n_rotulos)
+    for k in range(n_rotulos):
+        esperado = _referencia(valores[rotulos == k], pesos[rotulos == k])
+        if esperado is None:
+            assert obtido[k] is None
+            continue
+        assert obtido[k].keys() == esperado.keys()
+        for chave, valor in esperado.items():
+            assert obtido[k][chave] == pytest.approx(valor, abs=1e-9), (k, chave)
+
+
+def test_recortes_sobrepostos_e_calcular_estatisticas():
+    matriz = np.random.default_rng(1).normal(25, 2, (20, 30)).astype(np.float32)
+    recortes = [matriz[2:10, 3:15], matriz[5:18, 10:28], matriz[0:1, 0:1]]  # os dois primeiros se sobrepõem
+    pesos = [np.ones(r.shape) for r in recortes]
+    pesos[1][:, 0] = 0.5  # coluna de borda parcialmente coberta
+    for stats, recorte, peso in zip(estatisticas_recortes(recortes, pesos), recortes, pesos):
+        assert stats == calcular_estatisticas(recorte, peso)
+    assert estatisticas_recortes(recortes, pesos)[2]['Temp_Media'] == pytest.approx(float(matriz[0, 0]))
+    with pytest.raises(ValueError):
+        calcular_estatisticas(np.ones((2, 2)), np.zeros((2, 2)))
+
+
+def test_caixa_da_imagem_exibida_para_o_sensor():
+    # Exibida em 640x480, sensor 320x240: metade da escala; o que passa da borda é cortado
+    assert caixa_para_sensor((10, 20, 100, 50), (640, 480), (240, 320)) == (5.0, 10.0, 55.0, 35.0)
+    assert caixa_para_sensor((600, -10, 100, 50), (640, 480), (240, 320)) == (300.0, 0.0, 320.0, 20.0)
+
+
+def test_janela_pondera_as_bordas_pela_area_coberta():
+    janela, pesos = janela_sensor((0.5, 1.25, 2.5, 3.0))
+    assert janela == (slice(1, 3), slice(0, 3))
+    np.testing.assert_allclose(pesos, [[0.375, 0.75, 0.375], [0.5, 1.0, 0.5]])
+    assert pesos.sum() == pytest.approx(2.0 * 1.75)  # a área da caixa
+
+    # Sem ponderação, contam os pixels com centro dentro da caixa
+    _, pesos = janela_sensor((0.5, 1.25, 2.5, 3.0), ponderar_area=False)
+    np.testing.assert_array_equal(pesos, [[1, 1, 0], [1, 1, 0]])
+    # Caixa menor que um pixel, sem nenhum centro dentro: fica o pixel mais coberto
+    janela, pesos = janela_sensor((1.2, 1.6, 1.4, 2.3), ponderar_area=False)
+    assert janela == (slice(1, 3), slice(1, 2)) and pesos.ravel().tolist() == [1.0, 0.0]
+
+
+def test_media_ponderada_igual_a_da_grade_quatro_vezes_mais_fina():
+    # Na grade 4x mais fina, a caixa cai em pixels inteiros: a média simples é a referência exata
+    matriz = np.random.default_rng(2).normal(30, 2, (6, 8))
+    fina = np.kron(matriz, np.ones((4, 4)))
+    stats, _ = estatisticas_roi(matriz, (0.5, 1.25, 6.75, 4.5))
+    assert stats['Temp_Media'] == pytest.approx(fina[5:18, 2:27].mean())
+
+
+def test_caixa_e_poligono_na_mesma_imagem():
+    # Exibida no dobro do sensor: a caixa (4, 6, 20, 12) cobre as colunas 2-12 e linhas 3-9 do sensor
+    matriz = np.random.default_rng(3).normal(30, 2, (20, 30)).astype(np.float32)
+    caixa = {'caixa': (4, 6, 20, 12)}
+    retangulo = {'poligono': [(4, 6), (24, 6), (24, 18), (4, 18)]}
+    triangulo = {'poligono': [(10, 10), (50, 12), (20, 36)]}
+    juntas = analisar_rois(matriz, [caixa, retangulo, triangulo], (60, 40), segmentacao='termica')
+    # Cada ROI como se fosse a única da imagem (o limiar térmico é o do próprio recorte)
+    for roi, (stats, recorte, mascara, caixa_sensor) in zip([caixa, retangulo, triangulo], juntas):
+        (sozinha, _, mascara_sozinha, _), = analisar_rois(matriz, [roi], (60, 40), segmentacao='termica')
+        assert stats == pytest.approx(sozinha) and np.array_equal(mascara, mascara_sozinha)
+    # Um polígono retangular nas bordas dos pixels pesa o mesmo que a caixa
+    assert juntas[1][0] == pytest.approx(juntas[0][0]) and juntas[1][3] == juntas[0][3] == (2.0, 3.0, 12.0, 9.0)
+
+    # Sem segmentação, as estatísticas do triângulo são as dos pesos de cobertura do polígono
+    (stats, recorte, mascara, _), = analisar_rois(matriz, [triangulo], (60, 40))
+    _, janela, pesos = geometria_roi(triangulo, (60, 40), matriz.shape)
+    assert ((pesos > 0) & (pesos < 1)).any() and (pesos == 0).any()  # bordas parciais e pixels de fora
+    np.testing.assert_array_equal(mascara, pesos > 0)
+    assert stats == estatisticas_rotuladas(matriz[janela].ravel(), np.zeros(pesos.size, dtype=int), pesos.ravel(), 1)[0]
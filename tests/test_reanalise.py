@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from termografia.amostra import Amostra
+from termografia.cache import CacheTermico, hash_conteudo
+from termografia.ingestao import ArquivoCampanha
+from termografia.reanalise import ETAPAS, Reanalisador, correcao, etapas_pendentes, impressoes
+from termografia.sintetico import gerar_par
+
+ORIGEM = {'id': 'p1', 'hash_termica': 'a' * 32, 'hash_visual': 'b' * 32, 'caixa': (10.0, 8.0, 40.0, 30.0),
+          'tamanho_visual': (80, 60), 'tratamento': 'controle'}
+PARAMETROS = {'ponderar_area': True, 'segmentacao': 'termica'}
+
+
+@pytest.mark.parametrize('origem, parametros, esperado', [
+    ({}, {}, ()),
+    ({'hash_termica': 'c' * 32}, {}, ETAPAS),
+    ({}, {'emissividade': 0.95}, ETAPAS[1:]),
+    ({}, {'ambiente': {'relative_humidity': 80.0}}, ETAPAS[1:]),
+    ({}, {'emissividade_tratamento': {'controle': 0.9}}, ETAPAS[1:]),
+    ({}, {'emissividade_tratamento': {'estresse': 0.9}}, ()),  # outro tratamento
+    ({}, {'ambiente': {'relative_humidity': None}}, ()),  # None: o valor da câmera, como antes
+    ({'caixa': (12.0, 8.0, 40.0, 30.0)}, {}, ETAPAS[2:]),
+    ({'tamanho_visual': (160, 120)}, {}, ETAPAS[2:]),
+    ({}, {'ponderar_area': False}, ETAPAS[2:]),
+    ({}, {'segmentacao': 'nenhuma'}, ETAPAS[3:]),
+    ({'hash_visual': 'd' * 32}, {}, ()),  # a visual só conta na segmentação visual
+    ({'hash_visual': 'd' * 32}, {'segmentacao': 'ambas'}, ETAPAS[3:]),
+])
+def test_cada_mudanca_invalida_so_as_etapas_afetadas(origem, parametros, esperado):
+    antigas = impressoes(ORIGEM, PARAMETROS)
+    assert etapas_pendentes(antigas, impressoes(dict(ORIGEM, **origem), dict(PARAMETROS, **parametros))) == esperado
+    assert etapas_pendentes(None, antigas) == ETAPAS
+
+
+def test_emissividade_do_tratamento_tem_prioridade_sobre_a_global():
+    parametros = {'emissividade': 0.95, 'emissividade_tratamento': {'estresse': 0.9},
+                  'ambiente': {'atmospheric_temperature': 28.0, 'relative_humidity': None}}
+    assert correcao(parametros, 'estresse') == {'atmospheric_temperature': 28.0, 'emissivity': 0.9}
+    assert correcao(parametros, 'controle') == {'atmospheric_temperature': 28.0, 'emissivity': 0.95}
+    assert correcao({}) == {}
+    with pytest.raises(ValueError, match="desconhecida"):
+        correcao({'ambiente': {'emissivity': 0.9}})
+
+
+def _amostra(resultado):
+    return Amostra(meta={'Planta': 'p1', 'Tratamento': 'controle'}, stats=resultado['stats'],
+                   matriz=resultado['matriz'], caixa_sensor=resultado['caixa_sensor'], jpeg_visual=b'',
+                   jpeg_recorte=b'', mascara=resultado['mascara'], origem=resultado['origem'],
+                   impressoes=resultado['impressoes'])
+
+
+def test_reanalise_reaproveita_as_etapas_validas(tmp_path, monkeypatch):
+    par = gerar_par(0, resolucao=(40, 30), tamanho_visual=(80, 60))
+    termica = ArquivoCampanha(par['nome_termica'], len(par['termica']), 't', lambda: par['termica'])
+    origem = {'id': par['id'], 'hash_termica': hash_conteudo(termica), 'hash_visual': None,
+              'caixa': (10.0, 8.0, 40.0, 30.0), 'tamanho_visual': (80, 60), 'tratamento': 'controle'}
+    reanalisador = Reanalisador(CacheTermico(str(tmp_path)))
+    resultado, refeitas = reanalisador.analisar(origem, PARAMETROS, termica)
+    assert refeitas == ETAPAS
+    anterior = _amostra(resultado)
+    assert reanalisador.analisar(origem, PARAMETROS, termica, anterior=anterior) == (None, ())
+
+    # Nem decodificação nem °C: a segmentação parte do recorte guardado, a ROI da matriz em memória
+    monkeypatch.setattr(reanalisador.cache, 'termica', lambda a: pytest.fail("decodificou de novo"))
+    sem_mascara, refeitas = reanalisador.analisar(origem, dict(PARAMETROS, segmentacao='nenhuma'), termica,
+                                                  anterior=anterior)
+    assert refeitas == ETAPAS[3:] and sem_mascara['mascara'] is None
+    assert sem_mascara['matriz'] is anterior.matriz
+    outra_roi, refeitas = reanalisador.analisar(dict(origem, caixa=(0.0, 0.0, 80.0, 60.0)), PARAMETROS, termica,
+                                                anterior=anterior)
+    assert refeitas == ETAPAS[2:] and outra_roi['matriz'].shape == (30, 40)
+    monkeypatch.undo()
+
+    # O mesmo que uma análise do zero com os parâmetros novos
+    do_zero, _ = Reanalisador(CacheTermico(str(tmp_path / 'outro'))).analisar(
+        dict(origem, caixa=(0.0, 0.0, 80.0, 60.0)), PARAMETROS, termica)
+    np.testing.assert_array_equal(outra_roi['matriz'], do_zero['matriz'])
+    assert outra_roi['stats'] == do_zero['stats'] and outra_roi['impressoes'] == do_zero['impressoes']
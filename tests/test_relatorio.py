@@ -0,0 +1,39 @@
+import threading
+
+import numpy as np
+import pytest
+
+from termografia.amostra import Amostra
+from termografia.relatorio import gerar_pdf_final, gerar_relatorio
+
+META = {'Planta': 'p01', 'Ambiente': '27', 'Tratamento': 'controle', 'Periodo': 'dia', 'Replica': 'r1'}
+STATS = {'Temp_Media': 30.0, 'Temp_Max': 32.0, 'Temp_Min': 28.0, 'Desvio': 1.0}
+
+
+def _amostra():
+    return Amostra(meta=META, stats=STATS, matriz=np.full((6, 8), 30.0, dtype=np.float32),
+                   caixa_sensor=(0, 0, 8, 6), jpeg_visual=b'', jpeg_recorte=b'', mascara=None, origem=None,
+                   impressoes=None)
+
+
+def test_pdf_de_amostra_sem_miniaturas(tmp_path):
+    # Amostras gravadas pelo lote antigo não têm miniaturas
+    amostra = _amostra()
+    destino = tmp_path / 'relatorio.pdf'
+    gerar_pdf_final([amostra], str(destino), pasta_render=str(tmp_path / 'render'))
+    assert destino.read_bytes().startswith(b'%PDF')
+
+
+def test_relatorio_em_partes_gerado_de_uma_thread(tmp_path):
+    # Como na fila de tarefas: os processos das partes são criados a partir de uma thread
+    resultado = {}
+    thread = threading.Thread(target=lambda: resultado.update(final=gerar_relatorio(
+        [_amostra(), None, _amostra(), _amostra()], str(tmp_path / 'relatorio'), paginas_por_parte=1, workers=2,
+        pasta_render=str(tmp_path / 'render'))))
+    thread.start()
+    thread.join(120)
+    # Um documento só, com a numeração das páginas seguindo de uma parte para a outra
+    PdfReader = pytest.importorskip('pypdf').PdfReader
+    assert resultado['final'] == str(tmp_path / 'relatorio.pdf')
+    paginas = PdfReader(resultado['final']).pages
+    assert [f"Página {n}" in p.extract_text() for n, p in enumerate(paginas, 1)] == [True] * 3
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from termografia.renderizacao import CacheRenderizacao, lut, renderizar
+
+
+def _matriz(semente):
+    return np.random.default_rng(semente).normal(30, 2, (6, 8)).astype(np.float32)
+
+
+def test_obter_igual_a_renderizar_e_acerta_em_memoria(tmp_path):
+    cache = CacheRenderizacao(str(tmp_path))
+    m = _matriz(0)
+    assert cache.obter(m, lado_minimo=16) == renderizar(m, lado_minimo=16)
+    assert cache.obter(m, lado_minimo=16) == renderizar(m, lado_minimo=16)
+    assert cache.estatisticas == {'memoria': 1, 'disco': 0, 'faltas': 1}
+
+
+def test_disco_reaproveitado_por_outra_instancia(tmp_path):
+    m = _matriz(1)
+    CacheRenderizacao(str(tmp_path)).obter(m, chave='amostra:1:v1')
+    outro = CacheRenderizacao(str(tmp_path))
+    assert outro.obter(lambda: None, chave='amostra:1:v1') == renderizar(m)
+    assert outro.estatisticas['disco'] == 1
+
+
+def test_arquivo_reescrito_depois_do_despejo_do_disco(tmp_path):
+    cache = CacheRenderizacao(str(tmp_path))
+    m = _matriz(2)
+    caminho = cache.arquivo(m)
+    cache.limite_disco = 0
+    cache._despejar_disco()
+    assert not os.path.exists(caminho)
+
+    # Acerto em memória: o arquivo volta para o disco
+    assert cache.arquivo(m) == caminho
+    assert cache.estatisticas['memoria'] == 1
+    with open(caminho, 'rb') as f:
+        assert f.read() == renderizar(m)
+
+
+def test_despejo_preserva_o_arquivo_recem_gravado(tmp_path):
+    cache = CacheRenderizacao(str(tmp_path), limite_disco=1)
+    primeiro = cache.arquivo(_matriz(3))
+    segundo = cache.arquivo(_matriz(4))
+    assert os.path.exists(segundo) and not os.path.exists(primeiro)
+    assert os.path.exists(cache.arquivo(_matriz(3)))
+
+
+def test_tabela_igual_ao_colormap_do_matplotlib():
+    colormaps = pytest.importorskip('matplotlib').colormaps
+    esperado = (colormaps['inferno'](np.linspace(0, 1, 256))[:, :3] * 255).round().astype(np.uint8)
+    np.testing.assert_array_equal(lut('inferno'), esperado)
+
+
+def test_renderizar_sem_importar_o_matplotlib():
+    # Como num processo de parte do relatório
+    codigo = ("import sys, numpy as np; from termografia.renderizacao import renderizar; "
+              "renderizar(np.eye(4)); assert 'matplotlib' not in sys.modules")
+    subprocess.run([sys.executable, '-c', codigo], check=True, cwd=os.path.dirname(os.path.dirname(__file__)))
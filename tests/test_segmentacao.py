@@ -0,0 +1,51 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from termografia.segmentacao import segmentar
+from termografia.sintetico import gerar_par
+
+
+def _iou(a, b):
+    return (a & b).sum() / (a | b).sum()
+
+
+@pytest.fixture(scope='module')
+def par():
+    par = gerar_par(3, resolucao=(80, 60), tamanho_visual=(160, 120))
+    par['rgb'] = np.asarray(Image.open(io.BytesIO(par['visual'])).convert('RGB'))
+    return par
+
+
+def test_termica_separa_a_planta_mais_fria(par):
+    mascara = segmentar(par['campo'], 'termica')
+    assert mascara.shape == par['campo'].shape and _iou(mascara, par['mascara']) > 0.95
+    assert _iou(segmentar(par['campo'], 'termica', planta_mais_fria=False), ~par['mascara']) > 0.95
+
+
+def test_janela_limita_o_limiar_e_a_mascara(par):
+    janela = (slice(10, 50), slice(20, 60))
+    mascara = segmentar(par['campo'], 'termica', janela=janela)
+    fora = np.ones(mascara.shape, dtype=bool)
+    fora[janela] = False
+    assert not mascara[fora].any()
+    assert _iou(mascara[janela], par['mascara'][janela]) > 0.95
+    # Recorte uniforme (sem duas classes): nada é descartado
+    assert segmentar(np.full((4, 4), 30.0), 'termica').all()
+
+
+def test_visual_e_combinada(par):
+    visual = segmentar(par['campo'], 'visual', par['rgb'])
+    assert _iou(visual, par['mascara']) > 0.9
+    ambas = segmentar(par['campo'], 'ambas', par['rgb'])
+    np.testing.assert_array_equal(ambas, visual & segmentar(par['campo'], 'termica'))
+    assert segmentar(par['campo'], 'nenhuma') is None
+
+
+def test_metodo_invalido_ou_sem_visual():
+    with pytest.raises(ValueError):
+        segmentar(np.ones((4, 4)), 'outro')
+    with pytest.raises(ValueError):
+        segmentar(np.ones((4, 4)), 'visual')
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from termografia.series import SeriesTemporais, _inclinacao
+
+
+def _inclinacao_polyfit(cubo, janela):
+    """Referência: np.polyfit em cada janela, só com as observações finitas."""
+    esperado = np.full(cubo.shape, np.nan)
+    for s in range(cubo.shape[0]):
+        for t in range(cubo.shape[1]):
+            for p in range(cubo.shape[2]):
+                tempos = np.arange(max(0, t - janela + 1), t + 1)
+                y = cubo[s, tempos, p]
+                finito = np.isfinite(y)
+                if finito.sum() > 1:
+                    esperado[s, t, p] = np.polyfit(tempos[finito], y[finito], 1)[0]
+    return esperado
+
+
+@pytest.mark.parametrize('janela', [2, 3, 5, 12])
+def test_inclinacao_igual_a_polyfit_com_lacunas(janela):
+    rng = np.random.default_rng(janela)
+    cubo = 25 + 0.3 * np.arange(12)[None, :, None] + rng.normal(0, 1, (4, 12, 2))
+    cubo[rng.random(cubo.shape) < 0.3] = np.nan
+    cubo[0, :, 0] = np.nan  # série sem nenhuma observação
+    np.testing.assert_allclose(_inclinacao(cubo, janela), _inclinacao_polyfit(cubo, janela), atol=1e-9)
+
+
+def test_por_grupo_desvio_estavel_com_media_grande():
+    # Média muito maior que a dispersão: Σx² - n·média² perderia todos os dígitos do desvio
+    rng = np.random.default_rng(0)
+    linhas = [{'Planta': f"p{i}", 'Ambiente': '27', 'Tratamento': ('controle', 'estresse')[i % 2],
+               'Replica': f"r{r}", 'Periodo': 'dia', 'Temp_Media': 1e8 + rng.normal(0, 0.01)}
+              for i in range(40) for r in (1, 2)]
+    df = pd.DataFrame(linhas)
+    df.loc[3, 'Temp_Media'] = np.nan
+    obtido = SeriesTemporais(df).por_grupo(coluna='Tratamento').set_index(['Tratamento', 'Replica'])
+    esperado = df.groupby(['Tratamento', 'Replica'])['Temp_Media'].agg(['mean', 'std', 'count'])
+    np.testing.assert_allclose(obtido.loc[esperado.index, 'Desvio_Grupo'], esperado['std'], rtol=1e-6)
+    np.testing.assert_array_equal(obtido.loc[esperado.index, 'N'], esperado['count'])
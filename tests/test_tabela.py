@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from termografia.tabela import COLUNAS_STATS, TabelaResultados
+
+TRATAMENTOS = ('controle', 'estresse', 'recuperacao')
+PERIODOS = ('dia', 'noite')
+
+
+def _linhas(n, semente=0):
+    rng = np.random.default_rng(semente)
+    linhas = []
+    for i in range(n):
+        media = float(rng.normal(30, 3))
+        linhas.append({'Planta': f"p{i % 17}", 'Ambiente': '27', 'Tratamento': TRATAMENTOS[rng.integers(3)],
+                       'Periodo': PERIODOS[rng.integers(2)], 'Replica': 'r1', 'Temp_Media': media,
+                       'Temp_Max': media + 2, 'Temp_Min': media - 2, 'Desvio': 1.0})
+    return linhas
+
+
+def _referencia(linhas):
+    df = pd.DataFrame(linhas)
+    g = df.groupby(['Tratamento', 'Periodo'])['Temp_Media']
+    return pd.DataFrame({'Temp_Media': g.mean(), 'Desvio_Grupo': g.std(), 'N': g.count(), 'Minimo': g.min(),
+                         'Maximo': g.max()}).reset_index()
+
+
+def _comparar(tabela, linhas):
+    obtido = tabela.agregados().astype({'Tratamento': str, 'Periodo': str, 'N': 'int64'})
+    pd.testing.assert_frame_equal(obtido, _referencia(linhas), check_dtype=False, atol=1e-9)
+
+
+def test_agregados_incrementais_iguais_ao_groupby_do_pandas():
+    linhas = _linhas(200)  # passa da capacidade inicial: as colunas crescem
+    tabela = TabelaResultados(linhas)
+    _comparar(tabela, linhas)
+    pd.testing.assert_frame_equal(TabelaResultados.de_dataframe(pd.DataFrame(linhas)).agregados(), tabela.agregados())
+
+    # Reanálise: valor e grupo mudam, inclusive de linhas que eram o mínimo/máximo do grupo
+    extremos = [int(np.argmin([l['Temp_Media'] for l in linhas])), int(np.argmax([l['Temp_Media'] for l in linhas]))]
+    for i, nova in zip(extremos + [5, 17], _linhas(4, semente=1)):
+        linhas[i] = nova
+        tabela.atualizar(i, nova)
+    _comparar(tabela, linhas)
+
+
+def test_filtrar_e_tabela():
+    linhas = _linhas(50)
+    tabela = TabelaResultados(linhas)
+    df = pd.DataFrame(linhas)
+    filtrada = tabela.filtrar(Tratamento=['estresse'], Periodo=['dia', 'noite'])
+    esperada = df[df['Tratamento'] == 'estresse']
+    np.testing.assert_allclose(filtrada['Temp_Media'], esperada['Temp_Media'])
+    assert list(tabela.tabela().columns[-len(COLUNAS_STATS):]) == list(COLUNAS_STATS)
+    assert len(tabela.filtrar(Tratamento=['inexistente'])) == 0
+    with pytest.raises(ValueError):
+        tabela.agregados(Planta=['p1'])
@@ -0,0 +1,89 @@
+import threading
+
+import pandas as pd
+
+from termografia.tabela import gravar_csv
+from termografia.tarefas import FilaTarefas, CONCLUIDA, CANCELADA, ERRO
+
+
+def _esperar(fila, id_tarefa):
+    fila.obter(id_tarefa)._futuro.result(timeout=10)
+    return fila.obter(id_tarefa)
+
+
+def _gravar(destino, progresso):
+    with open(destino, 'w') as f:
+        f.write('ok')
+    progresso(1, 1)
+    return destino
+
+
+def test_conclui_e_persiste_o_estado(tmp_path):
+    fila = FilaTarefas(str(tmp_path))
+    tarefa = _esperar(fila, fila.submeter('csv', 'Tabela', _gravar, 'saida.csv'))
+    assert tarefa.estado == CONCLUIDA and tarefa.progresso == 1.0
+    assert FilaTarefas(str(tmp_path)).obter(tarefa.id).estado == CONCLUIDA
+
+
+def test_erro_fica_registrado(tmp_path):
+    def falhar(destino, progresso):
+        raise ValueError("sem amostras")
+    fila = FilaTarefas(str(tmp_path))
+    tarefa = _esperar(fila, fila.submeter('pdf', 'Relatório', falhar, 'r'))
+    assert tarefa.estado == ERRO and 'sem amostras' in tarefa.erro
+
+
+def test_cancelar_em_execucao(tmp_path):
+    iniciou, liberar = threading.Event(), threading.Event()
+    def longa(destino, progresso):
+        iniciou.set()
+        liberar.wait(10)
+        progresso(1, 2)
+        return destino
+    fila = FilaTarefas(str(tmp_path))
+    id_tarefa = fila.submeter('pdf', 'Relatório', longa, 'r')
+    iniciou.wait(10)
+    fila.cancelar(id_tarefa)
+    liberar.set()
+    assert _esperar(fila, id_tarefa).estado == CANCELADA
+
+
+def test_cancelada_depois_de_a_thread_pegar_a_tarefa(tmp_path):
+    # O pedido chega quando future.cancel() já não vale, antes de a função rodar
+    fila = FilaTarefas(str(tmp_path))
+    id_tarefa = fila.submeter('csv', 'Tabela', _gravar, 'saida.csv')
+    tarefa = _esperar(fila, id_tarefa)
+    tarefa.estado = 'na_fila'
+    tarefa._cancelar.set()
+    fila._executar(tarefa, _gravar, str(tmp_path / 'x.csv'))
+    assert tarefa.estado == CANCELADA and not tarefa.ativa and tarefa.concluida
+
+
+def test_listagem_e_acoes_restritas(tmp_path):
+    fila = FilaTarefas(str(tmp_path))
+    a = _esperar(fila, fila.submeter('csv', 'A', _gravar, 'a.csv', projeto='p1', dono='s1'))
+    b = _esperar(fila, fila.submeter('csv', 'B', _gravar, 'b.csv', projeto='p2', dono='s2'))
+    assert [t.id for t in fila.tarefas('p1')] == [a.id]
+    fila.remover(a.id, dono='s2')
+    assert fila.obter(a.id) is not None
+    fila.remover(a.id, dono='s1')
+    assert fila.obter(a.id) is None and fila.obter(b.id) is not None
+
+
+def test_csv_em_blocos_e_cancelavel_entre_eles(tmp_path):
+    df = pd.DataFrame({'Planta': [f"p{i}" for i in range(25)], 'Temp_Media': range(25)})
+    chamadas = []
+    destino = gravar_csv(df, str(tmp_path / 't.csv'), lambda feitos, total: chamadas.append((feitos, total)), 10)
+    assert chamadas == [(10, 25), (20, 25), (25, 25)]
+    pd.testing.assert_frame_equal(pd.read_csv(destino), df)
+
+    fila = FilaTarefas(str(tmp_path / 'fila'))
+
+    def cancelar_no_primeiro_bloco(destino, progresso):
+        def progresso_cancelado(feitos, total):
+            fila.cancelar(id_tarefa)
+            progresso(feitos, total)
+        return gravar_csv(df, destino, progresso_cancelado, 10)
+    id_tarefa = fila.submeter('csv', 'Tabela', cancelar_no_primeiro_bloco, 't.csv')
+    tarefa = _esperar(fila, id_tarefa)
+    assert tarefa.estado == CANCELADA